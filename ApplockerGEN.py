@@ -26,6 +26,10 @@ with col1:
     
     6️⃣ <a href="AppLocker_Inspector" target="_self">**AppLocker Inspector**</a>: Audit your AppLocker policies for security misconfigurations and get actionable recommendations. Collaboration with Spencer Alessi (@techspence). 🔍
     
+    7️⃣ <a href="AppLocker_Event_Coverage" target="_self">**Event Coverage**</a>: Upload exported AppLocker event logs to see which rules fire, which never do, and which files would be blocked in Enforce mode. 📈
+    
+    8️⃣ <a href="AppLocker_Policy_Tester" target="_self">**Policy Tester**</a>: Check files or a whole inventory against a policy offline, the way Test-AppLockerPolicy would, without a Windows machine. 🧪
+    
     AppLockerGen is an open-source project, and we encourage contributions and feedback from the community to continue improving the tool. 🌐
 
     Get started by uploading your existing AppLocker XML files or create new policies using the interface provided. 📤📥
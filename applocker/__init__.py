@@ -0,0 +1 @@
+"""UI-free AppLocker policy engines shared by the Streamlit pages and the CLIs"""
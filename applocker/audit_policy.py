@@ -0,0 +1,214 @@
+"""Allow policies generated from audit-mode AppLocker event logs
+
+Before a collection moves from AuditOnly to Enabled, every file that audit
+mode logged as "would have been blocked" (8003/8006) needs an allow rule.
+Events are folded per chunk into an AuditAllowList, which keeps one entry per
+distinct signed binary and per distinct unsigned file, so memory follows the
+number of distinct files rather than the number of events. The rules are the
+fewest that cover every file:
+
+- signed files: one FilePublisherRule per publisher, product and binary, its
+  version range spanning every version seen
+- unsigned files: one FileHashRule per distinct SHA256; the events do not
+  log the file length, so these FileHash entries have no SourceFileLength
+- files logged with neither a signature nor a hash: one FilePathRule per path
+
+Usage:
+    python -m applocker.audit_policy C:\\Logs\\*.evtx -o audit_allow_policy.xml
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import uuid
+import xml.etree.ElementTree as ET
+
+from applocker.events import WOULD_BLOCK_EVENT_IDS, evtx_chunk_tasks, read_chunk_events
+from applocker.exe_policy import MAX_DESCRIPTION_FILES, describe_covered_files
+from applocker.parallel import map_chunks
+from applocker.rules import parse_fqbn, parse_version
+from applocker.xmlwriter import PolicyWriter
+
+# Same collection order as AppLocker's own policy exports
+COLLECTION_ORDER = ['Appx', 'Dll', 'Exe', 'Msi', 'Script']
+
+def _file_name(file_path):
+    return file_path.rsplit('\\', 1)[-1]
+
+class AuditAllowList:
+    """Distinct would-block files from audit events, deduplicated by publisher tuple and by hash"""
+
+    def __init__(self):
+        # (collection, publisher, product, binary) -> [low version, high version, events, file names]
+        self.publishers = {}
+        # (collection, sha256) -> [file name, events]
+        self.hashes = {}
+        # (collection, path) -> events
+        self.paths = {}
+        self.events = 0
+
+    def add(self, event, count=1):
+        """Fold one EventKey into the list; events other than 8003/8006 are ignored"""
+        if event.event_id not in WOULD_BLOCK_EVENT_IDS:
+            return
+        self.events += count
+        signer = parse_fqbn(event.fqbn)
+        if signer is not None:
+            publisher, product, binary, version = signer
+            entry = self.publishers.get((event.collection, publisher, product, binary))
+            if entry is None:
+                self.publishers[(event.collection, publisher, product, binary)] = [version, version, count, {_file_name(event.file_path)}]
+                return
+            if parse_version(version) < parse_version(entry[0]):
+                entry[0] = version
+            if parse_version(version) > parse_version(entry[1]):
+                entry[1] = version
+            entry[2] += count
+            if len(entry[3]) < MAX_DESCRIPTION_FILES:
+                entry[3].add(_file_name(event.file_path))
+        elif event.file_hash:
+            entry = self.hashes.get((event.collection, event.file_hash))
+            if entry is None:
+                self.hashes[(event.collection, event.file_hash)] = [_file_name(event.file_path), count]
+            else:
+                entry[1] += count
+        elif event.file_path:
+            key = (event.collection, event.file_path)
+            self.paths[key] = self.paths.get(key, 0) + count
+
+    def update(self, other):
+        """Merge another list, e.g. one built by a worker for a single chunk"""
+        self.events += other.events
+        for key, (low, high, count, file_names) in other.publishers.items():
+            entry = self.publishers.get(key)
+            if entry is None:
+                self.publishers[key] = [low, high, count, set(file_names)]
+                continue
+            if parse_version(low) < parse_version(entry[0]):
+                entry[0] = low
+            if parse_version(high) > parse_version(entry[1]):
+                entry[1] = high
+            entry[2] += count
+            for file_name in file_names:
+                if len(entry[3]) >= MAX_DESCRIPTION_FILES:
+                    break
+                entry[3].add(file_name)
+        for key, (file_name, count) in other.hashes.items():
+            entry = self.hashes.get(key)
+            if entry is None:
+                self.hashes[key] = [file_name, count]
+            else:
+                entry[1] += count
+        for key, count in other.paths.items():
+            self.paths[key] = self.paths.get(key, 0) + count
+
+    def rule_counts(self):
+        return {'Publisher': len(self.publishers), 'Hash': len(self.hashes), 'Path': len(self.paths)}
+
+    def collections(self):
+        present = {key[0] for rules in (self.publishers, self.hashes, self.paths) for key in rules}
+        return [collection for collection in COLLECTION_ORDER if collection in present] + sorted(present - set(COLLECTION_ORDER))
+
+def collect_chunk_allow_list(task):
+    """Worker: fold the would-block events of one EVTX chunk into (AuditAllowList, records seen, error)"""
+    events, records, error = read_chunk_events(task)
+    allow_list = AuditAllowList()
+    for event in events:
+        allow_list.add(event)
+    return allow_list, records, error
+
+def collect_allow_list(paths, workers=None, chunksize=8, progress=None):
+    """Build one AuditAllowList from EVTX files, one worker task per chunk
+
+    Returns (allow_list, stats) with the same stats keys as aggregate_event_logs().
+    """
+    started = time.perf_counter()
+    tasks = evtx_chunk_tasks(paths)
+    allow_list = AuditAllowList()
+    stats = {'files': len(paths), 'chunks': len(tasks), 'records': 0, 'events': 0, 'errors': [], 'seconds': 0.0}
+    for chunk_list, records, error in map_chunks(collect_chunk_allow_list, tasks, workers, chunksize, progress):
+        allow_list.update(chunk_list)
+        stats['records'] += records
+        if error:
+            stats['errors'].append(error)
+    stats['events'] = allow_list.events
+    stats['seconds'] = time.perf_counter() - started
+    return allow_list, stats
+
+def allow_list_from_counts(counts):
+    """Build an AuditAllowList from an aggregate_event_logs() Counter"""
+    allow_list = AuditAllowList()
+    for event, count in counts.items():
+        allow_list.add(event, count)
+    return allow_list
+
+def write_allow_policy_xml(allow_list, out, enforcement_mode="AuditOnly"):
+    """Write allow rules for every collection in the list, in the rule shapes generate_xml() emits"""
+    writer = PolicyWriter(out)
+    writer.start("AppLockerPolicy", {'Version': "1"})
+    for collection in allow_list.collections():
+        writer.start("RuleCollection", {'Type': collection, 'EnforcementMode': enforcement_mode})
+
+        for (rule_collection, publisher, product, binary_name), (low, high, _, file_names) in allow_list.publishers.items():
+            if rule_collection != collection:
+                continue
+            description = describe_covered_files(file_names)
+            file_publisher_rule = ET.Element("FilePublisherRule", Id=str(uuid.uuid4()), Name="Publisher Rule for " + binary_name, Description=description, UserOrGroupSid="S-1-1-0", Action="Allow")
+            conditions_publisher = ET.SubElement(file_publisher_rule, "Conditions")
+            file_publisher_condition = ET.SubElement(conditions_publisher, "FilePublisherCondition", PublisherName=publisher, ProductName=product or "*", BinaryName=binary_name or "*")
+            ET.SubElement(file_publisher_condition, "BinaryVersionRange", LowSection=low or "0.0.0.0", HighSection=high or "*")
+            writer.element(file_publisher_rule)
+
+        for (rule_collection, file_hash), (file_name, _) in allow_list.hashes.items():
+            if rule_collection != collection:
+                continue
+            file_hash_rule = ET.Element("FileHashRule", Id=str(uuid.uuid4()), Name="Hash Rule for " + file_name, Description="", UserOrGroupSid="S-1-1-0", Action="Allow")
+            conditions_hash = ET.SubElement(file_hash_rule, "Conditions")
+            file_hash_condition = ET.SubElement(conditions_hash, "FileHashCondition")
+            # Events do not log the file length, so SourceFileLength is left out
+            ET.SubElement(file_hash_condition, "FileHash", Type="SHA256", Data=f"0x{file_hash}", SourceFileName=file_name)
+            writer.element(file_hash_rule)
+
+        for (rule_collection, file_path), _ in allow_list.paths.items():
+            if rule_collection != collection:
+                continue
+            file_path_rule = ET.Element("FilePathRule", Id=str(uuid.uuid4()), Name="Path Rule for " + _file_name(file_path), Description="", UserOrGroupSid="S-1-1-0", Action="Allow")
+            conditions_path = ET.SubElement(file_path_rule, "Conditions")
+            ET.SubElement(conditions_path, "FilePathCondition", Path=file_path)
+            writer.element(file_path_rule)
+
+        writer.end()
+    writer.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate an allow policy covering every file audit mode would have blocked (8003/8006).")
+    parser.add_argument('logs', nargs='+', help="EVTX files or glob patterns exported from the endpoints")
+    parser.add_argument('-o', '--output', default='audit_allow_policy.xml', help="Policy XML to write")
+    parser.add_argument('--mode', choices=['Audit', 'Enforce'], default='Audit', help="EnforcementMode of the generated collections")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Worker processes (default: CPU count; 1 disables the pool)")
+    parser.add_argument('--chunksize', type=int, default=8, help="EVTX chunks handed to a worker at a time")
+    args = parser.parse_args(argv)
+
+    paths = []
+    for pattern in args.logs:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    paths = [path for path in paths if os.path.isfile(path)]
+    if not paths:
+        print("No EVTX files found", file=sys.stderr)
+        return 1
+
+    allow_list, stats = collect_allow_list(paths, workers=args.workers, chunksize=args.chunksize)
+    for error in stats['errors']:
+        print(error, file=sys.stderr)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        write_allow_policy_xml(allow_list, f, "AuditOnly" if args.mode == 'Audit' else "Enabled")
+
+    rule_counts = allow_list.rule_counts()
+    print(f"Files: {stats['files']}, chunks: {stats['chunks']}, records: {stats['records']}, "
+          f"would-block events: {stats['events']} in {stats['seconds']:.2f}s")
+    print(f"Rules written to {args.output}: {rule_counts['Publisher']} publisher, {rule_counts['Hash']} hash, {rule_counts['Path']} path")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
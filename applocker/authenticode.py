@@ -0,0 +1,260 @@
+"""Authenticode signer identification and AppLocker publisher names
+
+An Authenticode signature is a PKCS #7 SignedData whose certificate set holds
+the signing certificate together with its intermediates, roots and often the
+timestamping chain, in no particular order. The signing (leaf) certificate is
+the one named by the SignerInfo's issuer and serial number.
+
+Only the outer DER structure of each signature is walked per file: the
+certificate set is located and hashed, and the chain behind that hash is
+parsed once and kept in a SignerChainCache, so the thousand files one vendor
+signed with the same chain parse it once.
+
+PublisherName is formatted as AppLocker shows it: the signer's O, L, S and C
+attributes (CN when there is no O), most specific first, upper-cased, with
+values quoted when they contain separators, e.g.
+'O=MICROSOFT CORPORATION, L=REDMOND, S=WASHINGTON, C=US'.
+"""
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+# DER tags
+SEQUENCE = 0x30
+SET = 0x31
+INTEGER = 0x02
+OBJECT_IDENTIFIER = 0x06
+BOOLEAN = 0x01
+OCTET_STRING = 0x04
+CONTEXT_0 = 0xA0
+CONTEXT_1 = 0xA1
+CONTEXT_3 = 0xA3
+CERTIFICATES_IMPLICIT = 0xA0
+
+SIGNED_DATA_OID = bytes.fromhex('2a864886f70d010702')
+BASIC_CONSTRAINTS_OID = bytes.fromhex('551d13')
+
+# Attribute OIDs (2.5.4.x) and the names AppLocker gives them
+ATTRIBUTE_NAMES = {
+    bytes.fromhex('550403'): 'CN',
+    bytes.fromhex('550406'): 'C',
+    bytes.fromhex('550407'): 'L',
+    bytes.fromhex('550408'): 'S',
+    bytes.fromhex('55040a'): 'O',
+}
+PUBLISHER_ATTRIBUTES = ('O', 'L', 'S', 'C')
+
+STRING_ENCODINGS = {
+    0x0C: 'utf-8',       # UTF8String
+    0x13: 'ascii',       # PrintableString
+    0x16: 'ascii',       # IA5String
+    0x14: 'latin-1',     # T61String, as Windows decodes it
+    0x1E: 'utf-16-be',   # BMPString
+    0x1C: 'utf-32-be',   # UniversalString
+}
+
+# Characters that make CertNameToStr quote a value
+_QUOTE_CHARACTERS = set(',+="\n<>#;')
+
+class DERError(ValueError):
+    pass
+
+# One certificate of a chain; issuer and subject are raw DER Names
+Certificate = namedtuple('Certificate', ['issuer', 'serial', 'subject', 'publisher', 'is_ca'])
+
+def read_tlv(data, offset, end=None):
+    """(tag, content start, content end) of the DER element at `offset`"""
+    end = len(data) if end is None else end
+    if offset + 2 > end:
+        raise DERError("Truncated DER element")
+    tag = data[offset]
+    length = data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        count = length & 0x7F
+        if not count or count > 4:
+            # Indefinite (BER) or absurd lengths
+            raise DERError("Unsupported DER length")
+        if offset + count > end:
+            raise DERError("Truncated DER length")
+        length = int.from_bytes(bytes(data[offset:offset + count]), 'big')
+        offset += count
+    if offset + length > end:
+        raise DERError("DER element overruns its parent")
+    return tag, offset, offset + length
+
+def children(data, start, end):
+    """Yield (tag, content start, content end, element start) for the elements between start and end"""
+    offset = start
+    while offset < end:
+        tag, content_start, content_end = read_tlv(data, offset, end)
+        yield tag, content_start, content_end, offset
+        offset = content_end
+
+def _expect(element, tag):
+    if element is None or element[0] != tag:
+        raise DERError(f"Expected DER tag 0x{tag:02X}")
+    return element
+
+def _decode_string(tag, value):
+    encoding = STRING_ENCODINGS.get(tag)
+    if encoding is None:
+        return bytes(value).decode('latin-1')
+    return bytes(value).decode(encoding, 'replace')
+
+def name_attributes(name):
+    """(short name or dotted OID bytes, value) for every attribute of a DER Name, in order"""
+    _, start, end = read_tlv(name, 0)
+    attributes = []
+    for _, set_start, set_end, _ in children(name, start, end):
+        for _, pair_start, pair_end, _ in children(name, set_start, set_end):
+            pair = list(children(name, pair_start, pair_end))
+            if len(pair) < 2 or pair[0][0] != OBJECT_IDENTIFIER:
+                continue
+            oid = bytes(name[pair[0][1]:pair[0][2]])
+            attributes.append((ATTRIBUTE_NAMES.get(oid, oid), _decode_string(pair[1][0], name[pair[1][1]:pair[1][2]])))
+    return attributes
+
+def _quote(value):
+    if value != value.strip() or any(c in _QUOTE_CHARACTERS for c in value):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+def format_publisher_name(name):
+    """AppLocker PublisherName for a DER-encoded certificate subject"""
+    values = {}
+    for attribute, value in name_attributes(name):
+        # Multi-valued attributes keep their first value, as AppLocker does
+        if isinstance(attribute, str):
+            values.setdefault(attribute, value.strip().upper())
+    parts = []
+    for attribute in PUBLISHER_ATTRIBUTES:
+        if attribute == 'O' and 'O' not in values and 'CN' in values:
+            parts.append(f"CN={_quote(values['CN'])}")
+        elif attribute in values:
+            parts.append(f"{attribute}={_quote(values[attribute])}")
+    return ', '.join(parts)
+
+def parse_certificate(data, start=0, end=None):
+    """Certificate for the DER X.509 certificate at data[start:end]"""
+    _, cert_start, cert_end = _expect(read_tlv(data, start, end), SEQUENCE)
+    _, tbs_start, tbs_end = _expect(next(children(data, cert_start, cert_end), None), SEQUENCE)[:3]
+    fields = list(children(data, tbs_start, tbs_end))
+    if fields and fields[0][0] == CONTEXT_0:
+        fields = fields[1:]
+    if len(fields) < 6:
+        raise DERError("Incomplete TBSCertificate")
+    serial = bytes(data[_expect(fields[0], INTEGER)[1]:fields[0][2]])
+    issuer = bytes(data[_expect(fields[2], SEQUENCE)[3]:fields[2][2]])
+    subject = bytes(data[_expect(fields[4], SEQUENCE)[3]:fields[4][2]])
+    is_ca = False
+    for tag, field_start, field_end, _ in fields[6:]:
+        if tag != CONTEXT_3:
+            continue
+        _, extensions_start, extensions_end = _expect(next(children(data, field_start, field_end), None), SEQUENCE)[:3]
+        for _, extension_start, extension_end, _ in children(data, extensions_start, extensions_end):
+            parts = list(children(data, extension_start, extension_end))
+            if parts and parts[0][0] == OBJECT_IDENTIFIER and bytes(data[parts[0][1]:parts[0][2]]) == BASIC_CONSTRAINTS_OID:
+                _, value_start, value_end, _ = parts[-1]
+                _, constraints_start, constraints_end = read_tlv(data, value_start, value_end)
+                constraints = list(children(data, constraints_start, constraints_end))
+                is_ca = bool(constraints and constraints[0][0] == BOOLEAN and data[constraints[0][1]])
+    return Certificate(issuer, serial.lstrip(b'\0') or b'\0', subject, format_publisher_name(subject), is_ca)
+
+class SignerChain:
+    """The parsed certificate set of one signature, with the leaf signer picked out"""
+
+    def __init__(self, certificates):
+        self.certificates = certificates
+        self._by_issuer_serial = {(certificate.issuer, certificate.serial): certificate for certificate in certificates}
+
+    def signer(self, issuer, serial):
+        """Certificate named by a SignerInfo, or the most likely leaf when it is not in the set"""
+        certificate = self._by_issuer_serial.get((issuer, serial.lstrip(b'\0') or b'\0'))
+        if certificate is not None:
+            return certificate
+        # Fall back to an end-entity certificate that issued nothing else in the set
+        issuers = {certificate.issuer for certificate in self.certificates}
+        for certificate in self.certificates:
+            if not certificate.is_ca and certificate.subject not in issuers:
+                return certificate
+        return self.certificates[0] if self.certificates else None
+
+def parse_signer_chain(data, start, end):
+    certificates = []
+    for tag, _, _, element_start in children(data, start, end):
+        if tag == SEQUENCE:
+            _, _, element_end = read_tlv(data, element_start, end)
+            certificates.append(parse_certificate(data, element_start, element_end))
+    return SignerChain(certificates)
+
+class SignerChainCache:
+    """Bounded LRU of parsed certificate sets keyed by the SHA-256 of their DER bytes"""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0}
+        self._chains = OrderedDict()
+        # analyze_files() extracts publishers on a thread pool
+        self._lock = threading.Lock()
+
+    def chain(self, data, start, end):
+        key = hashlib.sha256(data[start:end]).digest()
+        with self._lock:
+            chain = self._chains.get(key)
+            if chain is not None:
+                self._chains.move_to_end(key)
+                self.stats['hits'] += 1
+                return chain
+            self.stats['misses'] += 1
+        chain = parse_signer_chain(data, start, end)
+        with self._lock:
+            self._chains[key] = chain
+            if len(self._chains) > self.max_entries:
+                self._chains.popitem(last=False)
+        return chain
+
+    def clear(self):
+        with self._lock:
+            self._chains.clear()
+
+# Process-wide cache shared by every file analyzed in this process
+signer_chain_cache = SignerChainCache()
+
+def read_signed_data(pkcs7):
+    """(certificate set bounds, [(issuer, serial)] of the SignerInfos) of a DER PKCS #7 SignedData"""
+    _, start, end = _expect(read_tlv(pkcs7, 0), SEQUENCE)
+    content_type, explicit = list(children(pkcs7, start, end))[:2]
+    if bytes(pkcs7[content_type[1]:content_type[2]]) != SIGNED_DATA_OID:
+        raise DERError("Not a PKCS #7 SignedData")
+    _, signed_start, signed_end = _expect(next(children(pkcs7, explicit[1], explicit[2]), None), SEQUENCE)[:3]
+    certificates = None
+    signers = []
+    fields = list(children(pkcs7, signed_start, signed_end))
+    for tag, field_start, field_end, _ in fields[3:]:
+        if tag == CERTIFICATES_IMPLICIT and certificates is None:
+            certificates = (field_start, field_end)
+        elif tag == SET:
+            for _, signer_start, signer_end, _ in children(pkcs7, field_start, field_end):
+                signer_fields = list(children(pkcs7, signer_start, signer_end))
+                if len(signer_fields) < 2 or signer_fields[1][0] != SEQUENCE:
+                    # subjectKeyIdentifier signers (CMS v3) are not used by Authenticode
+                    continue
+                issuer, serial = list(children(pkcs7, signer_fields[1][1], signer_fields[1][2]))[:2]
+                signers.append((bytes(pkcs7[issuer[3]:issuer[2]]), bytes(pkcs7[serial[1]:serial[2]])))
+    return certificates, signers
+
+def signer_certificate(pkcs7, cache=signer_chain_cache):
+    """Leaf signing Certificate of a DER Authenticode signature, or None"""
+    certificates, signers = read_signed_data(pkcs7)
+    if certificates is None:
+        return None
+    chain = cache.chain(pkcs7, *certificates) if cache is not None else parse_signer_chain(pkcs7, *certificates)
+    if signers:
+        return chain.signer(*signers[0])
+    return chain.signer(b'', b'')
+
+def authenticode_publisher(pkcs7, cache=signer_chain_cache):
+    """AppLocker PublisherName of the signer of a DER Authenticode signature, or None"""
+    certificate = signer_certificate(pkcs7, cache)
+    return certificate.publisher if certificate is not None else None
@@ -0,0 +1,163 @@
+"""Headless batch inspection of AppLocker policy exports
+
+Usage:
+    python -m applocker.batch C:\\Exports -o findings.csv
+    python -m applocker.batch ./exports -o findings.parquet --workers 16 --timings timings.csv
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import pandas as pd
+
+from applocker.cache import FindingsCache, policy_file_cache_key
+from applocker.inspector import FINDING_COLUMNS, inspect_policy_file
+
+OUTPUT_FORMATS = ('csv', 'json', 'parquet')
+
+def find_policy_files(root_dir, extensions=('.xml',)):
+    """Walk a directory tree and yield every policy export below it"""
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(extensions):
+                yield os.path.join(dirpath, filename)
+
+_worker_caches = {}
+
+def inspect_policy_file_cached(path, cache_dir):
+    """Inspect a policy file, reusing findings from the on-disk cache when its content is unchanged"""
+    cache = _worker_caches.get(cache_dir)
+    if cache is None:
+        # One disk-only cache per worker process; the memory tier would never be hit here
+        cache = _worker_caches[cache_dir] = FindingsCache(max_entries=0, disk_dir=cache_dir)
+    started = time.perf_counter()
+    try:
+        key = policy_file_cache_key(path)
+    except OSError:
+        return inspect_policy_file(path)
+    findings = cache.get(key)
+    if findings is not None:
+        return {'File': path, 'Findings': findings, 'Encoding': 'cached', 'Error': None, 'Seconds': time.perf_counter() - started}
+    result = inspect_policy_file(path)
+    if result['Error'] is None:
+        cache.put(key, result['Findings'])
+    return result
+
+def run_batch(paths, workers=None, chunksize=16, progress=None, cache_dir=None):
+    """Inspect policy files across a process pool
+
+    Yields one result dict per file, in input order. `progress`
+    is called with (files_done, elapsed_seconds) after every result. With a
+    `cache_dir`, files whose content was already inspected under the current
+    ruleset are served from the on-disk findings cache.
+    """
+    started = time.perf_counter()
+    done = 0
+    inspect = partial(inspect_policy_file_cached, cache_dir=cache_dir) if cache_dir else inspect_policy_file
+    if workers == 1:
+        results = map(inspect, paths)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(inspect, paths, chunksize=chunksize)
+    try:
+        for result in results:
+            done += 1
+            if progress is not None:
+                progress(done, time.perf_counter() - started)
+            yield result
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+def write_findings(rows, output_path, output_format):
+    """Write the combined findings as a CSV, JSON or Parquet file"""
+    df = pd.DataFrame(rows, columns=['SourceFile'] + FINDING_COLUMNS)
+    if output_format == 'csv':
+        df.to_csv(output_path, index=False)
+    elif output_format == 'json':
+        df.to_json(output_path, orient='records', indent=2)
+    elif output_format == 'parquet':
+        # pandas needs pyarrow (in requirements.txt) or fastparquet for Parquet output
+        df.to_parquet(output_path, index=False)
+    else:
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+def summarize_timings(timings, elapsed):
+    """Build the end-of-run summary lines"""
+    total = len(timings)
+    errors = sum(1 for t in timings if t['Error'])
+    lines = [
+        f"Files: {total} ({errors} failed)",
+        f"Elapsed: {elapsed:.2f}s",
+        f"Throughput: {total / elapsed if elapsed else 0:.1f} files/sec",
+    ]
+    if timings:
+        per_file = sorted(t['Seconds'] for t in timings)
+        lines.append(f"Per file: median {per_file[len(per_file) // 2] * 1000:.1f}ms, "
+                     f"p95 {per_file[min(len(per_file) - 1, int(len(per_file) * 0.95))] * 1000:.1f}ms, "
+                     f"max {per_file[-1] * 1000:.1f}ms")
+        slowest = sorted(timings, key=lambda t: t['Seconds'], reverse=True)[:5]
+        lines.append("Slowest files:")
+        lines.extend(f"  {t['Seconds'] * 1000:.1f}ms  {t['File']}" for t in slowest)
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect a directory tree of AppLocker policy exports and write one combined findings file.")
+    parser.add_argument('root', help="Directory containing AppLocker policy XML exports")
+    parser.add_argument('-o', '--output', required=True, help="Combined findings file (.csv, .json or .parquet)")
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, help="Output format (defaults to the output file extension)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Worker processes (default: CPU count, 1 disables the pool)")
+    parser.add_argument('--chunksize', type=int, default=16, help="Files handed to a worker at a time")
+    parser.add_argument('--timings', help="Optional CSV file for per-file timing and errors")
+    parser.add_argument('--cache-dir', help="Reuse findings for unchanged exports from this on-disk cache")
+    parser.add_argument('--progress-every', type=int, default=1000, help="Print a progress line every N files (0 disables)")
+    args = parser.parse_args(argv)
+
+    output_format = args.format or os.path.splitext(args.output)[1].lstrip('.').lower()
+    if output_format not in OUTPUT_FORMATS:
+        parser.error(f"Cannot infer output format from '{args.output}', use --format")
+
+    paths = list(find_policy_files(args.root))
+    if not paths:
+        print(f"No policy files found under {args.root}", file=sys.stderr)
+        return 1
+
+    def progress(done, elapsed):
+        if args.progress_every and done % args.progress_every == 0:
+            rate = done / elapsed if elapsed else 0
+            remaining = (len(paths) - done) / rate if rate else 0
+            print(f"{done}/{len(paths)} files, {rate:.1f} files/sec, ~{remaining:.0f}s remaining", file=sys.stderr)
+
+    started = time.perf_counter()
+    rows = []
+    timings = []
+    for result in run_batch(paths, workers=args.workers, chunksize=args.chunksize, progress=progress, cache_dir=args.cache_dir):
+        for finding in result['Findings']:
+            rows.append({'SourceFile': result['File'], **finding})
+        timings.append({
+            'File': result['File'],
+            'Seconds': result['Seconds'],
+            'Findings': len(result['Findings']),
+            'Encoding': result['Encoding'],
+            'Error': result['Error'],
+        })
+        if result['Error']:
+            print(f"{result['File']}: {result['Error']}", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+
+    write_findings(rows, args.output, output_format)
+    if args.timings:
+        pd.DataFrame(timings).to_csv(args.timings, index=False)
+
+    for line in summarize_timings(timings, elapsed):
+        print(line)
+    print(f"Findings: {len(rows)} written to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""Content-addressed cache of Inspector findings
+
+Entries are keyed by the SHA-256 of the raw policy bytes plus the Inspector
+ruleset version, so an unchanged export is never analyzed twice and a change
+to the checks invalidates everything at once.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from applocker.inspector import RULESET_VERSION
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def policy_cache_key(raw_content, ruleset_version=RULESET_VERSION):
+    """Key a raw policy upload by content hash and ruleset version"""
+    return f"{ruleset_version}-{hashlib.sha256(raw_content).hexdigest()}"
+
+def policy_file_cache_key(path, ruleset_version=RULESET_VERSION):
+    """Key a policy file on disk without reading it into memory"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as policy_file:
+        # Chunked rather than hashlib.file_digest(), which needs Python 3.11
+        for chunk in iter(lambda: policy_file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return f"{ruleset_version}-{digest.hexdigest()}"
+
+class FindingsCache:
+    """In-memory LRU tier with an optional on-disk tier bounded by total size
+
+    Disk entries are JSON. `encode`/`decode` convert findings that are not
+    JSON-serializable themselves, such as DataFrames, on the way to and from disk.
+    """
+
+    def __init__(self, max_entries=32, disk_dir=None, max_disk_bytes=256 * 1024 * 1024, encode=None, decode=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.encode = encode
+        self.decode = decode
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+
+    def get(self, key):
+        """Return cached findings for a key, or None on a miss"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return self._memory[key]
+
+        findings = self._read_disk(key)
+        with self._lock:
+            if findings is None:
+                self.stats['misses'] += 1
+                return None
+            self.stats['disk_hits'] += 1
+            self._remember(key, findings)
+        return findings
+
+    def put(self, key, findings):
+        """Store findings in both tiers"""
+        with self._lock:
+            self._remember(key, findings)
+        if self.disk_dir:
+            self._write_disk(key, findings)
+
+    def get_or_compute(self, key, compute):
+        """Return cached findings, or compute, store and return them"""
+        findings = self.get(key)
+        if findings is None:
+            findings = compute()
+            self.put(key, findings)
+        return findings
+
+    def hit_ratio(self):
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        total = hits + self.stats['misses']
+        return hits / total if total else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.disk_dir:
+                for path, _, _ in self._disk_entries():
+                    os.remove(path)
+                self._disk_bytes = 0
+
+    def _remember(self, key, findings):
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = findings
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _disk_entries(self):
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.is_file() and entry.name.endswith('.json'):
+                stat = entry.stat()
+                entries.append((entry.path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as cache_file:
+                findings = json.load(cache_file)
+            if self.decode is not None:
+                findings = self.decode(findings)
+            # Refresh the mtime so size-based eviction drops the least recently used files first
+            os.utime(path)
+            return findings
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, findings):
+        path = self._disk_path(key)
+        # Write to a temp file and rename so concurrent readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as cache_file:
+                json.dump(self.encode(findings) if self.encode is not None else findings, cache_file)
+            size = os.path.getsize(temp_path)
+            # An overwritten entry's bytes are replaced, not added to
+            replaced_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        with self._lock:
+            self._disk_bytes += size - replaced_size
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self):
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[1])
+        self._disk_bytes = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._disk_bytes -= size
+            self.stats['evictions'] += 1
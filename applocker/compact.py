@@ -0,0 +1,208 @@
+"""Policy compaction: hash rules collapsed into publisher rules and multi-hash rules
+
+The EXE generator writes one FileHashRule per file. Compaction regroups the
+hash rules of each collection by action and principal:
+
+- Hashes are merged into FileHashRules with up to `max_hashes_per_rule`
+  FileHash entries under one FileHashCondition, which matches exactly the
+  same files.
+- Only with `collapse_publishers`, Allow hashes whose files are known to the
+  PE metadata cache are first grouped by signer, product and binary name. A
+  group of at least `min_files` files with a known version and product name
+  becomes a single FilePublisherRule whose version range spans the versions
+  seen. That rule also allows builds within the range that were never
+  hashed, so it is opt-in, and Deny hash rules are never collapsed.
+
+Rules with exceptions and all other rule types are written unchanged, rules
+first and then the collection's other children (RuleCollectionExtensions),
+as the schema orders them.
+
+Usage:
+    python -m applocker.compact applocker_exe_policy.xml -o applocker_exe_policy_compact.xml
+    python -m applocker.compact applocker_exe_policy.xml -o applocker_exe_policy_compact.xml --publisher-rules --cache-dir C:\\AppLockerGenCache
+"""
+import argparse
+import io
+import os
+import sys
+import uuid
+import xml.etree.ElementTree as ET
+
+from applocker.exe_policy import describe_covered_files, multi_hash_rule
+from applocker.filecache import FileMetadataCache
+from applocker.rules import parse_version
+from applocker.stream import RULE_TYPES, iter_policy_events
+from applocker.xmlwriter import PolicyWriter
+
+MIN_PUBLISHER_FILES = 2
+MAX_HASHES_PER_RULE = 1000
+
+class RecordMetadata:
+    """Metadata of analyze_file() records, looked up like FileMetadataCache.lookup_file_hash()"""
+
+    def __init__(self, records):
+        self._metadata = {}
+        for record in records:
+            for file_hash in (record['hash'], record.get('authenticode_hash')):
+                if file_hash:
+                    self._metadata.setdefault((file_hash.lower(), int(record['length'])), record)
+
+    def lookup_file_hash(self, file_hash, size):
+        return self._metadata.get((file_hash, size))
+
+def _binary_name(metadata, file_name):
+    # Same choice as the EXE policy generator
+    internal_name = metadata.get('internal_name') or ''
+    return internal_name if '.' in internal_name else file_name
+
+class _HashPool:
+    """Hash rules of one collection awaiting compaction, by (action, principal)"""
+
+    def __init__(self):
+        # (action, principal) -> {(hash type, data): (FileHash element, source rule)}
+        self.entries = {}
+
+    def add(self, rule):
+        entries = self.entries.setdefault((rule.get('Action', ''), rule.get('UserOrGroupSid', '')), {})
+        for file_hash in rule.iter('FileHash'):
+            entries.setdefault((file_hash.get('Type', ''), file_hash.get('Data', '').upper()), (file_hash, rule))
+
+def _publisher_groups(entries, metadata_cache, min_files):
+    """{(publisher, product, binary): [(key, version, file name)]} for the hashes that can be collapsed"""
+    groups = {}
+    for key, (file_hash, _) in entries.items():
+        hash_type, data = key
+        length = file_hash.get('SourceFileLength', '')
+        if hash_type != 'SHA256' or not length.isdigit():
+            continue
+        sha256 = data[2:] if data.startswith('0X') else data
+        metadata = metadata_cache.lookup_file_hash(sha256.lower(), int(length))
+        # Files without a version or product stay hash rules rather than open up the rule
+        if not metadata or not metadata.get('publisher') or not metadata.get('version') or not metadata.get('product_name'):
+            continue
+        file_name = file_hash.get('SourceFileName', '')
+        group_key = (metadata['publisher'], metadata['product_name'], _binary_name(metadata, file_name))
+        groups.setdefault(group_key, []).append((key, metadata['version'], file_name))
+    return {group_key: files for group_key, files in groups.items() if len(files) >= min_files}
+
+def _write_pool(writer, pool, metadata_cache, min_files, max_hashes_per_rule, collapse_publishers, report):
+    for (action, principal), entries in pool.entries.items():
+        if action == 'Allow' and collapse_publishers and metadata_cache is not None:
+            for (publisher, product_name, binary_name), files in _publisher_groups(entries, metadata_cache, min_files).items():
+                versions = sorted((version for _, version, _ in files), key=parse_version)
+                rule = ET.Element("FilePublisherRule", Id=str(uuid.uuid4()), Name="Publisher Rule for " + binary_name, Description=describe_covered_files(name for _, _, name in files), UserOrGroupSid=principal, Action=action)
+                conditions = ET.SubElement(rule, "Conditions")
+                condition = ET.SubElement(conditions, "FilePublisherCondition", PublisherName=publisher, ProductName=product_name, BinaryName=binary_name)
+                ET.SubElement(condition, "BinaryVersionRange", LowSection=versions[0], HighSection=versions[-1])
+                writer.element(rule)
+                report['rules_after'] += 1
+                report['publisher_rules'] += 1
+                report['hashes_collapsed'] += len(files)
+                for key, _, _ in files:
+                    del entries[key]
+
+        if not entries:
+            continue
+        source_rules = {id(rule): rule for _, rule in entries.values()}
+        if len(source_rules) == 1:
+            rule = next(iter(source_rules.values()))
+            if sum(1 for _ in rule.iter('FileHash')) == len(entries):
+                # Nothing to merge or collapse; keep the rule as it was
+                writer.element(rule)
+                report['rules_after'] += 1
+                continue
+
+        remaining = sorted(entries.items())
+        for start in range(0, len(remaining), max_hashes_per_rule):
+            chunk = remaining[start:start + max_hashes_per_rule]
+            writer.element(multi_hash_rule([(file_hash, file_hash.get('SourceFileName', '')) for _, (file_hash, _) in chunk], action, principal))
+            report['rules_after'] += 1
+            report['merged_hash_rules'] += 1
+
+def write_compacted_policy(source, out, metadata_cache=None, min_files=MIN_PUBLISHER_FILES, max_hashes_per_rule=MAX_HASHES_PER_RULE, collapse_publishers=False):
+    """Stream a policy (path, bytes, text or file object) to `out` with its hash rules compacted
+
+    `metadata_cache` is anything with FileMetadataCache's lookup_file_hash(),
+    such as a FileMetadataCache or RecordMetadata; it is only consulted with
+    `collapse_publishers`. Returns a report of rule counts.
+    """
+    report = {'rules_before': 0, 'rules_after': 0, 'hash_rules_before': 0, 'publisher_rules': 0, 'hashes_collapsed': 0, 'merged_hash_rules': 0}
+    writer = PolicyWriter(out)
+    pool = None
+    # Non-rule children of the open collection, written after its rules
+    held = []
+
+    def close_collection():
+        _write_pool(writer, pool, metadata_cache, min_files, max_hashes_per_rule, collapse_publishers, report)
+        for elem in held:
+            writer.element(elem)
+        held.clear()
+        writer.end()
+
+    for event, collection_type, elem in iter_policy_events(source):
+        if event == 'policy':
+            writer.start(elem.tag, dict(elem.attrib))
+        elif event == 'collection':
+            if pool is not None:
+                close_collection()
+            writer.start(elem.tag, dict(elem.attrib))
+            pool = _HashPool()
+        elif event == 'rule':
+            if elem.tag not in RULE_TYPES:
+                held.append(elem)
+                continue
+            report['rules_before'] += 1
+            has_exceptions = any(section.tag == 'Exceptions' and len(section) for section in elem)
+            if elem.tag == 'FileHashRule' and not has_exceptions:
+                report['hash_rules_before'] += 1
+                pool.add(elem)
+                continue
+            writer.element(elem)
+            report['rules_after'] += 1
+            elem.clear()
+    if pool is not None:
+        close_collection()
+    writer.close()
+    return report
+
+def compact_policy(xml_content, metadata_cache=None, min_files=MIN_PUBLISHER_FILES, max_hashes_per_rule=MAX_HASHES_PER_RULE, collapse_publishers=False):
+    """Compacted policy text and a report including XML sizes in bytes before and after"""
+    buffer = io.StringIO()
+    report = write_compacted_policy(xml_content, buffer, metadata_cache, min_files, max_hashes_per_rule, collapse_publishers)
+    compacted = buffer.getvalue()
+    report['bytes_before'] = len(xml_content.encode('utf-8')) if isinstance(xml_content, str) else len(xml_content)
+    report['bytes_after'] = len(compacted.encode('utf-8'))
+    return compacted, report
+
+def format_report(report):
+    return (f"Rules: {report['rules_before']} -> {report['rules_after']} "
+            f"({report['hashes_collapsed']} hashes collapsed into {report['publisher_rules']} publisher rules, "
+            f"the rest merged into {report['merged_hash_rules']} hash rules); "
+            f"XML: {report['bytes_before']:,} -> {report['bytes_after']:,} bytes")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compact an AppLocker policy: merge hash rules into multi-hash rules and optionally collapse signed files into publisher rules.")
+    parser.add_argument('policy', help="Policy XML")
+    parser.add_argument('-o', '--output', required=True, help="Compacted policy XML to write")
+    parser.add_argument('--publisher-rules', action='store_true', help="Collapse Allow hashes of signed files sharing a publisher, product and binary name into one publisher rule spanning their versions; this also allows unhashed builds in that range")
+    parser.add_argument('--cache-dir', help="Directory holding the file_metadata.sqlite written by the EXE policy generator; needed by --publisher-rules")
+    parser.add_argument('--min-files', type=int, default=MIN_PUBLISHER_FILES, help=f"Files of one signer and binary needed to collapse them into a publisher rule (default: {MIN_PUBLISHER_FILES})")
+    parser.add_argument('--max-hashes-per-rule', type=int, default=MAX_HASHES_PER_RULE, help=f"FileHash entries per merged hash rule (default: {MAX_HASHES_PER_RULE})")
+    args = parser.parse_args(argv)
+    if args.publisher_rules and not args.cache_dir:
+        parser.error("--publisher-rules needs --cache-dir")
+
+    cache = FileMetadataCache(os.path.join(args.cache_dir, 'file_metadata.sqlite')) if args.cache_dir else None
+    try:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            report = write_compacted_policy(args.policy, f, cache, args.min_files, args.max_hashes_per_rule, args.publisher_rules)
+    finally:
+        if cache is not None:
+            cache.close()
+    report['bytes_before'] = os.path.getsize(args.policy)
+    report['bytes_after'] = os.path.getsize(args.output)
+    print(format_report(report))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""Allow/Deny conflict detection across many AppLocker policies
+
+Rules are bucketed in hashed indexes keyed by what they match: each file hash,
+each (publisher, product, binary) tuple and each normalized path. Only rules
+sharing a bucket are ever compared, so detection stays near-linear in the
+total number of rules. Publisher rules keep their version range within the
+bucket and only conflict where the ranges overlap. Matching is otherwise by
+exact key; overlap between wildcard paths is not considered here.
+"""
+import re
+
+from applocker.rules import UNBOUNDED_VERSION, parse_version
+from applocker.stream import iter_policy_events
+
+EVERYONE_SID = 'S-1-1-0'
+
+# Rule references kept per bucket for the report; counts are always exact
+MAX_EXAMPLES = 5
+
+def normalize_rule_path(path):
+    """Case-fold a path condition and drop doubled and trailing separators"""
+    path = re.sub(r'\\{2,}', r'\\', path.strip().lower())
+    return path.rstrip('\\') or path
+
+def _version_range(condition):
+    version_range = condition.find('BinaryVersionRange')
+    if version_range is None:
+        return (0, 0, 0, 0), UNBOUNDED_VERSION
+    return parse_version(version_range.get('LowSection')), parse_version(version_range.get('HighSection'), UNBOUNDED_VERSION)
+
+def condition_keys(rule):
+    """Yield (condition_type, key, version range) for every condition a rule matches on
+
+    The version range is (low, high) for publisher conditions and None otherwise.
+    """
+    conditions = rule.find('Conditions')
+    if conditions is None:
+        return
+    for condition in conditions:
+        if condition.tag == 'FileHashCondition':
+            for file_hash in condition.iter('FileHash'):
+                yield 'Hash', (file_hash.get('Type', ''), file_hash.get('Data', '').upper()), None
+        elif condition.tag == 'FilePublisherCondition':
+            yield 'Publisher', (
+                condition.get('PublisherName', '').lower(),
+                condition.get('ProductName', '').lower(),
+                condition.get('BinaryName', '').lower(),
+            ), _version_range(condition)
+        elif condition.tag == 'FilePathCondition':
+            yield 'Path', normalize_rule_path(condition.get('Path', '')), None
+
+def _ranges_overlap(first, second):
+    return first is None or second is None or (first[0] <= second[1] and second[0] <= first[1])
+
+def _overlapping(entries, others):
+    """[count, examples] of the entries whose version range overlaps any range in `others`"""
+    count = 0
+    examples = []
+    for version_range, (range_count, range_examples) in entries.items():
+        if any(_ranges_overlap(version_range, other) for other in others):
+            count += range_count
+            examples.extend(range_examples[:MAX_EXAMPLES - len(examples)])
+    return [count, examples] if count else None
+
+def _format_versions(entries):
+    versions = []
+    for version_range in sorted(version_range for version_range in entries if version_range is not None):
+        low, high = ('.'.join(map(str, version)) if version != UNBOUNDED_VERSION else '*' for version in version_range)
+        versions.append(f"{low}-{high}")
+    return ', '.join(versions)
+
+def format_condition_key(condition_type, key):
+    if condition_type == 'Hash':
+        return f"{key[0]}: {key[1]}"
+    if condition_type == 'Publisher':
+        return f"Publisher='{key[0]}'; Product='{key[1]}'; Binary='{key[2]}'"
+    return key
+
+class ConflictIndex:
+    """Hashed indexes of rules by match key, principal and action"""
+
+    def __init__(self):
+        # (collection, condition_type, key) -> principal -> action -> version range -> [count, examples]
+        self._buckets = {}
+
+    def add_rule(self, collection_type, rule, label=''):
+        principal = rule.get('UserOrGroupSid', '').upper()
+        action = rule.get('Action', '')
+        if action not in ('Allow', 'Deny'):
+            return
+        # A Deny with exceptions may carve out exactly the file an Allow targets
+        exceptions = rule.find('Exceptions')
+        if action == 'Deny' and exceptions is not None and len(exceptions):
+            return
+        reference = f"{rule.get('Name', '')} [{rule.get('Id', '')}]" + (f" in {label}" if label else '')
+        for condition_type, key, version_range in condition_keys(rule):
+            by_principal = self._buckets.setdefault((collection_type, condition_type, key), {})
+            entry = by_principal.setdefault(principal, {}).setdefault(action, {}).setdefault(version_range, [0, []])
+            entry[0] += 1
+            if len(entry[1]) < MAX_EXAMPLES:
+                entry[1].append(reference)
+
+    def add_policy(self, source, label=''):
+        for event, collection_type, elem in iter_policy_events(source):
+            if event == 'rule':
+                self.add_rule(collection_type, elem, label)
+                elem.clear()
+        return self
+
+    def findings(self):
+        """Contradictory (same principal) and shadowed (Deny for Everyone) rule sets"""
+        findings = []
+        for (collection_type, condition_type, key), by_principal in self._buckets.items():
+            if len(by_principal) == 1:
+                actions = next(iter(by_principal.values()))
+                if len(actions) < 2:
+                    continue
+            everyone_deny = by_principal.get(EVERYONE_SID, {}).get('Deny')
+            for principal, actions in by_principal.items():
+                allows = actions.get('Allow')
+                if allows is None:
+                    continue
+                denies = actions.get('Deny')
+                kind = 'Contradiction'
+                detail = "Allow and Deny rules for the same principal both match these files; Deny wins for them."
+                if denies is None or _overlapping(allows, denies) is None:
+                    kind = 'Shadowed'
+                    denies = everyone_deny
+                    detail = "A Deny for Everyone also matches these files, so the Allow rules never take effect for them."
+                    if denies is None:
+                        continue
+                allow = _overlapping(allows, denies)
+                if allow is None:
+                    continue
+                deny = _overlapping(denies, allows)
+                condition = format_condition_key(condition_type, key)
+                if condition_type == 'Publisher':
+                    condition += f"; Allow versions {_format_versions(allows)}; Deny versions {_format_versions(denies)}"
+                findings.append({
+                    'Kind': kind,
+                    'Collection': collection_type,
+                    'ConditionType': condition_type,
+                    'Condition': condition,
+                    'Principal': principal,
+                    'AllowRules': allow[0],
+                    'DenyRules': deny[0],
+                    'AllowExamples': '; '.join(allow[1]),
+                    'DenyExamples': '; '.join(deny[1]),
+                    'Detail': detail,
+                })
+        return findings
+
+def find_rule_conflicts(sources):
+    """Index every rule of every (source, label) pair and return the conflict findings"""
+    index = ConflictIndex()
+    for source, label in sources:
+        index.add_policy(source, label)
+    return index.findings()
@@ -0,0 +1,185 @@
+"""Structural diff between two versions of an AppLocker policy
+
+Both policies are streamed once. Each side is indexed per RuleCollection by
+rule Id and by canonical content hash (see applocker.rules), so a diff is
+linear in the number of rules. Rules present under the same Id are compared
+field by field; the leftovers on each side are paired by content hash to find
+rules that were only given a new Id (re-GUIDed), and what remains is added or
+removed.
+
+Usage:
+    python -m applocker.diff old_policy.xml new_policy.xml -o policy_diff.csv --fail-on Removed,Modified,EnforcementMode
+"""
+import argparse
+import csv
+import hashlib
+import json
+import sys
+
+from applocker.rules import rule_content_key
+from applocker.stream import iter_policy_events
+
+CHANGE_KINDS = ('CollectionAdded', 'CollectionRemoved', 'EnforcementMode', 'Added', 'Removed', 'Modified', 'ReGUIDed')
+DIFF_COLUMNS = ['Change', 'Collection', 'RuleType', 'RuleId', 'OldRuleId', 'RuleName', 'Detail']
+
+# Fields compared for rules with the same Id, in report order
+_COMPARED_FIELDS = ('RuleType', 'Action', 'UserOrGroupSid', 'Conditions', 'Name', 'Description')
+
+def _digest(value):
+    return hashlib.blake2b(repr(value).encode('utf-8'), digest_size=16).digest()
+
+def _rule_summary(rule):
+    content_key = rule_content_key(rule)
+    return {
+        'Id': rule.get('Id', ''),
+        'RuleType': rule.tag,
+        'Action': rule.get('Action', ''),
+        'UserOrGroupSid': rule.get('UserOrGroupSid', '').upper(),
+        # Digests only: the full canonical conditions of 100k rules would dominate memory
+        'Conditions': _digest(content_key[3:]),
+        'Name': rule.get('Name', ''),
+        'Description': rule.get('Description', ''),
+        # Same value as rule_content_hash(), without canonicalizing the conditions twice
+        'ContentHash': _digest(content_key),
+    }
+
+class PolicyIndex:
+    """Rules of one policy by (collection, Id), plus the collections' enforcement modes"""
+
+    def __init__(self):
+        self.collections = {}
+        # (collection, normalized Id) -> summary, in document order
+        self.rules = {}
+        self.duplicate_ids = 0
+
+    def add_policy(self, source):
+        for event, collection_type, elem in iter_policy_events(source):
+            if event == 'collection':
+                self.collections.setdefault(collection_type, elem.get('EnforcementMode', 'NotConfigured'))
+            elif event == 'rule':
+                key = (collection_type, elem.get('Id', '').strip('{}').lower())
+                if key in self.rules:
+                    self.duplicate_ids += 1
+                else:
+                    self.rules[key] = _rule_summary(elem)
+                elem.clear()
+        return self
+
+def _change(kind, collection, summary, detail, old_id=''):
+    return {
+        'Change': kind,
+        'Collection': collection,
+        'RuleType': summary['RuleType'] if summary else '',
+        'RuleId': summary['Id'] if summary else '',
+        'OldRuleId': old_id,
+        'RuleName': summary['Name'] if summary else '',
+        'Detail': detail,
+    }
+
+def _describe_changes(old, new):
+    changes = []
+    for field in _COMPARED_FIELDS:
+        if old[field] == new[field]:
+            continue
+        if field == 'Conditions':
+            changes.append("Conditions/Exceptions changed")
+        else:
+            changes.append(f"{field}: '{old[field]}' -> '{new[field]}'")
+    return '; '.join(changes)
+
+def diff_indexes(old, new):
+    """List of change dicts (DIFF_COLUMNS) turning policy `old` into `new`"""
+    changes = []
+    for collection, mode in new.collections.items():
+        old_mode = old.collections.get(collection)
+        if old_mode is None:
+            changes.append(_change('CollectionAdded', collection, None, f"EnforcementMode {mode}"))
+        elif old_mode != mode:
+            changes.append(_change('EnforcementMode', collection, None, f"{old_mode} -> {mode}"))
+    for collection, mode in old.collections.items():
+        if collection not in new.collections:
+            changes.append(_change('CollectionRemoved', collection, None, f"EnforcementMode {mode}"))
+
+    # Rules only on one side, by content hash, to pair up re-GUIDed rules
+    removed_by_content = {}
+    for key, summary in old.rules.items():
+        if key not in new.rules:
+            removed_by_content.setdefault((key[0], summary['ContentHash']), []).append(key)
+    # Pop from the end to pair duplicates in document order without quadratic list shifts
+    for keys in removed_by_content.values():
+        keys.reverse()
+
+    regenerated = set()
+    for key, summary in new.rules.items():
+        collection = key[0]
+        old_summary = old.rules.get(key)
+        if old_summary is not None:
+            detail = _describe_changes(old_summary, summary)
+            if detail:
+                changes.append(_change('Modified', collection, summary, detail))
+            continue
+        candidates = removed_by_content.get((collection, summary['ContentHash']))
+        if candidates:
+            old_key = candidates.pop()
+            regenerated.add(old_key)
+            old_summary = old.rules[old_key]
+            detail = "Same conditions, action and principal under a new Id"
+            if old_summary['Name'] != summary['Name']:
+                detail += f"; Name: '{old_summary['Name']}' -> '{summary['Name']}'"
+            changes.append(_change('ReGUIDed', collection, summary, detail, old_summary['Id']))
+        else:
+            changes.append(_change('Added', collection, summary, f"{summary['Action']} for {summary['UserOrGroupSid']}"))
+
+    for key, summary in old.rules.items():
+        if key not in new.rules and key not in regenerated:
+            changes.append(_change('Removed', key[0], summary, f"{summary['Action']} for {summary['UserOrGroupSid']}"))
+    return changes
+
+def diff_policies(old_source, new_source):
+    """Structural changes between two policies (paths, bytes, XML text or file objects)"""
+    return diff_indexes(PolicyIndex().add_policy(old_source), PolicyIndex().add_policy(new_source))
+
+def summarize_changes(changes):
+    """Count of changes per kind, every kind included"""
+    counts = dict.fromkeys(CHANGE_KINDS, 0)
+    for change in changes:
+        counts[change['Change']] += 1
+    return counts
+
+def write_changes(changes, output_path):
+    if output_path.lower().endswith('.json'):
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(changes, f, indent=2)
+        return
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=DIFF_COLUMNS)
+        writer.writeheader()
+        writer.writerows(changes)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Structural diff of two AppLocker policies; exits 1 when changes of the --fail-on kinds are found.")
+    parser.add_argument('old', help="Baseline policy XML")
+    parser.add_argument('new', help="Changed policy XML")
+    parser.add_argument('-o', '--output', help="Write the changes to a .csv or .json file")
+    parser.add_argument('--fail-on', default=','.join(CHANGE_KINDS), help=f"Comma-separated change kinds that fail the run, or 'none' (default: all of {', '.join(CHANGE_KINDS)})")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Print only the summary")
+    args = parser.parse_args(argv)
+
+    fail_on = set() if args.fail_on.lower() == 'none' else {kind.strip() for kind in args.fail_on.split(',') if kind.strip()}
+    unknown = fail_on - set(CHANGE_KINDS)
+    if unknown:
+        parser.error(f"unknown change kinds: {', '.join(sorted(unknown))}")
+
+    changes = diff_policies(args.old, args.new)
+    if args.output:
+        write_changes(changes, args.output)
+    if not args.quiet:
+        for change in changes:
+            rule = f" {change['RuleType']} {change['RuleId']} '{change['RuleName']}'" if change['RuleId'] else ''
+            print(f"{change['Change']:<17} {change['Collection']}{rule}: {change['Detail']}")
+    counts = summarize_changes(changes)
+    print(', '.join(f"{kind}: {count}" for kind, count in counts.items()))
+    return 1 if any(counts[kind] for kind in fail_on) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,367 @@
+"""Offline AppLocker policy evaluation, the equivalent of Test-AppLockerPolicy
+
+A policy is compiled once into lookup structures per rule collection:
+
+- hash conditions: a dict from digest to rules
+- publisher conditions: a publisher -> product -> binary index, '*' levels
+  included, whose leaves hold the version ranges
+- path conditions: exact paths in a dict, folder rules ('C:\\Windows\\*') in a
+  dict probed with each ancestor of the file, and only the remaining wildcard
+  patterns as compiled regexes
+
+AppLocker path variables (%WINDIR%, %PROGRAMFILES%, ...) are expanded on both
+sides, so a query for '%OSDRIVE%\\Tools\\a.exe' from an event log and one for
+'C:\\Tools\\a.exe' from an inventory get the same answer.
+
+Usage:
+    python -m applocker.evaluate policy.xml --path C:\\Tools\\a.exe --publisher "O=CONTOSO, C=US" --version 1.2.0.0
+    python -m applocker.evaluate policy.xml --inventory inventory.csv -o decisions.csv
+"""
+import argparse
+import csv
+import re
+import sys
+import time
+from collections import namedtuple
+
+from applocker.rules import UNBOUNDED_VERSION, parse_fqbn, parse_version
+from applocker.stream import iter_policy_events
+
+EVERYONE_SID = 'S-1-1-0'
+
+# How AppLocker's path variables expand on a default 64-bit install
+DEFAULT_PATH_VARIABLES = {
+    '%OSDRIVE%': ['C:'],
+    '%WINDIR%': ['C:\\Windows'],
+    '%SYSTEM32%': ['C:\\Windows\\System32', 'C:\\Windows\\SysWOW64'],
+    '%PROGRAMFILES%': ['C:\\Program Files', 'C:\\Program Files (x86)'],
+}
+
+# Which rule collection governs a file, by extension
+COLLECTION_EXTENSIONS = {
+    'Exe': ('.exe', '.com'),
+    'Dll': ('.dll', '.ocx'),
+    'Msi': ('.msi', '.msp', '.mst'),
+    'Script': ('.ps1', '.bat', '.cmd', '.vbs', '.js'),
+    'Appx': ('.appx', '.msix'),
+}
+_EXTENSION_COLLECTIONS = {extension: collection for collection, extensions in COLLECTION_EXTENSIONS.items() for extension in extensions}
+
+_VARIABLE_RE = re.compile(r'^%[A-Z0-9_]+%', re.IGNORECASE)
+
+# One normalized file to evaluate; see make_query()
+FileQuery = namedtuple('FileQuery', ['path', 'file_hash', 'publisher', 'product', 'binary', 'version', 'sids', 'collection'])
+
+def collection_for_path(path):
+    """Rule collection for a file from its extension, or None"""
+    dot = path.rfind('.')
+    return _EXTENSION_COLLECTIONS.get(path[dot:].lower()) if dot != -1 else None
+
+def expand_path(path, variables=DEFAULT_PATH_VARIABLES):
+    """Lowercased, backslash-separated forms of a path with its leading variable expanded"""
+    path = path.strip().replace('/', '\\')
+    match = _VARIABLE_RE.match(path)
+    if match is None:
+        return [path.lower()]
+    # Unknown variables such as %REMOVABLE% and %HOT% only match themselves
+    expansions = variables.get(match.group(0).upper(), [match.group(0)])
+    return [(expansion + path[match.end():]).lower() for expansion in expansions]
+
+def make_query(path='', file_hash='', publisher='', product='', binary='', version='', sids=(), collection=None, variables=DEFAULT_PATH_VARIABLES):
+    """Normalize one file for CompiledPolicy.evaluate()
+
+    `publisher` may also be an event-log Fqbn ('O=...\\PRODUCT\\BINARY\\VERSION'),
+    which fills product, binary and version. Everyone is always among the SIDs.
+    The binary name defaults to the file name.
+    """
+    if publisher and '\\' in publisher:
+        signer = parse_fqbn(publisher)
+        if signer is not None:
+            publisher, product, binary, version = signer
+    elif publisher == '-':
+        publisher = ''
+    file_name = path.replace('/', '\\').rsplit('\\', 1)[-1]
+    file_hash = file_hash.strip().upper()
+    if file_hash.startswith('0X'):
+        file_hash = file_hash[2:]
+    sids = {sid.strip().upper() for sid in sids if sid.strip()}
+    sids.add(EVERYONE_SID)
+    return FileQuery(
+        expand_path(path, variables)[0] if path else '',
+        file_hash,
+        publisher.strip().lower(),
+        product.strip().lower(),
+        (binary or file_name).strip().lower(),
+        parse_version(version),
+        frozenset(sids),
+        collection or collection_for_path(path),
+    )
+
+def _path_regex(pattern):
+    return re.compile(''.join('.*' if c == '*' else '.' if c == '?' else re.escape(c) for c in pattern), re.DOTALL)
+
+class ConditionIndex:
+    """Lookup structures for the conditions of many rules, answering which rules match a file"""
+
+    def __init__(self, variables=DEFAULT_PATH_VARIABLES):
+        self.variables = variables
+        self.hashes = {}
+        # publisher -> product -> binary -> [(low, high, rule)]
+        self.publishers = {}
+        self.exact_paths = {}
+        self.folder_paths = {}
+        self.any_path = []
+        self.wildcard_paths = []
+
+    def add(self, condition, rule):
+        if condition.tag == 'FileHashCondition':
+            for file_hash in condition.iter('FileHash'):
+                data = file_hash.get('Data', '').upper()
+                if data.startswith('0X'):
+                    data = data[2:]
+                self.hashes.setdefault(data, []).append(rule)
+        elif condition.tag == 'FilePublisherCondition':
+            version_range = condition.find('BinaryVersionRange')
+            low = parse_version(version_range.get('LowSection') if version_range is not None else '*')
+            high = parse_version(version_range.get('HighSection') if version_range is not None else '*', UNBOUNDED_VERSION)
+            products = self.publishers.setdefault(condition.get('PublisherName', '*').lower(), {})
+            binaries = products.setdefault(condition.get('ProductName', '*').lower(), {})
+            binaries.setdefault(condition.get('BinaryName', '*').lower(), []).append((low, high, rule))
+        elif condition.tag == 'FilePathCondition':
+            for pattern in expand_path(condition.get('Path', ''), self.variables):
+                if pattern.endswith('\\'):
+                    pattern += '*'
+                if pattern == '*':
+                    self.any_path.append(rule)
+                elif '*' not in pattern and '?' not in pattern:
+                    self.exact_paths.setdefault(pattern, []).append(rule)
+                elif pattern.endswith('\\*') and '*' not in pattern[:-2] and '?' not in pattern:
+                    self.folder_paths.setdefault(pattern[:-2], []).append(rule)
+                else:
+                    self.wildcard_paths.append((_path_regex(pattern), rule))
+
+    def matches(self, query):
+        """Every rule with a condition that matches the file, possibly repeated"""
+        found = []
+        if query.file_hash:
+            found.extend(self.hashes.get(query.file_hash, ()))
+        if query.publisher:
+            for publisher in (query.publisher, '*'):
+                for product in (query.product, '*'):
+                    for binary in (query.binary, '*'):
+                        for low, high, rule in self.publishers.get(publisher, {}).get(product, {}).get(binary, ()):
+                            if low <= query.version <= high:
+                                found.append(rule)
+        path = query.path
+        if path:
+            found.extend(self.any_path)
+            found.extend(self.exact_paths.get(path, ()))
+            if self.folder_paths:
+                separator = path.find('\\')
+                while separator != -1:
+                    found.extend(self.folder_paths.get(path[:separator], ()))
+                    separator = path.find('\\', separator + 1)
+            for regex, rule in self.wildcard_paths:
+                if regex.fullmatch(path):
+                    found.append(rule)
+        return found
+
+# A compiled rule; exceptions is a ConditionIndex or None
+CompiledRule = namedtuple('CompiledRule', ['collection', 'id', 'name', 'action', 'sid', 'exceptions'])
+
+class CompiledPolicy:
+    """A policy compiled for repeated evaluation; build it with compile_policy()"""
+
+    def __init__(self, variables=DEFAULT_PATH_VARIABLES):
+        self.variables = variables
+        self.indexes = {}
+        self.enforcement_modes = {}
+        # collection -> [(source number, mode)] for every source that configures it
+        self.configured_modes = {}
+        self.source_count = 0
+        self.rule_counts = {}
+        self.rule_count = 0
+        self.rules = []
+
+    def add_collection(self, collection_type, enforcement_mode):
+        # As with GPOs, the configured mode of the highest-precedence (last added) source wins
+        # and NotConfigured never overrides a configured mode
+        if enforcement_mode != 'NotConfigured':
+            self.enforcement_modes[collection_type] = enforcement_mode
+            self.configured_modes.setdefault(collection_type, []).append((self.source_count - 1, enforcement_mode))
+        else:
+            self.enforcement_modes.setdefault(collection_type, enforcement_mode)
+        self.indexes.setdefault(collection_type, ConditionIndex(self.variables))
+
+    def add_rule(self, collection_type, rule):
+        exceptions = None
+        for section in rule:
+            if section.tag == 'Exceptions' and len(section):
+                exceptions = ConditionIndex(self.variables)
+                for condition in section:
+                    exceptions.add(condition, True)
+        compiled = CompiledRule(
+            collection_type,
+            rule.get('Id', ''),
+            rule.get('Name', ''),
+            rule.get('Action', 'Allow'),
+            rule.get('UserOrGroupSid', '').upper(),
+            exceptions,
+        )
+        index = self.indexes.setdefault(collection_type, ConditionIndex(self.variables))
+        for section in rule:
+            if section.tag == 'Conditions':
+                for condition in section:
+                    index.add(condition, compiled)
+        self.rule_counts[collection_type] = self.rule_counts.get(collection_type, 0) + 1
+        self.rule_count += 1
+        self.rules.append(compiled)
+
+    def add_source(self, source):
+        """Stream one policy (path, bytes, text or file object) into this one, above those already added"""
+        self.source_count += 1
+        for event, collection_type, elem in iter_policy_events(source):
+            if event == 'collection':
+                self.add_collection(collection_type, elem.get('EnforcementMode', 'NotConfigured'))
+            elif event == 'rule':
+                self.add_rule(collection_type, elem)
+                elem.clear()
+
+    def enforcement_disagreements(self):
+        """{collection: [(source number, mode)]} for collections whose sources configure different modes"""
+        return {
+            collection: modes
+            for collection, modes in self.configured_modes.items()
+            if len({mode for _, mode in modes}) > 1
+        }
+
+    def evaluate(self, query):
+        """Decide one make_query() file as Test-AppLockerPolicy would
+
+        Returns (PolicyDecision, matching CompiledRule or None). Deny rules win
+        over allow rules; a collection without rules allows everything, one
+        with rules denies whatever no allow rule covers.
+        """
+        if not self.rule_counts.get(query.collection):
+            return 'AllowedByDefault', None
+        allowed = None
+        for rule in self.indexes[query.collection].matches(query):
+            if rule.sid not in query.sids:
+                continue
+            if rule.exceptions is not None and rule.exceptions.matches(query):
+                continue
+            if rule.action == 'Deny':
+                return 'Denied', rule
+            if allowed is None:
+                allowed = rule
+        if allowed is not None:
+            return 'Allowed', allowed
+        return 'DeniedByDefault', None
+
+def compile_policy(source, variables=DEFAULT_PATH_VARIABLES):
+    """Stream a policy (path, bytes, text or file object) into a CompiledPolicy"""
+    return compile_policies([source], variables)
+
+def compile_policies(sources, variables=DEFAULT_PATH_VARIABLES):
+    """Compile several policies into one, the effective policy when they are all applied
+
+    Rules are additive. Sources are listed in order of increasing GPO
+    precedence: each collection takes the EnforcementMode of the last source
+    that configures it, and enforcement_disagreements() reports where the
+    sources differ.
+    """
+    policy = CompiledPolicy(variables)
+    for source in sources:
+        policy.add_source(source)
+    return policy
+
+# Accepted inventory column names, compared case-insensitively
+INVENTORY_COLUMNS = {
+    'path': ('path', 'filepath', 'fullpath', 'fullname'),
+    'file_hash': ('sha256', 'hash', 'filehash'),
+    'publisher': ('publisher', 'signer', 'fqbn'),
+    'product': ('product', 'productname'),
+    'binary': ('binary', 'binaryname', 'originalfilename'),
+    'version': ('version', 'fileversion', 'binaryversion'),
+    'sids': ('sid', 'usersid', 'sids'),
+    'collection': ('collection',),
+}
+
+def inventory_columns(fieldnames):
+    """Map make_query() arguments to the matching columns of an inventory header"""
+    lowered = {name.strip().lower(): name for name in fieldnames}
+    columns = {}
+    for argument, candidates in INVENTORY_COLUMNS.items():
+        for candidate in candidates:
+            if candidate in lowered:
+                columns[argument] = lowered[candidate]
+                break
+    return columns
+
+def query_from_row(row, columns, variables=DEFAULT_PATH_VARIABLES):
+    """make_query() for one inventory row; multiple SIDs are separated by ';'"""
+    values = {argument: row.get(column) or '' for argument, column in columns.items()}
+    values['sids'] = values.get('sids', '').split(';')
+    values['collection'] = values.get('collection') or None
+    return make_query(variables=variables, **values)
+
+def evaluate_inventory(policy, rows, columns):
+    """Yield one Test-AppLockerPolicy style result dict per inventory row"""
+    for row in rows:
+        query = query_from_row(row, columns, policy.variables)
+        decision, rule = policy.evaluate(query)
+        yield {
+            'FilePath': row.get(columns.get('path', ''), ''),
+            'Collection': query.collection,
+            'PolicyDecision': decision,
+            'MatchingRule': rule.name if rule else '',
+            'RuleId': rule.id if rule else '',
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate files against an AppLocker policy offline, like Test-AppLockerPolicy.")
+    parser.add_argument('policy', help="Policy XML")
+    parser.add_argument('--inventory', help="CSV of files (Path, SHA256, Publisher, Product, BinaryName, Version, UserSid, Collection)")
+    parser.add_argument('-o', '--output', help="CSV of decisions for --inventory (default: stdout)")
+    parser.add_argument('--path', default='', help="File path of a single query")
+    parser.add_argument('--hash', default='', help="SHA256 of the file")
+    parser.add_argument('--publisher', default='', help="Publisher (O=..., C=...) or a full Fqbn from an event")
+    parser.add_argument('--product', default='')
+    parser.add_argument('--binary', default='', help="Binary name (defaults to the file name)")
+    parser.add_argument('--version', default='')
+    parser.add_argument('--sid', action='append', default=[], help="User or group SID; repeatable (Everyone is always included)")
+    parser.add_argument('--collection', help="Rule collection (default: from the file extension)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    policy = compile_policy(args.policy)
+    compiled = time.perf_counter() - started
+    print(f"Compiled {policy.rule_count} rules in {compiled:.3f}s", file=sys.stderr)
+
+    if not args.inventory:
+        query = make_query(args.path, args.hash, args.publisher, args.product, args.binary, args.version, args.sid, args.collection)
+        decision, rule = policy.evaluate(query)
+        print(f"{args.path}\t{decision}\t{rule.name if rule else ''}")
+        return 0 if decision in ('Allowed', 'AllowedByDefault') else 1
+
+    started = time.perf_counter()
+    with open(args.inventory, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        columns = inventory_columns(reader.fieldnames or [])
+        out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+        try:
+            writer = csv.DictWriter(out, fieldnames=['FilePath', 'Collection', 'PolicyDecision', 'MatchingRule', 'RuleId'])
+            writer.writeheader()
+            rows = 0
+            for result in evaluate_inventory(policy, reader, columns):
+                writer.writerow(result)
+                rows += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+    elapsed = time.perf_counter() - started
+    print(f"Evaluated {rows} files in {elapsed:.2f}s ({elapsed / rows * 1e6 if rows else 0:.1f} us/file)", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,314 @@
+"""Streaming AppLocker event-log (EVTX) ingestion and policy coverage
+
+EVTX files are split into their 64 KiB chunks and each chunk is parsed in a
+worker process. Records are not rendered to XML: the template of each chunk
+is walked once to find which substitution holds which field, and every record
+then only decodes its substitution values. A worker returns a Counter keyed
+by the extracted fields, so millions of records fold into one row per
+distinct (event, rule, file, user).
+
+Usage:
+    python -m applocker.events C:\\Logs\\*.evtx -o event_counts.csv --policy policy.xml --coverage rule_coverage.csv --would-block would_block.csv
+"""
+import argparse
+import base64
+import binascii
+import csv
+import glob
+import html
+import itertools
+import os
+import re
+import sys
+import time
+from collections import Counter, namedtuple
+
+import Evtx.Evtx as evtx
+import Evtx.Nodes as evtx_nodes
+
+from applocker.parallel import map_chunks
+from applocker.stream import iter_policy_events
+
+EVENT_OUTCOMES = {
+    8002: 'Allowed',
+    8003: 'WouldBlock',
+    8004: 'Blocked',
+    8005: 'Allowed',
+    8006: 'WouldBlock',
+    8007: 'Blocked',
+}
+WOULD_BLOCK_EVENT_IDS = (8003, 8006)
+
+# PolicyName in the event -> RuleCollection Type in the policy
+POLICY_COLLECTIONS = {'EXE': 'Exe', 'DLL': 'Dll', 'MSI': 'Msi', 'SCRIPT': 'Script', 'APPX': 'Appx'}
+
+# Rule Id logged when no rule matched and the implicit default deny applied
+NULL_RULE_ID = '00000000-0000-0000-0000-000000000000'
+
+EVENT_FIELDS = ('EventID', 'PolicyName', 'RuleId', 'RuleName', 'FilePath', 'FileHash', 'Fqbn', 'TargetUser')
+EventKey = namedtuple('EventKey', ['event_id', 'collection', 'rule_id', 'rule_name', 'file_path', 'file_hash', 'fqbn', 'user'])
+
+_RENDERED_FIELD_RE = re.compile(r'<(' + '|'.join(EVENT_FIELDS) + r')(?:\s[^>]*)?>([^<]*)</\1>')
+
+def normalize_rule_id(rule_id):
+    """Policy Ids are bare GUIDs, event RuleIds are braced; compare them lowercased without braces"""
+    return rule_id.strip().strip('{}').lower()
+
+def normalize_file_hash(file_hash):
+    """Uppercase hex without a 0x prefix; python-evtx renders binary values as base64"""
+    file_hash = file_hash.strip()
+    if file_hash.lower().startswith('0x'):
+        file_hash = file_hash[2:]
+    if file_hash and not re.fullmatch(r'[0-9A-Fa-f]+', file_hash):
+        try:
+            return base64.b64decode(file_hash, validate=True).hex().upper()
+        except (binascii.Error, ValueError):
+            return file_hash
+    return file_hash.upper()
+
+def _template_field_indexes(template):
+    """Map each wanted field to the substitution index that fills it, by walking the template once"""
+    indexes = {}
+
+    def walk(node, tag):
+        if isinstance(node, evtx_nodes.OpenStartElementNode):
+            tag = node.tag_name()
+            for child in node.children():
+                if isinstance(child, evtx_nodes.AttributeNode):
+                    value = child.attribute_value()
+                    name = child.attribute_name().string()
+                    if name == 'UserID' and isinstance(value, (evtx_nodes.NormalSubstitutionNode, evtx_nodes.ConditionalSubstitutionNode)):
+                        indexes.setdefault('UserID', value.index())
+                else:
+                    walk(child, tag)
+        elif isinstance(node, (evtx_nodes.NormalSubstitutionNode, evtx_nodes.ConditionalSubstitutionNode)):
+            if tag in EVENT_FIELDS:
+                indexes.setdefault(tag, node.index())
+
+    for node in template.children():
+        walk(node, None)
+    return indexes
+
+def _substitution_text(value):
+    if isinstance(value, evtx_nodes.NullTypeNode):
+        return ''
+    if isinstance(value, evtx_nodes.BinaryTypeNode):
+        return value.binary().hex().upper()
+    return value.string()
+
+def _event_from_fields(fields):
+    try:
+        event_id = int(fields.get('EventID', ''))
+    except ValueError:
+        return None
+    if event_id not in EVENT_OUTCOMES:
+        return None
+    policy_name = fields.get('PolicyName', '').upper()
+    return EventKey(
+        event_id,
+        POLICY_COLLECTIONS.get(policy_name, policy_name),
+        normalize_rule_id(fields.get('RuleId', '')),
+        fields.get('RuleName', ''),
+        fields.get('FilePath', ''),
+        normalize_file_hash(fields.get('FileHash', '')),
+        fields.get('Fqbn', ''),
+        fields.get('TargetUser') or fields.get('UserID', ''),
+    )
+
+def parse_rendered_event(xml_text):
+    """Extract an EventKey from one rendered event XML document, or None for other events"""
+    fields = {}
+    for name, value in _RENDERED_FIELD_RE.findall(xml_text):
+        fields.setdefault(name, html.unescape(value))
+    return _event_from_fields(fields)
+
+def iter_chunk_events(chunk):
+    """Yield an EventKey for every AppLocker 8002-8007 record in one EVTX chunk"""
+    templates = {}
+    for record in chunk.records():
+        root = record.root()
+        template_offset = root.template_instance().template_offset()
+        indexes = templates.get(template_offset)
+        if indexes is None:
+            indexes = templates[template_offset] = _template_field_indexes(root.template())
+        substitutions = root.substitutions()
+        if 'EventID' in indexes and 'FilePath' in indexes:
+            fields = {name: _substitution_text(substitutions[index]) for name, index in indexes.items() if index < len(substitutions)}
+            event = _event_from_fields(fields)
+        else:
+            # Data carried in nested binary XML: fall back to rendering the whole record
+            event = parse_rendered_event(record.xml())
+        if event is not None:
+            yield event
+
+def read_chunk_events(task):
+    """Parse one chunk of one EVTX file into (list of EventKey, records seen, error)"""
+    path, chunk_index = task
+    events = []
+    records = 0
+    try:
+        with evtx.Evtx(path) as log:
+            # chunks() builds each ChunkHeader lazily, so skipping to the index parses no other chunk
+            chunk = next(itertools.islice(log.chunks(), chunk_index, None), None)
+            if chunk is None or not chunk.check_magic():
+                return events, 0, None
+            events.extend(iter_chunk_events(chunk))
+            records = chunk.log_last_record_number() - chunk.log_first_record_number() + 1
+    except Exception as e:
+        return events, records, f"{path} chunk {chunk_index}: {e}"
+    return events, records, None
+
+def count_chunk_events(task):
+    """Worker: parse one chunk of one EVTX file into (Counter of EventKey, records seen, error)"""
+    events, records, error = read_chunk_events(task)
+    return Counter(events), records, error
+
+def evtx_chunk_tasks(paths):
+    """One (path, chunk_index) task per chunk declared in each file header"""
+    tasks = []
+    for path in paths:
+        with evtx.Evtx(path) as log:
+            chunk_count = sum(1 for _ in log.get_file_header().chunks())
+        tasks.extend((path, index) for index in range(chunk_count))
+    return tasks
+
+def aggregate_event_logs(paths, workers=None, chunksize=8, progress=None):
+    """Count AppLocker events across EVTX files, one worker task per chunk
+
+    Returns (counts, stats): a Counter of EventKey and a dict with files,
+    chunks, records, events, errors and seconds. `workers=1` parses in-process.
+    """
+    started = time.perf_counter()
+    tasks = evtx_chunk_tasks(paths)
+    counts = Counter()
+    stats = {'files': len(paths), 'chunks': len(tasks), 'records': 0, 'events': 0, 'errors': [], 'seconds': 0.0}
+    for chunk_counts, records, error in map_chunks(count_chunk_events, tasks, workers, chunksize, progress):
+        counts.update(chunk_counts)
+        stats['records'] += records
+        if error:
+            stats['errors'].append(error)
+    stats['events'] = sum(counts.values())
+    stats['seconds'] = time.perf_counter() - started
+    return counts, stats
+
+def event_count_rows(counts):
+    """One dict per distinct event, most frequent first"""
+    rows = []
+    for key, count in counts.most_common():
+        rows.append({
+            'EventID': key.event_id,
+            'Outcome': EVENT_OUTCOMES[key.event_id],
+            'Collection': key.collection,
+            'RuleId': key.rule_id,
+            'RuleName': key.rule_name,
+            'FilePath': key.file_path,
+            'FileHash': key.file_hash,
+            'Publisher': key.fqbn,
+            'User': key.user,
+            'Count': count,
+        })
+    return rows
+
+def policy_rule_coverage(policy_source, counts):
+    """Per policy rule: how often it fired, split by outcome, and whether it never fired"""
+    hits = {}
+    for key, count in counts.items():
+        by_outcome = hits.setdefault(key.rule_id, Counter())
+        by_outcome[EVENT_OUTCOMES[key.event_id]] += count
+    rows = []
+    for event, collection_type, elem in iter_policy_events(policy_source):
+        if event != 'rule':
+            continue
+        by_outcome = hits.get(normalize_rule_id(elem.get('Id', '')), Counter())
+        total = sum(by_outcome.values())
+        rows.append({
+            'Collection': collection_type,
+            'RuleType': elem.tag,
+            'RuleId': elem.get('Id', ''),
+            'RuleName': elem.get('Name', ''),
+            'Action': elem.get('Action', ''),
+            'Events': total,
+            'Allowed': by_outcome['Allowed'],
+            'Blocked': by_outcome['Blocked'],
+            'WouldBlock': by_outcome['WouldBlock'],
+            'Status': 'Fires' if total else 'Never fires',
+        })
+        elem.clear()
+    return rows
+
+def would_block_rows(counts):
+    """Files that audit mode logged as blocked-if-enforced (8003/8006), aggregated per file"""
+    files = {}
+    for key, count in counts.items():
+        if key.event_id not in WOULD_BLOCK_EVENT_IDS:
+            continue
+        entry = files.get((key.collection, key.file_path, key.file_hash, key.fqbn))
+        if entry is None:
+            entry = files[(key.collection, key.file_path, key.file_hash, key.fqbn)] = {
+                'Collection': key.collection,
+                'FilePath': key.file_path,
+                'FileHash': key.file_hash,
+                'Publisher': key.fqbn,
+                'Rule': key.rule_name if key.rule_id != NULL_RULE_ID else '(no allow rule matched)',
+                'Events': 0,
+                'Users': set(),
+            }
+        entry['Events'] += count
+        entry['Users'].add(key.user)
+    rows = sorted(files.values(), key=lambda entry: entry['Events'], reverse=True)
+    for row in rows:
+        row['Users'] = len(row['Users'])
+    return rows
+
+def write_rows(rows, output_path):
+    if not rows:
+        open(output_path, 'w').close()
+        return
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate AppLocker EVTX logs and report which policy rules fire.")
+    parser.add_argument('logs', nargs='+', help="EVTX files or glob patterns (Microsoft-Windows-AppLocker channels)")
+    parser.add_argument('-o', '--output', required=True, help="CSV of distinct events with their counts")
+    parser.add_argument('--policy', help="Policy XML to report rule coverage against")
+    parser.add_argument('--coverage', help="CSV of per-rule hit counts (requires --policy)")
+    parser.add_argument('--would-block', help="CSV of files audit mode would have blocked (8003/8006)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Worker processes (default: CPU count; 1 disables the pool)")
+    parser.add_argument('--chunksize', type=int, default=8, help="EVTX chunks handed to a worker at a time")
+    args = parser.parse_args(argv)
+    if args.coverage and not args.policy:
+        parser.error("--coverage requires --policy")
+
+    paths = []
+    for pattern in args.logs:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    paths = [path for path in paths if os.path.isfile(path)]
+    if not paths:
+        print("No EVTX files found", file=sys.stderr)
+        return 1
+
+    counts, stats = aggregate_event_logs(paths, workers=args.workers, chunksize=args.chunksize)
+    write_rows(event_count_rows(counts), args.output)
+    for error in stats['errors']:
+        print(error, file=sys.stderr)
+    print(f"Files: {stats['files']}, chunks: {stats['chunks']}, records: {stats['records']}, "
+          f"AppLocker events: {stats['events']} ({len(counts)} distinct) in {stats['seconds']:.2f}s, "
+          f"{stats['records'] / stats['seconds'] if stats['seconds'] else 0:.0f} records/sec")
+
+    if args.would_block:
+        rows = would_block_rows(counts)
+        write_rows(rows, args.would_block)
+        print(f"Would block in Enforce mode: {len(rows)} files, {sum(row['Events'] for row in rows)} events")
+    if args.policy:
+        coverage = policy_rule_coverage(args.policy, counts)
+        never = sum(1 for row in coverage if row['Status'] == 'Never fires')
+        print(f"Policy rules: {len(coverage)}, fired: {len(coverage) - never}, never fired: {never}")
+        if args.coverage:
+            write_rows(coverage, args.coverage)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
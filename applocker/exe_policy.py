@@ -0,0 +1,114 @@
+"""AppLocker Exe policy generation from analyzed files"""
+import io
+import uuid
+import xml.etree.ElementTree as ET
+
+from applocker.xmlwriter import PolicyWriter
+
+# Covered file names listed in a rule's description
+MAX_DESCRIPTION_FILES = 10
+
+def describe_covered_files(file_names):
+    """Rule description naming the first MAX_DESCRIPTION_FILES covered files"""
+    names = sorted(set(file_names))
+    more = len(names) - MAX_DESCRIPTION_FILES
+    return f"Files covered by this rule: {', '.join(names[:MAX_DESCRIPTION_FILES])}" + (f" and {more} more" if more > 0 else '')
+
+def multi_hash_rule(file_hashes, action, principal="S-1-1-0"):
+    """One FileHashRule matching every (FileHash element, file name) pair given"""
+    file_names = [file_name for _, file_name in file_hashes]
+    if len(file_hashes) == 1:
+        name, description = "Hash Rule for " + file_names[0], ""
+    else:
+        name, description = f"Hash Rule for {len(file_hashes)} files", describe_covered_files(file_names)
+    file_hash_rule = ET.Element("FileHashRule", Id=str(uuid.uuid4()), Name=name, Description=description, UserOrGroupSid=principal, Action=action)
+    conditions_hash = ET.SubElement(file_hash_rule, "Conditions")
+    file_hash_condition = ET.SubElement(conditions_hash, "FileHashCondition")
+    for file_hash, _ in file_hashes:
+        file_hash_condition.append(file_hash)
+    return file_hash_rule
+
+def write_policy_xml(records, out, mode, include_hash, include_publisher, max_hashes_per_rule=1):
+    """Write an Exe policy for analyzed file records to a text stream, consuming them one at a time
+
+    `records` is any iterable of analyze_file() dicts, so large trees can be
+    fed straight from the ingestion pipeline. Hash rules are written as each
+    record arrives; publisher rules follow once all records are seen. With
+    `max_hashes_per_rule` above 1, distinct hashes are batched into rules of
+    up to that many FileHash entries under one FileHashCondition instead of
+    one rule per file.
+    """
+    enforcement_mode = "AuditOnly" if mode == 'Audit' else "Enabled"
+    action = "Deny" if mode == 'Block' else "Allow"
+    writer = PolicyWriter(out)
+    writer.start("AppLockerPolicy", {'Version': "1"})
+    writer.start("RuleCollection", {'Type': "Exe", 'EnforcementMode': enforcement_mode})
+
+    publisher_rules_dict = {}
+    # Batched mode: pending (FileHash, file name) pairs and the hashes already written
+    hash_batch = []
+    seen_hashes = set()
+
+    for record in records:
+        publisher, version, internal_name = record['publisher'], record['version'], record['internal_name']
+        # AppLocker matches PE files by their Authenticode hash; other files by the flat hash
+        file_hash = record.get('authenticode_hash') or record['hash']
+        filename, length = record['filename'], record['length']
+        binary_name = internal_name if internal_name and '.' in internal_name else filename
+
+        if include_hash and max_hashes_per_rule > 1:
+            if file_hash not in seen_hashes:
+                seen_hashes.add(file_hash)
+                hash_batch.append((ET.Element("FileHash", Type="SHA256", Data=f"0x{file_hash.upper()}", SourceFileName=binary_name, SourceFileLength=str(length)), binary_name))
+                if len(hash_batch) >= max_hashes_per_rule:
+                    writer.element(multi_hash_rule(hash_batch, action))
+                    hash_batch = []
+        elif include_hash:
+            rule_id_hash = str(uuid.uuid4())
+            file_hash_rule = ET.Element("FileHashRule", Id=rule_id_hash, Name="Hash Rule for " + binary_name, Description="", UserOrGroupSid="S-1-1-0", Action=action)
+            conditions_hash = ET.SubElement(file_hash_rule, "Conditions")
+            file_hash_condition = ET.SubElement(conditions_hash, "FileHashCondition")
+            formatted_hash = f"0x{file_hash.upper()}"
+            ET.SubElement(file_hash_condition, "FileHash", Type="SHA256", Data=formatted_hash, SourceFileName=binary_name, SourceFileLength=str(length))
+            writer.element(file_hash_rule)
+
+        if include_publisher and publisher:
+            publisher_rule_key = (publisher, version, binary_name)
+            if publisher_rule_key not in publisher_rules_dict:
+                publisher_rules_dict[publisher_rule_key] = {
+                    'rule_id': str(uuid.uuid4()),
+                    'filenames': [filename]
+                }
+            else:
+                publisher_rules_dict[publisher_rule_key]['filenames'].append(filename)
+
+    if hash_batch:
+        writer.element(multi_hash_rule(hash_batch, action))
+
+    if include_publisher:
+        for (publisher, version, binary_name), rule_info in publisher_rules_dict.items():
+            rule_id_publisher = rule_info['rule_id']
+            covered_filenames = ', '.join(rule_info['filenames'])
+            description = f"Files covered by this rule: {covered_filenames}"
+
+            file_publisher_rule = ET.Element("FilePublisherRule", Id=rule_id_publisher, Name="Publisher Rule for " + binary_name, Description=description, UserOrGroupSid="S-1-1-0", Action=action)
+            conditions_publisher = ET.SubElement(file_publisher_rule, "Conditions")
+            file_publisher_condition = ET.SubElement(conditions_publisher, "FilePublisherCondition", PublisherName=publisher, ProductName="*", BinaryName=binary_name)
+            version_range_low = version_range_high = version or "0.0.0.0"
+            ET.SubElement(file_publisher_condition, "BinaryVersionRange", LowSection=version_range_low, HighSection=version_range_high)
+            writer.element(file_publisher_rule)
+
+    writer.close()
+
+def generate_policy_xml(records, mode, include_hash, include_publisher, max_hashes_per_rule=1):
+    """Build an Exe policy for analyzed file records and return it as text"""
+    buffer = io.StringIO()
+    write_policy_xml(records, buffer, mode, include_hash, include_publisher, max_hashes_per_rule)
+    return buffer.getvalue()
+
+def generate_xml(publishers, versions, internal_names, file_hashes, filenames, lengths, mode, include_hash, include_publisher, max_hashes_per_rule=1):
+    records = (
+        {'publisher': publisher, 'version': version, 'internal_name': internal_name, 'hash': file_hash, 'filename': filename, 'length': length}
+        for publisher, version, internal_name, file_hash, filename, length in zip(publishers, versions, internal_names, file_hashes, filenames, lengths)
+    )
+    return generate_policy_xml(records, mode, include_hash, include_publisher, max_hashes_per_rule)
@@ -0,0 +1,155 @@
+"""Persistent SQLite cache of per-file PE metadata for EXE rule generation
+
+Files are keyed by (SHA-256, size) and keep their publisher, version,
+internal name, product name and, for PE files, the Authenticode hash
+AppLocker matches hash rules against. Files on disk also get a stat-based
+fast path keyed by (path, size, mtime), so an unchanged file in a re-scanned
+image is neither re-read nor re-parsed.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_metadata (
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    publisher TEXT,
+    version TEXT,
+    internal_name TEXT,
+    authenticode_hash TEXT,
+    product_name TEXT,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (sha256, size)
+);
+CREATE TABLE IF NOT EXISTS file_paths (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS file_metadata_last_used ON file_metadata (last_used);
+CREATE INDEX IF NOT EXISTS file_metadata_authenticode_hash ON file_metadata (authenticode_hash);
+"""
+
+METADATA_FIELDS = ('publisher', 'version', 'internal_name', 'authenticode_hash', 'product_name')
+
+# Bump whenever extraction changes what is stored, so older entries are re-extracted
+METADATA_VERSION = 5
+
+class FileMetadataCache:
+    """SQLite-backed metadata cache with entry-count and age eviction"""
+
+    def __init__(self, db_path, max_entries=500_000, max_age_days=180):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.stats = {'path_hits': 0, 'hash_hits': 0, 'misses': 0}
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Shared by the hashing thread pool; every access goes through the lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != METADATA_VERSION:
+            # Version 2: publishers are the Authenticode leaf signer in AppLocker's format
+            # Version 3: PE files carry their Authenticode hash
+            # Version 4: signed files carry their ProductName
+            # Version 5: versions are numeric (VS_FIXEDFILEINFO) rather than the FileVersion string
+            # Older entries are dropped with their tables, so schema changes apply too
+            self._conn.executescript("DROP TABLE IF EXISTS file_paths; DROP TABLE IF EXISTS file_metadata;")
+        self._conn.executescript(SCHEMA)
+        self._conn.execute(f"PRAGMA user_version = {METADATA_VERSION}")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def lookup_path(self, path, size, mtime_ns):
+        """Return (sha256, metadata) for an unchanged file on disk, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT m.sha256, m.publisher, m.version, m.internal_name, m.authenticode_hash, m.product_name "
+                "FROM file_paths p JOIN file_metadata m ON m.sha256 = p.sha256 AND m.size = p.size "
+                "WHERE p.path = ? AND p.size = ? AND p.mtime_ns = ?",
+                (path, size, mtime_ns),
+            ).fetchone()
+            if row is None:
+                return None
+            self._touch(row[0], size)
+            self.stats['path_hits'] += 1
+        return row[0], dict(zip(METADATA_FIELDS, row[1:]))
+
+    def lookup(self, sha256, size):
+        """Return cached metadata for a file's content, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT publisher, version, internal_name, authenticode_hash, product_name FROM file_metadata WHERE sha256 = ? AND size = ?",
+                (sha256, size),
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            self._touch(sha256, size)
+            self.stats['hash_hits'] += 1
+        return dict(zip(METADATA_FIELDS, row))
+
+    def lookup_file_hash(self, file_hash, size):
+        """Return cached metadata for the file a SHA256 FileHash condition names, or None
+
+        Hash rules carry the Authenticode hash for PE files and the flat hash
+        for everything else, so either matches.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sha256, publisher, version, internal_name, authenticode_hash, product_name FROM file_metadata "
+                "WHERE size = ? AND (authenticode_hash = ? OR sha256 = ?) LIMIT 1",
+                (size, file_hash, file_hash),
+            ).fetchone()
+            if row is None:
+                return None
+            self._touch(row[0], size)
+        return dict(zip(METADATA_FIELDS, row[1:]))
+
+    def store(self, sha256, size, metadata, path=None, mtime_ns=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_metadata (sha256, size, publisher, version, internal_name, authenticode_hash, product_name, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (sha256, size, *(metadata.get(field) for field in METADATA_FIELDS), time.time()),
+            )
+            if path is not None:
+                self._remember_path(path, size, mtime_ns, sha256)
+
+    def remember_path(self, path, size, mtime_ns, sha256):
+        """Record that a file on disk currently holds the given content"""
+        with self._lock:
+            self._remember_path(path, size, mtime_ns, sha256)
+
+    def _remember_path(self, path, size, mtime_ns, sha256):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO file_paths (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+            (path, size, mtime_ns, sha256),
+        )
+
+    def flush(self):
+        """Evict expired and least recently used entries, then commit"""
+        with self._lock:
+            if self.max_age_days:
+                self._conn.execute("DELETE FROM file_metadata WHERE last_used < ?", (time.time() - self.max_age_days * 86400,))
+            if self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM file_metadata WHERE rowid IN ("
+                    "SELECT rowid FROM file_metadata ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self._conn.execute(
+                "DELETE FROM file_paths WHERE NOT EXISTS ("
+                "SELECT 1 FROM file_metadata m WHERE m.sha256 = file_paths.sha256 AND m.size = file_paths.size)"
+            )
+            self._conn.commit()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def _touch(self, sha256, size):
+        self._conn.execute("UPDATE file_metadata SET last_used = ? WHERE sha256 = ? AND size = ?", (time.time(), sha256, size))
@@ -0,0 +1,260 @@
+"""Columnar, vectorized Inspector findings
+
+Rules are streamed into flat per-condition columns, and each batch is assessed
+with pandas string operations over whole columns rather than rule by rule. The
+result is a DataFrame with categorical Severity, Collection and RuleType
+columns, matching inspect_policy_source() row for row.
+"""
+import io
+import re
+
+import numpy as np
+import pandas as pd
+
+from applocker.inspector import (
+    FINDING_COLUMNS,
+    _DANGEROUS_WILDCARD_RE,
+    _DRIVE_ROOT_RE,
+    _PROTECTED_RE,
+    _USER_WRITABLE_RE,
+    assess_collection_risk,
+)
+from applocker.stream import iter_policy_events
+
+SEVERITIES = ['High', 'Medium', 'Low', 'Info']
+RULE_TYPES = ['(collection)', 'FilePathRule', 'FilePublisherRule', 'FileHashRule']
+
+SEVERITY_DTYPE = pd.CategoricalDtype(SEVERITIES)
+RULE_TYPE_DTYPE = pd.CategoricalDtype(RULE_TYPES)
+
+# Same list as is_broad_principal(), as one case-insensitive substring alternation
+_BROAD_PRINCIPAL_RE = re.compile('|'.join(re.escape(p.lower()) for p in [
+    'Everyone', 'Authenticated Users', 'BUILTIN\\Users', 'Users', 'Domain Users', 'S-1-1-0', 'S-1-5-11', 'S-1-5-32-545',
+]))
+
+# classify_path() uses re.match for drive roots; anchor it for a column-wide search
+_DRIVE_ROOT_AT_START_RE = re.compile(r'\A(?:' + _DRIVE_ROOT_RE.pattern + ')', _DRIVE_ROOT_RE.flags)
+
+# One row per assessable condition; which fields are filled depends on the rule type
+CONDITION_FIELDS = ('Collection', 'RuleType', 'Action', 'Principal', 'RuleName', 'Path', 'PublisherName', 'ProductName', 'BinaryName', 'LowSection', 'HighSection', 'HashType', 'HashData')
+CONDITION_TAGS = {
+    'FilePathRule': 'FilePathCondition',
+    'FilePublisherRule': 'FilePublisherCondition',
+    'FileHashRule': 'FileHashCondition',
+}
+
+def _condition_rows(rule, collection_type):
+    condition_tag = CONDITION_TAGS.get(rule.tag)
+    conditions = rule.find('Conditions')
+    if condition_tag is None or conditions is None:
+        return
+    # Same principal lookup as the rule-by-rule assessors
+    user_or_group = rule.find('UserOrGroupSid')
+    principal = user_or_group.text if user_or_group is not None else 'Unknown'
+    base = (collection_type, rule.tag, rule.get('Action', 'Unknown'), principal, rule.get('Name', 'Unnamed Rule'))
+    for condition in conditions:
+        if condition.tag != condition_tag:
+            continue
+        if condition_tag == 'FilePathCondition':
+            yield base + (condition.get('Path', ''), '', '', '', '', '', '', '')
+        elif condition_tag == 'FilePublisherCondition':
+            version_range = condition.find('BinaryVersionRange')
+            yield base + (
+                '', condition.get('PublisherName', ''), condition.get('ProductName', ''), condition.get('BinaryName', ''),
+                version_range.get('LowSection', '') if version_range is not None else '',
+                version_range.get('HighSection', '') if version_range is not None else '',
+                '', '',
+            )
+        else:
+            file_hash = condition.find('FileHash')
+            yield base + (
+                '', '', '', '', '', '',
+                file_hash.get('Type', 'Unknown') if file_hash is not None else 'Unknown',
+                file_hash.get('Data', '') if file_hash is not None else '',
+            )
+
+def _clause(mask, text):
+    """Per-row '<text>; ' where mask holds, '' elsewhere"""
+    if isinstance(text, pd.Series):
+        return np.where(mask, (text + '; ').to_numpy(dtype=object), '')
+    return np.where(mask, text + '; ', '')
+
+def _join_clauses(clauses, rows):
+    joined = np.full(rows, '', dtype=object)
+    for clause in clauses:
+        joined = joined + clause
+    # Turn the trailing '; ' into the sentence's full stop
+    return pd.Series(joined).str[:-2] + '.'
+
+def _search(values, regex):
+    # Inline flags rather than flags= keep RE2-compatible patterns on pandas' Arrow fast path
+    inline = '(?s)' if regex.flags & re.DOTALL else ''
+    return values.str.contains(inline + regex.pattern).to_numpy(dtype=bool)
+
+def _search_protected(lowered):
+    # The Windows-but-not-temp lookahead has no Arrow equivalent, so only rows
+    # that mention a Windows or Program Files folder fall back to Python's re
+    candidates = (lowered.str.contains('\\windows\\', regex=False) | lowered.str.contains('\\program files', regex=False)).to_numpy()
+    protected = np.zeros(len(lowered), dtype=bool)
+    if candidates.any():
+        protected[candidates] = _search(lowered[candidates], _PROTECTED_RE)
+    return protected
+
+def _assess_paths(rows, broad):
+    # The same compiled patterns as classify_path(), applied to the whole column at once
+    paths = rows['Path']
+    lowered = paths.str.lower()
+    user_writable = _search(lowered, _USER_WRITABLE_RE)
+    protected = _search_protected(lowered)
+    wildcard = _search(lowered, _DANGEROUS_WILDCARD_RE)
+    drive_root = _search(lowered, _DRIVE_ROOT_AT_START_RE)
+
+    high = user_writable | drive_root
+    downgraded = protected & high
+    severity = np.where(downgraded, 'Info', np.where(high, 'High', np.where(wildcard, 'Medium', 'Info')))
+    filename_part = paths.str.rsplit('\\', n=1).str[-1]
+    reasons = _join_clauses([
+        _clause(broad, "Principal is broad"),
+        _clause(user_writable, "User-writable path"),
+        _clause(wildcard, "Wildcard extension pattern (" + filename_part + ")"),
+        _clause(drive_root, "Drive root access"),
+    ], len(rows))
+    recommendations = _join_clauses([
+        _clause(broad, "reduce principal scope"),
+        _clause(user_writable, "avoid user-writable paths; replace with Publisher/Hash rules"),
+        _clause(wildcard, "avoid wildcard allows on executable types"),
+        _clause(drive_root, "specify exact paths instead of drive roots"),
+    ], len(rows))
+    recommendations = recommendations.where(~downgraded, "No change needed if file remains locked down; consider Publisher/Hash for defense-in-depth.")
+    keep = broad | user_writable | wildcard | drive_root
+    return keep, severity, 'Path', paths, reasons, recommendations
+
+def _assess_publishers(rows, broad):
+    any_product = (rows['ProductName'] == '*').to_numpy()
+    any_binary = (rows['BinaryName'] == '*').to_numpy()
+    high_section = rows['HighSection']
+    unbounded = ((high_section == '*') | (high_section == '')).to_numpy()
+
+    severity = np.where(any_product | any_binary | unbounded, 'Medium', 'Info')
+    reasons = _join_clauses([
+        _clause(any_product & any_binary, "Any product and any binary from the publisher are allowed"),
+        _clause(any_product, "Any product from publisher allowed"),
+        _clause(any_binary, "Any binary from publisher/product allowed"),
+        _clause(unbounded, "No upper version bound"),
+        _clause(broad, "Principal is broad"),
+    ], len(rows))
+    recommendations = _join_clauses([
+        _clause(any_product & any_binary, "constrain to specific Product/Binary"),
+        _clause(any_product, "specify exact product name"),
+        _clause(any_binary, "specify exact binary name"),
+        _clause(unbounded, "set an upper version bound"),
+        _clause(broad, "reduce principal scope"),
+    ], len(rows))
+    condition = (
+        "Publisher='" + rows['PublisherName'] + "'; Product='" + rows['ProductName'] + "'; Binary='" + rows['BinaryName']
+        + "'; VersionRange=[" + rows['LowSection'] + ", " + high_section + "]"
+    )
+    keep = any_product | any_binary | unbounded | broad
+    return keep, severity, 'Publisher', condition, reasons, recommendations
+
+def _assess_hashes(rows, broad):
+    condition = rows['HashType'] + ": " + rows['HashData'].str[:16] + "..."
+    return (
+        broad, 'Low', 'Hash', condition,
+        "Allow-by-hash given to broad principals (rule is tight, group is broad).",
+        "Consider reducing principal scope for defense-in-depth.",
+    )
+
+BATCH_ASSESSORS = {
+    'FilePathRule': _assess_paths,
+    'FilePublisherRule': _assess_publishers,
+    'FileHashRule': _assess_hashes,
+}
+
+def assess_condition_batch(rows):
+    """Vectorized findings for a batch of condition rows, in row order"""
+    frame = pd.DataFrame.from_records(rows, columns=CONDITION_FIELDS)
+    broad_all = _search(frame['Principal'].str.lower(), _BROAD_PRINCIPAL_RE)
+    parts = []
+    for rule_type, assessor in BATCH_ASSESSORS.items():
+        selected = (frame['RuleType'] == rule_type).to_numpy()
+        if not selected.any():
+            continue
+        subset = frame[selected].reset_index(drop=True)
+        keep, severity, condition_type, condition, reasons, recommendations = assessor(subset, broad_all[selected])
+        part = pd.DataFrame({
+            'Severity': severity,
+            'Collection': subset['Collection'],
+            'RuleType': subset['RuleType'],
+            'Action': subset['Action'],
+            'Principal': subset['Principal'],
+            'RuleName': subset['RuleName'],
+            'ConditionType': condition_type,
+            'Condition': condition,
+            'Reason': reasons,
+            'Recommendation': recommendations,
+        })
+        # Index by position in the batch so the parts interleave back into document order
+        part.index = np.flatnonzero(selected)
+        parts.append(part[keep])
+    if not parts:
+        return empty_findings_frame()
+    return _categorize(pd.concat(parts).sort_index().reset_index(drop=True))
+
+def _categorize(frame):
+    frame['Severity'] = frame['Severity'].astype(SEVERITY_DTYPE)
+    frame['RuleType'] = frame['RuleType'].astype(RULE_TYPE_DTYPE)
+    frame['Collection'] = frame['Collection'].astype('category')
+    return frame
+
+def empty_findings_frame():
+    return _categorize(pd.DataFrame({column: pd.Series(dtype=object) for column in FINDING_COLUMNS}))
+
+def inspect_policy_frame(source, batch_size=50_000):
+    """Stream a policy and return its findings as a DataFrame, assessing conditions in batches"""
+    collection_findings = []
+    batches = []
+    rows = []
+    for event, collection_type, elem in iter_policy_events(source):
+        if event == 'collection':
+            collection_findings.extend(assess_collection_risk([elem]))
+        elif event == 'rule':
+            rows.extend(_condition_rows(elem, collection_type))
+            elem.clear()
+            if len(rows) >= batch_size:
+                batches.append(assess_condition_batch(rows))
+                rows = []
+    if rows:
+        batches.append(assess_condition_batch(rows))
+    if collection_findings:
+        batches.insert(0, _categorize(pd.DataFrame(collection_findings, columns=FINDING_COLUMNS)))
+    if not batches:
+        return empty_findings_frame()
+    # Collection categories can differ per batch; re-categorize the combined frame once
+    return _categorize(pd.concat(batches, ignore_index=True))
+
+def inspect_policy_text_frame(xml_content, batch_size=50_000):
+    return inspect_policy_frame(io.StringIO(xml_content), batch_size)
+
+def summarize_findings_frame(frame):
+    """Severity and per-collection finding counts, like generate_summary_metrics()"""
+    severity_counts = frame['Severity'].value_counts().to_dict()
+    collection_counts = frame['Collection'].value_counts().to_dict()
+    # Keep collections in the order they first appear in the policy
+    return severity_counts, {collection: collection_counts[collection] for collection in frame['Collection'].unique()}
+
+def filter_findings(frame, severities, collections):
+    """Rows whose severity and collection are selected, compared on category codes"""
+    mask = np.ones(len(frame), dtype=bool)
+    for column, selected in (('Severity', severities), ('Collection', collections)):
+        values = frame[column]
+        codes = [values.cat.categories.get_loc(value) for value in selected if value in values.cat.categories]
+        mask &= np.isin(values.cat.codes.to_numpy(), codes)
+    return frame[mask]
+
+def findings_to_columns(frame):
+    """JSON-friendly columnar form of a findings frame, for the on-disk cache"""
+    return {column: frame[column].astype(object).tolist() for column in FINDING_COLUMNS}
+
+def findings_from_columns(columns):
+    return _categorize(pd.DataFrame(columns, columns=FINDING_COLUMNS))
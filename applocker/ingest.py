@@ -0,0 +1,186 @@
+"""Streaming ingestion of software trees for EXE policy generation
+
+Walks directories and ZIP/TAR archives (including archives nested inside
+them) and single gzip/bzip2/xz-compressed files, reads archive members in
+memory without extracting to disk, keeps only
+files that start with the PE 'MZ' magic and analyzes them in bounded batches
+on a thread pool.
+
+Usage:
+    python -m applocker.ingest C:\\VendorDrop vendor.zip -o applocker_exe_policy.xml --mode Audit
+"""
+import argparse
+import bz2
+import gzip
+import io
+import lzma
+import os
+import sys
+import tarfile
+import time
+import zipfile
+
+from applocker.exe_policy import write_policy_xml
+from applocker.filecache import FileMetadataCache
+from applocker.pe import analyze_files
+
+PE_MAGIC = b'MZ'
+ZIP_EXTENSIONS = ('.zip', '.nupkg', '.appx', '.msix')
+TAR_EXTENSIONS = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+# Single compressed files (tool.exe.gz); checked after TAR_EXTENSIONS
+COMPRESSED_FORMATS = {'.gz': gzip, '.bz2': bz2, '.xz': lzma}
+MAX_ARCHIVE_DEPTH = 3
+
+# What a corrupt archive or compressed file raises while being read
+ARCHIVE_ERRORS = (OSError, EOFError, zipfile.BadZipFile, tarfile.TarError, lzma.LZMAError)
+
+def archive_kind(name):
+    lowered = name.lower()
+    if lowered.endswith(ZIP_EXTENSIONS):
+        return 'zip'
+    if lowered.endswith(TAR_EXTENSIONS):
+        return 'tar'
+    if lowered.endswith(tuple(COMPRESSED_FORMATS)):
+        return 'compressed'
+    return None
+
+def _iter_zip(display_name, fileobj, depth):
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            member_name = f"{display_name}!{info.filename}"
+            with archive.open(info) as member:
+                kind = archive_kind(info.filename)
+                if kind and depth < MAX_ARCHIVE_DEPTH:
+                    yield from iter_archive(member_name, io.BytesIO(member.read()), kind, depth + 1)
+                    continue
+                head = member.read(len(PE_MAGIC))
+                if head == PE_MAGIC:
+                    yield member_name, head + member.read()
+
+def _iter_tar(display_name, fileobj, depth):
+    # Stream mode reads members sequentially, so compressed tars are never seeked or unpacked to disk
+    with tarfile.open(fileobj=fileobj, mode='r|*') as archive:
+        for info in archive:
+            if not info.isfile():
+                continue
+            member_name = f"{display_name}!{info.name}"
+            member = archive.extractfile(info)
+            kind = archive_kind(info.name)
+            if kind and depth < MAX_ARCHIVE_DEPTH:
+                yield from iter_archive(member_name, io.BytesIO(member.read()), kind, depth + 1)
+                continue
+            head = member.read(len(PE_MAGIC))
+            if head == PE_MAGIC:
+                yield member_name, head + member.read()
+
+def _iter_compressed(display_name, fileobj):
+    # The single member is named after the file without its compression suffix
+    name, extension = os.path.splitext(display_name)
+    with COMPRESSED_FORMATS[extension.lower()].open(fileobj) as member:
+        head = member.read(len(PE_MAGIC))
+        if head == PE_MAGIC:
+            yield f"{display_name}!{os.path.basename(name.rsplit('!', 1)[-1])}", head + member.read()
+
+def iter_archive(display_name, fileobj, kind, depth=1):
+    """Yield (member_name, bytes) for every PE member of a ZIP or TAR archive or a compressed file"""
+    if kind == 'zip':
+        yield from _iter_zip(display_name, fileobj, depth)
+    elif kind == 'tar':
+        yield from _iter_tar(display_name, fileobj, depth)
+    else:
+        yield from _iter_compressed(display_name, fileobj)
+
+def _is_pe_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(PE_MAGIC)) == PE_MAGIC
+    except OSError:
+        return False
+
+def iter_pe_sources(roots):
+    """Yield (name, source) for every PE file under the given directories, archives and files
+
+    Plain files are yielded as paths so they can be memory-mapped; archive
+    members are yielded as bytes.
+    """
+    for root in roots:
+        if os.path.isdir(root):
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    yield from iter_pe_sources([os.path.join(dirpath, filename)])
+            continue
+        kind = archive_kind(root)
+        if kind:
+            try:
+                with open(root, 'rb') as fileobj:
+                    yield from iter_archive(root, fileobj, kind)
+            except ARCHIVE_ERRORS as e:
+                print(f"Skipping archive {root}: {e}", file=sys.stderr)
+        elif _is_pe_file(root):
+            yield root, root
+
+def analyze_stream(sources, workers=None, cache=None, batch_size=256, stats=None):
+    """Analyze (name, source) pairs in parallel batches, yielding records as each batch completes
+
+    Only one batch of archive members is held in memory at a time. `stats`, if
+    given, is updated with running totals and the errors seen.
+    """
+    stats = stats if stats is not None else {}
+    stats.update({'files': 0, 'bytes': 0, 'seconds': 0.0, 'errors': []})
+    started = time.perf_counter()
+    batch = []
+
+    def flush():
+        records, errors, batch_stats = analyze_files(batch, workers=workers, cache=cache)
+        stats['files'] += batch_stats['files']
+        stats['bytes'] += batch_stats['bytes']
+        stats['errors'].extend(errors)
+        batch.clear()
+        return records
+
+    for name, source in sources:
+        batch.append((name, source))
+        if len(batch) >= batch_size:
+            yield from flush()
+    if batch:
+        yield from flush()
+    stats['seconds'] = time.perf_counter() - started
+    stats['mb_per_sec'] = stats['bytes'] / (1024 * 1024) / stats['seconds'] if stats['seconds'] else 0.0
+
+def _rule_filename(record):
+    # Archive members are named 'archive!path/in/archive.exe'; rules want the bare file name
+    return dict(record, filename=os.path.basename(record['filename'].rsplit('!', 1)[-1].replace('\\', '/')))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate an AppLocker Exe policy for every PE file in directories and ZIP/TAR archives.")
+    parser.add_argument('roots', nargs='+', help="Directories, archives or files to ingest")
+    parser.add_argument('-o', '--output', required=True, help="Policy XML file to write")
+    parser.add_argument('--mode', choices=('Block', 'Audit'), default='Audit', help="Block denies the files; Audit allows them in AuditOnly mode")
+    parser.add_argument('--rules', default='Hash,Publisher', help="Comma-separated rule types to include (Hash, Publisher)")
+    parser.add_argument('--max-hashes-per-rule', type=int, default=1, help="Batch file hashes into hash rules with up to this many FileHash entries (default: 1, one rule per file)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Hashing threads (default: ThreadPoolExecutor default)")
+    parser.add_argument('--batch-size', type=int, default=256, help="Files analyzed per batch")
+    parser.add_argument('--cache-dir', help="Keep PE metadata for unchanged files in file_metadata.sqlite under this directory")
+    args = parser.parse_args(argv)
+
+    rule_types = {rule.strip().lower() for rule in args.rules.split(',')}
+    cache = FileMetadataCache(os.path.join(args.cache_dir, 'file_metadata.sqlite')) if args.cache_dir else None
+    stats = {}
+    records = analyze_stream(iter_pe_sources(args.roots), workers=args.workers, cache=cache, batch_size=args.batch_size, stats=stats)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        write_policy_xml(map(_rule_filename, records), f, args.mode, 'hash' in rule_types, 'publisher' in rule_types, args.max_hashes_per_rule)
+
+    for name, error in stats['errors']:
+        print(f"{name}: {error}", file=sys.stderr)
+    print(f"Files: {stats['files']} ({len(stats['errors'])} failed), {stats['bytes'] / (1024 * 1024):.1f} MB in {stats['seconds']:.2f}s, {stats['mb_per_sec']:.1f} MB/s")
+    if cache is not None:
+        print(f"Metadata cache: {cache.stats['path_hits']} path hits, {cache.stats['hash_hits']} hash hits, {cache.stats['misses']} misses")
+        cache.close()
+    print(f"Policy written to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""N-way streaming merge of AppLocker policies
+
+Every input is streamed exactly once. Each rule collection keeps two indexes,
+one by rule Id and one by the rule's canonical content hash, so the cost of a
+merge is linear in the total number of rules, however many inputs there are.
+"""
+import xml.etree.ElementTree as ET
+
+from applocker.conflicts import ConflictIndex
+from applocker.rules import rule_content_hash
+from applocker.stream import iter_policy_events
+
+class PolicyMerger:
+    """Fold any number of policies into one, deduplicating by Id and by content"""
+
+    def __init__(self, detect_conflicts=True):
+        self.root = None
+        self.conflict_index = ConflictIndex() if detect_conflicts else None
+        self.report = {
+            'inputs': 0,
+            'rules_read': 0,
+            'merged': 0,
+            'duplicate_ids': 0,
+            'duplicate_content': 0,
+            'id_conflicts': 0,
+            'conflicts': [],
+        }
+        self._collections = {}
+        self._ids = {}
+        self._contents = {}
+
+    def add(self, source, label=None):
+        """Stream one policy (path, bytes, XML text or file object) into the merged policy"""
+        label = label if label is not None else f"input {self.report['inputs'] + 1}"
+        self.report['inputs'] += 1
+        for event, collection_type, elem in iter_policy_events(source):
+            if event == 'policy':
+                if self.root is None:
+                    self.root = ET.Element(elem.tag, dict(elem.attrib))
+            elif event == 'collection':
+                self._add_collection(collection_type, elem, label)
+            elif event == 'rule':
+                self._add_rule(collection_type, elem, label)
+        return self
+
+    def add_all(self, sources):
+        for source in sources:
+            if isinstance(source, tuple):
+                self.add(*source)
+            else:
+                self.add(source)
+        return self
+
+    def _add_collection(self, collection_type, collection, label):
+        existing = self._collections.get(collection_type)
+        if existing is None:
+            self._collections[collection_type] = ET.SubElement(self.root, 'RuleCollection', dict(collection.attrib))
+            self._ids[collection_type] = {}
+            self._contents[collection_type] = {}
+            return
+        mode = collection.get('EnforcementMode', 'NotConfigured')
+        kept_mode = existing.get('EnforcementMode', 'NotConfigured')
+        if mode != kept_mode:
+            self.report['conflicts'].append({
+                'Kind': 'EnforcementMode',
+                'Collection': collection_type,
+                'Input': label,
+                'Detail': f"EnforcementMode {mode} ignored, keeping {kept_mode}",
+            })
+
+    def _add_rule(self, collection_type, rule, label):
+        self.report['rules_read'] += 1
+        if self.conflict_index is not None:
+            # Index every input rule, including ones dropped below, so Allow/Deny
+            # contradictions between inputs surface even when one side is a duplicate
+            self.conflict_index.add_rule(collection_type, rule, label)
+        rule_id = rule.get('Id')
+        content = rule_content_hash(rule)
+        ids = self._ids[collection_type]
+        contents = self._contents[collection_type]
+
+        kept_content = ids.get(rule_id)
+        if kept_content is not None:
+            if kept_content == content:
+                self.report['duplicate_ids'] += 1
+            else:
+                self.report['id_conflicts'] += 1
+                self.report['conflicts'].append({
+                    'Kind': 'IdConflict',
+                    'Collection': collection_type,
+                    'Input': label,
+                    'Detail': f"Rule Id {rule_id} ({rule.get('Name', '')}) differs from the rule already merged with that Id; kept the first",
+                })
+            return
+
+        if content in contents:
+            # Same rule under another GUID: keep the first copy, but remember the Id
+            # so later exact copies of this one are recognized too.
+            self.report['duplicate_content'] += 1
+            ids[rule_id] = content
+            return
+
+        ids[rule_id] = content
+        contents[content] = rule_id
+        self._collections[collection_type].append(rule)
+        self.report['merged'] += 1
+
+    def rule_conflicts(self):
+        """Allow/Deny contradictions and shadowed rules seen across all inputs"""
+        return self.conflict_index.findings() if self.conflict_index is not None else []
+
+def merge_policies(sources, detect_conflicts=True):
+    """Merge policies in one pass, returning (merged_root, report)
+
+    The report's 'rule_conflicts' lists Allow/Deny contradictions between inputs.
+    """
+    merger = PolicyMerger(detect_conflicts=detect_conflicts).add_all(sources)
+    report = dict(merger.report, rule_conflicts=merger.rule_conflicts())
+    return merger.root, report
@@ -0,0 +1,26 @@
+"""Bounded process-pool mapping shared by the EVTX and inventory engines"""
+from concurrent.futures import ProcessPoolExecutor
+
+def map_chunks(worker, tasks, workers=None, chunksize=8, progress=None, window=4096, initializer=None, initargs=()):
+    """Yield worker(task) for every chunk task in order, `window` tasks in flight at a time
+
+    Submitting a bounded window keeps memory flat however many chunks the
+    input has. `workers=1` runs in-process, calling `initializer` there.
+    """
+    if workers == 1:
+        executor = None
+        if initializer is not None:
+            initializer(*initargs)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+    try:
+        for start in range(0, len(tasks), window):
+            batch = tasks[start:start + window]
+            results = map(worker, batch) if executor is None else executor.map(worker, batch, chunksize=chunksize)
+            for done, result in enumerate(results, start + 1):
+                yield result
+                if progress is not None:
+                    progress(done, len(tasks))
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
@@ -0,0 +1,437 @@
+"""Hashing and PE metadata pipeline for EXE policy generation"""
+import hashlib
+import mmap
+import os
+import re
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import lief
+
+from applocker.authenticode import DERError, authenticode_publisher, parse_certificate, signer_chain_cache
+
+# hashlib releases the GIL for buffers over 2 KiB, so big reads let threads hash in parallel
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+IMAGE_DIRECTORY_ENTRY_RESOURCE = 2
+IMAGE_DIRECTORY_ENTRY_SECURITY = 4
+RT_VERSION = 16
+WIN_CERT_TYPE_PKCS_SIGNED_DATA = 0x0002
+VS_FIXEDFILEINFO_SIGNATURE = 0xFEEF04BD
+
+# Leading dotted (or old-style comma-separated) numbers of a FileVersion string
+_VERSION_STRING_RE = re.compile(r'\s*(\d+(?:\s*[.,]\s*\d+){0,3})')
+
+class PEFormatError(ValueError):
+    pass
+
+@contextmanager
+def open_file_view(path):
+    """Memory-map a file read-only and yield a memoryview over it"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield memoryview(b'')
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                yield view
+            finally:
+                view.release()
+
+def read_pe_layout(data):
+    """Read just the PE headers: data directories, section table and header offsets"""
+    if len(data) < 64 or bytes(data[:2]) != b'MZ':
+        raise PEFormatError("Not a PE file (missing MZ header)")
+    pe_offset = struct.unpack_from('<I', data, 0x3C)[0]
+    if pe_offset + 24 > len(data) or bytes(data[pe_offset:pe_offset + 4]) != b'PE\0\0':
+        raise PEFormatError("Not a PE file (missing PE signature)")
+    number_of_sections, = struct.unpack_from('<H', data, pe_offset + 6)
+    size_of_optional_header, = struct.unpack_from('<H', data, pe_offset + 20)
+    optional_header = pe_offset + 24
+    magic, = struct.unpack_from('<H', data, optional_header)
+    if magic == 0x20B:  # PE32+
+        directories_offset = optional_header + 112
+    elif magic == 0x10B:  # PE32
+        directories_offset = optional_header + 96
+    else:
+        raise PEFormatError(f"Unknown optional header magic 0x{magic:X}")
+    number_of_directories, = struct.unpack_from('<I', data, directories_offset - 4)
+    directories = [
+        struct.unpack_from('<II', data, directories_offset + 8 * i)
+        for i in range(min(number_of_directories, 16))
+    ]
+    sections = []
+    section_table = optional_header + size_of_optional_header
+    for i in range(number_of_sections):
+        virtual_size, virtual_address, raw_size, raw_pointer = struct.unpack_from('<IIII', data, section_table + 40 * i + 8)
+        sections.append((virtual_address, max(virtual_size, raw_size), raw_pointer, raw_size))
+    return {
+        'checksum_offset': optional_header + 64,
+        'directories_offset': directories_offset,
+        'directories': directories,
+        'headers_end': section_table + 40 * number_of_sections,
+        'sections': sections,
+    }
+
+def _rva_to_offset(layout, rva):
+    for virtual_address, virtual_size, raw_pointer, raw_size in layout['sections']:
+        if virtual_address <= rva < virtual_address + virtual_size and rva - virtual_address < raw_size:
+            return raw_pointer + rva - virtual_address
+    return None
+
+def _directory(layout, index):
+    directories = layout['directories']
+    return directories[index] if index < len(directories) else (0, 0)
+
+def _resource_entries(data, directory_offset):
+    named, ids = struct.unpack_from('<HH', data, directory_offset + 12)
+    for i in range(named + ids):
+        name, target = struct.unpack_from('<II', data, directory_offset + 16 + 8 * i)
+        yield name, target
+
+def read_version_resource(data, layout):
+    """Locate the first RT_VERSION resource by walking only the resource directory"""
+    resource_rva, resource_size = _directory(layout, IMAGE_DIRECTORY_ENTRY_RESOURCE)
+    if not resource_rva or not resource_size:
+        return None
+    base = _rva_to_offset(layout, resource_rva)
+    if base is None:
+        return None
+    for name, target in _resource_entries(data, base):
+        if name == RT_VERSION and target & 0x80000000:
+            break
+    else:
+        return None
+    # Type -> first name -> first language -> IMAGE_RESOURCE_DATA_ENTRY
+    directory = base + (target & 0x7FFFFFFF)
+    for _ in range(2):
+        entries = list(_resource_entries(data, directory))
+        if not entries:
+            return None
+        target = entries[0][1]
+        if not target & 0x80000000:
+            break
+        directory = base + (target & 0x7FFFFFFF)
+    data_rva, data_size = struct.unpack_from('<II', data, base + (target & 0x7FFFFFFF))
+    offset = _rva_to_offset(layout, data_rva)
+    if offset is None:
+        return None
+    return data[offset:offset + data_size]
+
+def _version_block(data, offset):
+    length, value_length, value_type = struct.unpack_from('<HHH', data, offset)
+    key_start = offset + 6
+    key_end = key_start
+    while key_end + 1 < offset + length and bytes(data[key_end:key_end + 2]) != b'\0\0':
+        key_end += 2
+    key = bytes(data[key_start:key_end]).decode('utf-16-le', 'replace')
+    value_start = (key_end + 2 + 3) & ~3
+    value_bytes = value_length * 2 if value_type == 1 else value_length
+    children_start = (value_start + value_bytes + 3) & ~3
+    return key, value_start, value_bytes, children_start, offset + length
+
+def _version_children(data, start, end):
+    offset = start
+    while offset + 6 <= end:
+        block = _version_block(data, offset)
+        if block[4] <= offset:
+            break
+        yield block
+        offset = (block[4] + 3) & ~3
+
+def read_version_strings(version_resource):
+    """Return the first StringFileInfo table of a VS_VERSIONINFO resource as a dict"""
+    if version_resource is None or len(version_resource) < 6:
+        return {}
+    _, _, _, children_start, end = _version_block(version_resource, 0)
+    for key, _, _, table_start, table_end in _version_children(version_resource, children_start, min(end, len(version_resource))):
+        if key != 'StringFileInfo':
+            continue
+        for _, _, _, strings_start, strings_end in _version_children(version_resource, table_start, table_end):
+            strings = {}
+            for name, value_start, value_bytes, _, _ in _version_children(version_resource, strings_start, strings_end):
+                value = bytes(version_resource[value_start:value_start + value_bytes]).decode('utf-16-le', 'replace')
+                strings[name] = value.split('\0', 1)[0]
+            return strings
+    return {}
+
+def read_fixed_file_version(version_resource):
+    """dwFileVersion of the VS_FIXEDFILEINFO in a VS_VERSIONINFO resource as 'a.b.c.d', or None"""
+    if version_resource is None or len(version_resource) < 6:
+        return None
+    _, value_start, value_bytes, _, _ = _version_block(version_resource, 0)
+    if value_bytes < 16 or value_start + 16 > len(version_resource):
+        return None
+    signature, _, file_version_ms, file_version_ls = struct.unpack_from('<IIII', version_resource, value_start)
+    if signature != VS_FIXEDFILEINFO_SIGNATURE:
+        return None
+    return f"{file_version_ms >> 16}.{file_version_ms & 0xFFFF}.{file_version_ls >> 16}.{file_version_ls & 0xFFFF}"
+
+def numeric_file_version(version_string):
+    """The dotted numbers a FileVersion string starts with: '10.0.19041.1 (WinBuild.160101.0800)' -> '10.0.19041.1'"""
+    match = _VERSION_STRING_RE.match(version_string or '')
+    if match is None:
+        return ''
+    return '.'.join(re.split(r'\s*[.,]\s*', match.group(1)))
+
+def read_signature_blob(data, layout):
+    """The PKCS #7 blob of the first WIN_CERTIFICATE in the security directory, or None"""
+    # The security directory holds a file offset, not an RVA
+    security_offset, security_size = _directory(layout, IMAGE_DIRECTORY_ENTRY_SECURITY)
+    if not security_offset or security_size < 8 or security_offset + 8 > len(data):
+        return None
+    length, _, certificate_type = struct.unpack_from('<IHH', data, security_offset)
+    if certificate_type != WIN_CERT_TYPE_PKCS_SIGNED_DATA or length <= 8:
+        return None
+    return data[security_offset + 8:min(security_offset + length, len(data))]
+
+def read_signature(data, layout):
+    """Parse the PKCS #7 blob of the first WIN_CERTIFICATE in the security directory"""
+    blob = read_signature_blob(data, layout)
+    return lief.PE.Signature.parse(list(blob)) if blob is not None else None
+
+def read_publisher(data, layout, cache=signer_chain_cache):
+    """AppLocker PublisherName of a file's Authenticode signer, or None when it is unsigned"""
+    blob = read_signature_blob(data, layout)
+    if blob is None:
+        return None
+    try:
+        return authenticode_publisher(blob, cache)
+    except DERError:
+        # BER-encoded signatures: let lief find the signer, then format its subject the same way
+        signature = lief.PE.Signature.parse(list(blob))
+        signers = list(signature.signers) if signature is not None else []
+        if not signers or signers[0].cert is None:
+            return None
+        return parse_certificate(bytes(signers[0].cert.raw)).publisher
+
+def extract_file_metadata(source):
+    """Publisher, file version, InternalName and ProductName of a path or an in-memory buffer, as a dict
+
+    Only the PE headers, the security directory and the version resource are
+    read; nothing is written to disk. The publisher is the Authenticode leaf
+    signer in AppLocker's PublisherName format; see applocker.authenticode.
+    The version is the numeric one AppLocker compares against
+    BinaryVersionRange: VS_FIXEDFILEINFO's file version, else the dotted
+    numbers the FileVersion string starts with. Unsigned files get None for
+    every field.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open_file_view(source) as view:
+            return extract_file_metadata(view)
+    metadata = {'publisher': None, 'version': None, 'internal_name': None, 'product_name': None}
+    try:
+        data = memoryview(source)
+        layout = read_pe_layout(data)
+        publisher = read_publisher(data, layout)
+        if publisher is None:
+            return metadata
+
+        version_resource = read_version_resource(data, layout)
+        version_info = read_version_strings(version_resource)
+        metadata['publisher'] = publisher
+        metadata['version'] = read_fixed_file_version(version_resource) or numeric_file_version(version_info.get('FileVersion', ''))
+        metadata['internal_name'] = version_info.get('InternalName', '')
+        metadata['product_name'] = version_info.get('ProductName', '')
+    except Exception as e:
+        print(f"Could not extract publisher, version info, and internal name: {e}")
+    return metadata
+
+def extract_publisher_and_version_info(source):
+    """Publisher, FileVersion and InternalName from a path or an in-memory buffer; see extract_file_metadata()"""
+    metadata = extract_file_metadata(source)
+    return metadata['publisher'], metadata['version'], metadata['internal_name']
+
+def calculate_hash_and_length(source):
+    """SHA-256 and length in one pass over a path, bytes-like object or binary file object
+
+    Paths are memory-mapped and hashed in a single update; file objects are read
+    in large chunks into a reused buffer.
+    """
+    sha256_hash = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            file_length = os.fstat(f.fileno()).st_size
+            if file_length:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    sha256_hash.update(mapped)
+        return sha256_hash.hexdigest(), file_length
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        sha256_hash.update(source)
+        return sha256_hash.hexdigest(), len(source)
+
+    file_length = 0
+    source.seek(0)
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    while True:
+        read = source.readinto(buffer)
+        if not read:
+            break
+        file_length += read
+        sha256_hash.update(view[:read])
+    return sha256_hash.hexdigest(), file_length
+
+def authenticode_ranges(layout):
+    """(start, end) file ranges covered by the Authenticode PE hash; the last end is None
+
+    The hash skips the optional header CheckSum, the security directory entry
+    and the certificate table it points at, so signing a file (or
+    re-stamping its checksum) does not change it.
+    """
+    checksum = layout['checksum_offset']
+    if len(layout['directories']) <= IMAGE_DIRECTORY_ENTRY_SECURITY:
+        return [(0, checksum), (checksum + 4, None)]
+    security_entry = layout['directories_offset'] + 8 * IMAGE_DIRECTORY_ENTRY_SECURITY
+    ranges = [(0, checksum), (checksum + 4, security_entry)]
+    security_offset, security_size = _directory(layout, IMAGE_DIRECTORY_ENTRY_SECURITY)
+    if security_offset >= security_entry + 8 and security_size:
+        ranges += [(security_entry + 8, security_offset), (security_offset + security_size, None)]
+    else:
+        ranges.append((security_entry + 8, None))
+    return ranges
+
+def _update_ranges(digest, ranges, chunk, offset):
+    # Feed the parts of chunk (which starts at file offset `offset`) that fall inside ranges
+    chunk_end = offset + len(chunk)
+    for start, end in ranges:
+        start = max(start, offset)
+        end = chunk_end if end is None else min(end, chunk_end)
+        if start < end:
+            digest.update(chunk[start - offset:end - offset])
+
+def _pe_ranges(header):
+    try:
+        return authenticode_ranges(read_pe_layout(header))
+    except (PEFormatError, struct.error):
+        return None
+
+def calculate_hashes(source):
+    """Flat SHA-256, Authenticode SHA-256 and length in one pass over a path, bytes-like object or binary file object
+
+    Both digests are fed the same chunks as they are read, so every byte is
+    read once. The Authenticode hash is what AppLocker matches SHA256 hash
+    rules against for PE files; it is None for files that are not PE files.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open_file_view(source) as view:
+            return calculate_hashes(view)
+
+    sha256_hash = hashlib.sha256()
+    authenticode_hash = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        data = memoryview(source)
+        ranges = _pe_ranges(data)
+        for offset in range(0, len(data), HASH_CHUNK_SIZE):
+            chunk = data[offset:offset + HASH_CHUNK_SIZE]
+            sha256_hash.update(chunk)
+            if ranges is not None:
+                _update_ranges(authenticode_hash, ranges, chunk, offset)
+        file_length = len(data)
+    else:
+        # The PE headers are read from the first chunk
+        file_length = 0
+        ranges = None
+        source.seek(0)
+        buffer = bytearray(HASH_CHUNK_SIZE)
+        view = memoryview(buffer)
+        while True:
+            read = source.readinto(buffer)
+            if not read:
+                break
+            if not file_length:
+                ranges = _pe_ranges(view[:read])
+            sha256_hash.update(view[:read])
+            if ranges is not None:
+                _update_ranges(authenticode_hash, ranges, view[:read], file_length)
+            file_length += read
+    return sha256_hash.hexdigest(), authenticode_hash.hexdigest() if ranges is not None else None, file_length
+
+def _file_record(name, file_hash, file_length, metadata):
+    return {
+        'filename': name,
+        'hash': file_hash,
+        'authenticode_hash': metadata.get('authenticode_hash'),
+        'length': file_length,
+        'publisher': metadata['publisher'],
+        'version': metadata['version'],
+        'internal_name': metadata['internal_name'],
+        'product_name': metadata.get('product_name'),
+    }
+
+def analyze_file(name, source, cache=None):
+    """Hash a file and extract its PE publisher metadata
+
+    `source` is a path or an in-memory buffer. Paths are memory-mapped once and
+    the same view serves both hashes and the header reads. With a
+    FileMetadataCache, unchanged paths skip reading entirely and known content
+    skips the PE parsing.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        path = os.path.abspath(source)
+        stat = os.stat(path)
+        if cache is not None:
+            cached = cache.lookup_path(path, stat.st_size, stat.st_mtime_ns)
+            if cached is not None:
+                return _file_record(name, cached[0], stat.st_size, cached[1])
+        with open_file_view(path) as view:
+            record = analyze_file(name, view, cache)
+        if cache is not None:
+            cache.remember_path(path, record['length'], stat.st_mtime_ns, record['hash'])
+        return record
+
+    file_hash, authenticode_hash, file_length = calculate_hashes(source)
+    metadata = cache.lookup(file_hash, file_length) if cache is not None else None
+    if metadata is None:
+        metadata = dict(extract_file_metadata(source), authenticode_hash=authenticode_hash)
+        if cache is not None:
+            cache.store(file_hash, file_length, metadata)
+    elif metadata.get('authenticode_hash') != authenticode_hash:
+        # Entries stored without the Authenticode hash get it from this read
+        metadata = dict(metadata, authenticode_hash=authenticode_hash)
+        cache.store(file_hash, file_length, metadata)
+    return _file_record(name, file_hash, file_length, metadata)
+
+def analyze_files(items, workers=None, cache=None):
+    """Analyze (name, source) pairs on a thread pool
+
+    Returns (records, errors, stats). Records keep input order; errors are
+    (name, message) pairs; stats holds files, bytes, seconds and MB/s, plus the
+    cache counters when a FileMetadataCache is given.
+    """
+    items = list(items)
+    started = time.perf_counter()
+    records = []
+    errors = []
+
+    def run(item):
+        name, source = item
+        try:
+            return analyze_file(name, source, cache), None
+        except Exception as e:
+            return None, (name, str(e))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for record, error in executor.map(run, items):
+            if error is not None:
+                errors.append(error)
+            else:
+                records.append(record)
+    if cache is not None:
+        cache.flush()
+
+    seconds = time.perf_counter() - started
+    total_bytes = sum(record['length'] for record in records)
+    stats = {
+        'files': len(records),
+        'bytes': total_bytes,
+        'seconds': seconds,
+        'mb_per_sec': total_bytes / (1024 * 1024) / seconds if seconds else 0.0,
+    }
+    if cache is not None:
+        stats.update(cache.stats)
+    return records, errors, stats
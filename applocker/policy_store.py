@@ -0,0 +1,134 @@
+"""Parsed-policy store shared by the Streamlit pages
+
+Everything is keyed by the SHA-256 of the raw policy bytes. Decoded text,
+validation results and read-only compiled forms live in Streamlit's
+process-wide caches with a TTL and an entry limit, so a policy is decoded
+and parsed once however many pages or reruns use it. Uploads are also kept
+in the session, so a policy uploaded on one page can be picked on another
+without uploading it again. Mutable structures such as the Modify page's
+RuleIndex are per session.
+"""
+import hashlib
+import os
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+
+import streamlit as st
+
+from applocker.evaluate import compile_policy
+from applocker.inspector import decode_policy_bytes
+from applocker.merge import merge_policies
+from applocker.rule_index import RuleIndex
+
+POLICY_CACHE_TTL = 60 * 60
+POLICY_CACHE_MAX_ENTRIES = 32
+
+# Uploads and rule indexes remembered per session
+MAX_SESSION_POLICIES = 8
+MAX_SESSION_RULE_INDEXES = 4
+
+def policy_key(raw_content):
+    return hashlib.sha256(raw_content).hexdigest()
+
+# Leading-underscore arguments are not hashed by Streamlit; the key stands in for them
+
+@st.cache_data(ttl=POLICY_CACHE_TTL, max_entries=POLICY_CACHE_MAX_ENTRIES, show_spinner=False)
+def _decode(key, _raw_content):
+    return decode_policy_bytes(_raw_content)
+
+def decode_policy(raw_content):
+    """(text, encoding) of raw policy bytes, or (None, None) when they cannot be decoded"""
+    return _decode(policy_key(raw_content), raw_content)
+
+@st.cache_data(ttl=POLICY_CACHE_TTL, max_entries=POLICY_CACHE_MAX_ENTRIES, show_spinner=False)
+def _is_valid(key, _xml_text):
+    try:
+        ET.fromstring(_xml_text)
+        return True
+    except ET.ParseError:
+        return False
+
+def is_valid_policy_xml(xml_text):
+    """Whether XML text parses, remembered per content hash"""
+    return _is_valid(policy_key(xml_text.encode('utf-8')), xml_text)
+
+@st.cache_resource(ttl=POLICY_CACHE_TTL, max_entries=POLICY_CACHE_MAX_ENTRIES, show_spinner=False)
+def _compiled(key, _xml_text):
+    return compile_policy(_xml_text)
+
+def compiled_policy(xml_text):
+    """CompiledPolicy for evaluation, shared across sessions; callers must not modify it"""
+    return _compiled(policy_key(xml_text.encode('utf-8')), xml_text)
+
+@st.cache_data(ttl=POLICY_CACHE_TTL, max_entries=POLICY_CACHE_MAX_ENTRIES, show_spinner=False)
+def _merged(keys, _sources):
+    combined_root, merge_report = merge_policies(_sources)
+    if combined_root is None:
+        return None, merge_report
+    ET.indent(combined_root, space='  ')
+    return ET.tostring(combined_root, encoding='unicode') + '\n', merge_report
+
+def merged_policy(uploads):
+    """(pretty-printed combined XML or None, merge report) for [(raw bytes, label)]"""
+    uploads = list(uploads)
+    return _merged(tuple((policy_key(raw), label) for raw, label in uploads), uploads)
+
+@st.cache_data(ttl=POLICY_CACHE_TTL, max_entries=POLICY_CACHE_MAX_ENTRIES, show_spinner=False)
+def _read_policy_file(path, modified):
+    with open(path, 'r') as policy_file:
+        return policy_file.read()
+
+def read_policy_file(path):
+    """Text of a policy file on disk, re-read only when its mtime changes"""
+    return _read_policy_file(path, os.path.getmtime(path))
+
+def _session_policies():
+    if 'policy_store' not in st.session_state:
+        st.session_state['policy_store'] = OrderedDict()
+    return st.session_state['policy_store']
+
+def remember_upload(name, raw_content):
+    """Keep an uploaded policy in this session for the other pages; returns its key"""
+    key = policy_key(raw_content)
+    policies = _session_policies()
+    policies[key] = {'name': name, 'raw': raw_content}
+    policies.move_to_end(key)
+    while len(policies) > MAX_SESSION_POLICIES:
+        policies.popitem(last=False)
+    return key
+
+def session_policies():
+    """(key, name) of the policies uploaded in this session, most recent first"""
+    return [(key, entry['name']) for key, entry in reversed(_session_policies().items())]
+
+def session_policy(key):
+    entry = _session_policies().get(key)
+    return (entry['name'], entry['raw']) if entry is not None else (None, None)
+
+def policy_upload(label, key, help=None):
+    """File uploader that also offers policies uploaded earlier in the session
+
+    Returns (name, raw bytes) of the chosen policy, or (None, None).
+    """
+    uploaded_file = st.file_uploader(label, type=['xml'], help=help, key=key)
+    if uploaded_file is not None:
+        raw_content = uploaded_file.getvalue()
+        remember_upload(uploaded_file.name, raw_content)
+        return uploaded_file.name, raw_content
+    previous = session_policies()
+    if not previous:
+        return None, None
+    names = {policy: name for policy, name in previous}
+    choice = st.selectbox("Or reuse a policy uploaded earlier in this session", [None] + list(names), format_func=lambda policy: "—" if policy is None else names[policy], key=f"{key}_previous")
+    return session_policy(choice) if choice is not None else (None, None)
+
+def rule_index(xml_content):
+    """This session's editable RuleIndex for a policy, parsed once per content hash"""
+    key = policy_key(xml_content.encode('utf-8'))
+    indexes = st.session_state.setdefault('rule_indexes', OrderedDict())
+    if key not in indexes:
+        indexes[key] = RuleIndex(xml_content)
+        while len(indexes) > MAX_SESSION_RULE_INDEXES:
+            indexes.popitem(last=False)
+    indexes.move_to_end(key)
+    return indexes[key]
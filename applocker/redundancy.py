@@ -0,0 +1,359 @@
+"""Redundant and shadowed rule detection by condition subsumption
+
+A rule is redundant when every file it matches is already matched, with the
+same action, by another rule for the same principal or for Everyone, and
+shadowed when it is an Allow whose every file is denied for its principal.
+Only rules without exceptions are used as the covering side.
+
+Rules are indexed per (collection, action, principal):
+
+- path conditions in a trie of path components, where folder rules
+  ('C:\\Windows\\*', '*') mark the node they cover, so a rule is checked
+  against all of its covering folders in one walk down its own path
+- publisher conditions in a publisher -> product -> binary index, '*' levels
+  included, whose leaves hold version ranges sorted by their low bound with a
+  running widest range, so containment is one bisection per leaf
+- hashes and exact paths in dicts
+
+Among rules that match exactly the same files the first in document order is
+kept and the later ones are reported, so removing every reported rule never
+changes what the policy decides. Analysis is O(n log n) in the number of rules.
+
+Hash rules are only compared with other hash rules, unless a file metadata
+cache (see applocker.filecache) knows the signer of the hashed file; then a
+publisher rule for that signer covers them as well.
+
+Usage:
+    python -m applocker.redundancy policy.xml -o redundant_rules.csv --pruned policy_pruned.xml
+"""
+import argparse
+import csv
+import os
+import sys
+import xml.etree.ElementTree as ET
+from bisect import bisect_right
+from collections import namedtuple
+
+from applocker.evaluate import DEFAULT_PATH_VARIABLES, EVERYONE_SID, expand_path
+from applocker.filecache import FileMetadataCache
+from applocker.rules import UNBOUNDED_VERSION, parse_version
+from applocker.stream import RULE_TYPES, iter_policy_events
+
+REDUNDANCY_COLUMNS = ['Kind', 'Collection', 'RuleType', 'Action', 'Principal', 'RuleName', 'RuleId', 'RuleNumber', 'CoveredBy', 'CoveredById', 'Detail']
+
+# One rule as analyzed; number is its 1-based position among the policy's rules
+RuleConditions = namedtuple('RuleConditions', ['number', 'collection', 'rule_type', 'id', 'name', 'action', 'principal', 'has_exceptions', 'conditions'])
+
+def _normalized_conditions(rule, variables):
+    """('Hash', digest, length), ('Publisher', ...) and ('Path', patterns) for each condition, or None if any is unknown"""
+    conditions = []
+    for section in rule:
+        if section.tag != 'Conditions':
+            continue
+        for condition in section:
+            if condition.tag == 'FileHashCondition':
+                for file_hash in condition.iter('FileHash'):
+                    data = file_hash.get('Data', '').upper()
+                    if data.startswith('0X'):
+                        data = data[2:]
+                    conditions.append(('Hash', data, file_hash.get('SourceFileLength', ''), file_hash.get('SourceFileName', '').lower()))
+            elif condition.tag == 'FilePublisherCondition':
+                version_range = condition.find('BinaryVersionRange')
+                conditions.append((
+                    'Publisher',
+                    condition.get('PublisherName', '*').lower(),
+                    condition.get('ProductName', '*').lower(),
+                    condition.get('BinaryName', '*').lower(),
+                    parse_version(version_range.get('LowSection') if version_range is not None else '*'),
+                    parse_version(version_range.get('HighSection') if version_range is not None else '*', UNBOUNDED_VERSION),
+                ))
+            elif condition.tag == 'FilePathCondition':
+                patterns = []
+                for pattern in expand_path(condition.get('Path', ''), variables):
+                    patterns.append(pattern + '*' if pattern.endswith('\\') else pattern)
+                conditions.append(('Path', tuple(patterns)))
+            else:
+                return None
+    return conditions or None
+
+def _with_wildcard(value):
+    return (value, '*') if value != '*' else ('*',)
+
+class _PathNode:
+    __slots__ = ('rule', 'children')
+
+    def __init__(self):
+        self.rule = None
+        self.children = {}
+
+class CoverIndex:
+    """Conditions of the rules of one (collection, action, principal), answering which rule covers a condition"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.exact_paths = {}
+        self.folders = _PathNode()
+        # (publisher, product, binary) -> [(low, high, rule number)]
+        self.publishers = {}
+        self._ranges = None
+
+    def add(self, condition, number):
+        kind = condition[0]
+        if kind == 'Hash':
+            self.hashes.setdefault(condition[1], number)
+        elif kind == 'Publisher':
+            self.publishers.setdefault(condition[1:4], []).append((condition[4], condition[5], number))
+            self._ranges = None
+        else:
+            for pattern in condition[1]:
+                self.exact_paths.setdefault(pattern, number)
+                if pattern == '*':
+                    folder = ''
+                elif pattern.endswith('\\*') and '*' not in pattern[:-2] and '?' not in pattern:
+                    folder = pattern[:-2]
+                else:
+                    continue
+                node = self.folders
+                if folder:
+                    for part in folder.split('\\'):
+                        node = node.children.setdefault(part, _PathNode())
+                if node.rule is None:
+                    node.rule = number
+
+    def _leaf_ranges(self):
+        if self._ranges is None:
+            self._ranges = {}
+            for key, entries in self.publishers.items():
+                entries.sort(key=lambda entry: (entry[0], entry[2]))
+                # Widest range among the entries up to each one: highest high, then lowest low, then earliest
+                best = []
+                for entry in entries:
+                    if not best or (entry[1], best[-1][0]) > (best[-1][1], entry[0]):
+                        best.append(entry)
+                    else:
+                        best.append(best[-1])
+                self._ranges[key] = ([entry[0] for entry in entries], best)
+        return self._ranges
+
+    def cover_path(self, pattern, number):
+        """Number of another rule matching every file `pattern` matches, or None"""
+        covering = self.exact_paths.get(pattern)
+        if covering is not None and covering != number:
+            return covering
+        node = self.folders
+        if node.rule is not None and node.rule != number:
+            return node.rule
+        for part in pattern.split('\\')[:-1]:
+            node = node.children.get(part)
+            if node is None:
+                break
+            if node.rule is not None and node.rule != number:
+                return node.rule
+        return None
+
+    def cover_publisher(self, publisher, product, binary, low, high, number):
+        ranges = self._leaf_ranges()
+        # A '*' on the covered side is only covered by '*'
+        for publisher_key in _with_wildcard(publisher):
+            for product_key in _with_wildcard(product):
+                for binary_key in _with_wildcard(binary):
+                    leaf = ranges.get((publisher_key, product_key, binary_key))
+                    if leaf is None:
+                        continue
+                    lows, best = leaf
+                    position = bisect_right(lows, low)
+                    if not position:
+                        continue
+                    best_low, best_high, best_number = best[position - 1]
+                    if best_high >= high and best_number != number:
+                        return best_number
+        return None
+
+    def cover(self, condition, number, signer=None):
+        """Number of a rule other than `number` covering a normalized condition, or None
+
+        `signer` is the (publisher, binary, version) of a hashed file, when known.
+        """
+        kind = condition[0]
+        if kind == 'Hash':
+            covering = self.hashes.get(condition[1])
+            if covering is not None and covering != number:
+                return covering
+            if signer is not None:
+                publisher, binary, version = signer
+                # The file's product name is not known, so only ProductName="*" rules can cover it
+                return self.cover_publisher(publisher, '*', binary, version, version, number)
+            return None
+        if kind == 'Publisher':
+            return self.cover_publisher(*condition[1:], number)
+        for pattern in condition[1]:
+            covering = self.cover_path(pattern, number)
+            if covering is None:
+                return None
+        return covering
+
+class RedundancyIndex:
+    """Every rule of a policy with its normalized conditions, indexed for subsumption"""
+
+    def __init__(self, variables=DEFAULT_PATH_VARIABLES, metadata_cache=None):
+        self.variables = variables
+        self.metadata_cache = metadata_cache
+        self.rules = []
+        # (collection, action, principal) -> CoverIndex
+        self.groups = {}
+
+    def add_rule(self, collection_type, rule):
+        if rule.tag not in RULE_TYPES:
+            return
+        has_exceptions = any(section.tag == 'Exceptions' and len(section) for section in rule)
+        entry = RuleConditions(
+            len(self.rules) + 1,
+            collection_type,
+            rule.tag,
+            rule.get('Id', ''),
+            rule.get('Name', ''),
+            rule.get('Action', ''),
+            rule.get('UserOrGroupSid', '').upper(),
+            has_exceptions,
+            _normalized_conditions(rule, self.variables),
+        )
+        self.rules.append(entry)
+        # A rule with exceptions does not match everything its conditions do
+        if entry.conditions is None or has_exceptions:
+            return
+        group = self.groups.setdefault((collection_type, entry.action, entry.principal), CoverIndex())
+        for condition in entry.conditions:
+            group.add(condition, entry.number)
+
+    def add_policy(self, source):
+        for event, collection_type, elem in iter_policy_events(source):
+            if event == 'rule':
+                self.add_rule(collection_type, elem)
+                elem.clear()
+        return self
+
+    def _signer(self, condition):
+        if self.metadata_cache is None or not condition[2].isdigit():
+            return None
+        metadata = self.metadata_cache.lookup_file_hash(condition[1].lower(), int(condition[2]))
+        if not metadata or not metadata.get('publisher'):
+            return None
+        # Same binary name choice as the EXE policy generator
+        internal_name = metadata.get('internal_name') or ''
+        binary = internal_name.lower() if '.' in internal_name else condition[3]
+        return metadata['publisher'].lower(), binary, parse_version(metadata.get('version'))
+
+    def _covering_rule(self, entry, action):
+        """Number of a rule whose `action` covers every condition of `entry`, or None"""
+        groups = [self.groups.get((entry.collection, action, entry.principal))]
+        if entry.principal != EVERYONE_SID:
+            groups.append(self.groups.get((entry.collection, action, EVERYONE_SID)))
+        groups = [group for group in groups if group is not None]
+        if not groups:
+            return None
+        first = None
+        for condition in entry.conditions:
+            signer = self._signer(condition) if condition[0] == 'Hash' else None
+            for group in groups:
+                covering = group.cover(condition, entry.number, signer)
+                if covering is not None:
+                    break
+            else:
+                return None
+            if first is None:
+                first = covering
+        return first
+
+    def findings(self):
+        """One dict (REDUNDANCY_COLUMNS) per shadowed or redundant rule, in document order"""
+        findings = []
+        for entry in self.rules:
+            if entry.conditions is None or entry.action not in ('Allow', 'Deny'):
+                continue
+            kind = None
+            if entry.action == 'Allow':
+                covering = self._covering_rule(entry, 'Deny')
+                if covering is not None:
+                    kind = 'Shadowed'
+            if kind is None:
+                covering = self._covering_rule(entry, entry.action)
+                if covering is not None:
+                    kind = 'Redundant'
+            if kind is None:
+                continue
+            cover = self.rules[covering - 1]
+            if kind == 'Shadowed':
+                detail = f"Allow can never take effect: every file it matches is denied by '{cover.name}' for {cover.principal}."
+            else:
+                detail = f"Every file it matches is already {'allowed' if entry.action == 'Allow' else 'denied'} by '{cover.name}' for {cover.principal}; the rule can be removed."
+            findings.append({
+                'Kind': kind,
+                'Collection': entry.collection,
+                'RuleType': entry.rule_type,
+                'Action': entry.action,
+                'Principal': entry.principal,
+                'RuleName': entry.name,
+                'RuleId': entry.id,
+                'RuleNumber': entry.number,
+                'CoveredBy': cover.name,
+                'CoveredById': cover.id,
+                'Detail': detail,
+            })
+        return findings
+
+def find_redundant_rules(source, metadata_cache=None, variables=DEFAULT_PATH_VARIABLES):
+    """Shadowed and redundant rules of a policy (path, bytes, XML text or file object)"""
+    return RedundancyIndex(variables, metadata_cache).add_policy(source).findings()
+
+def prune_policy(xml_content, rule_numbers):
+    """Policy XML text without the rules at the given 1-based RuleNumbers"""
+    rule_numbers = set(rule_numbers)
+    root = ET.fromstring(xml_content)
+    number = 0
+    for collection in root.iter('RuleCollection'):
+        kept = []
+        for rule in collection:
+            if rule.tag in RULE_TYPES:
+                number += 1
+                if number in rule_numbers:
+                    continue
+            kept.append(rule)
+        collection[:] = kept
+    return ET.tostring(root, encoding='unicode')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find AppLocker rules that are redundant with, or shadowed by, broader rules.")
+    parser.add_argument('policy', help="Policy XML")
+    parser.add_argument('-o', '--output', help="CSV of redundant and shadowed rules (default: stdout)")
+    parser.add_argument('--pruned', help="Also write the policy without those rules to this file")
+    parser.add_argument('--cache-dir', help="Use file_metadata.sqlite under this directory to match hash rules against publisher rules")
+    args = parser.parse_args(argv)
+
+    cache = FileMetadataCache(os.path.join(args.cache_dir, 'file_metadata.sqlite')) if args.cache_dir else None
+    try:
+        index = RedundancyIndex(metadata_cache=cache).add_policy(args.policy)
+        findings = index.findings()
+    finally:
+        if cache is not None:
+            cache.close()
+
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        writer = csv.DictWriter(out, fieldnames=REDUNDANCY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(findings)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if args.pruned:
+        with open(args.policy, 'rb') as f:
+            pruned = prune_policy(f.read(), (finding['RuleNumber'] for finding in findings))
+        with open(args.pruned, 'w', encoding='utf-8') as f:
+            f.write(pruned)
+    shadowed = sum(1 for finding in findings if finding['Kind'] == 'Shadowed')
+    print(f"{len(index.rules)} rules: {len(findings) - shadowed} redundant, {shadowed} shadowed", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""Paged, editable index over the rules of one policy tree
+
+The policy is parsed once. Every rule is kept as a reference to its element
+in that tree together with its collection and offset, so a page of rules can
+be serialized on demand and edits are applied to the same tree instead of
+re-parsing per-editor buffers.
+"""
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
+
+RULE_TYPE_LABELS = {
+    'FileHashRule': 'Hash',
+    'FilePublisherRule': 'Publisher',
+    'FilePathRule': 'Path',
+}
+
+class RuleIndex:
+    """All rules of a policy by position, with filtering, paging and in-place edits"""
+
+    def __init__(self, xml_content):
+        self.root = ET.fromstring(xml_content)
+        self.edits = 0
+        self._reindex()
+
+    def _reindex(self):
+        # (collection element, offset in collection, rule element, lowercased search text)
+        self.entries = []
+        for collection in self.root.iter('RuleCollection'):
+            for offset, rule in enumerate(collection):
+                if rule.tag not in RULE_TYPE_LABELS:
+                    continue
+                self.entries.append((collection, offset, rule, None))
+
+    def _search_text(self, position):
+        collection, offset, rule, text = self.entries[position]
+        if text is None:
+            # Built on first search only, then kept for later filters
+            parts = [rule.get('Id', ''), rule.get('Name', ''), rule.get('Description', ''), rule.get('UserOrGroupSid', '')]
+            for condition in rule.iter():
+                parts.extend(condition.attrib.values())
+            text = '\n'.join(parts).lower()
+            self.entries[position] = (collection, offset, rule, text)
+        return text
+
+    def collections(self):
+        return [collection.get('Type', 'Unknown') for collection in self.root.iter('RuleCollection')]
+
+    def counts(self):
+        """Rule counts per type label, plus DLL and script path rules as the page has always shown them"""
+        counts = {label: 0 for label in RULE_TYPE_LABELS.values()}
+        counts['DLL'] = counts['Script'] = 0
+        for _, _, rule, _ in self.entries:
+            counts[RULE_TYPE_LABELS[rule.tag]] += 1
+            if rule.tag == 'FilePathRule':
+                description_element = rule.find('Description')
+                if description_element is not None:
+                    if 'DLLs' in (description_element.text or ''):
+                        counts['DLL'] += 1
+                    elif 'scripts' in (description_element.text or ''):
+                        counts['Script'] += 1
+        return counts
+
+    def select(self, rule_type=None, collection_type=None, text=None):
+        """Positions of the rules matching a type label, collection and case-insensitive text"""
+        text = text.strip().lower() if text else ''
+        positions = []
+        for position, (collection, _, rule, _) in enumerate(self.entries):
+            if rule_type and RULE_TYPE_LABELS[rule.tag] != rule_type:
+                continue
+            if collection_type and collection.get('Type', 'Unknown') != collection_type:
+                continue
+            if text and text not in self._search_text(position):
+                continue
+            positions.append(position)
+        return positions
+
+    def rules_xml(self, positions):
+        """The rules at `positions` as XML text, grouped in a RuleCollection element per run of one collection"""
+        parts = []
+        previous = None
+        for position in positions:
+            collection, _, rule, _ = self.entries[position]
+            if collection is not previous:
+                if previous is not None:
+                    parts.append('</RuleCollection>')
+                parts.append(f"<RuleCollection Type={quoteattr(collection.get('Type', 'Unknown'))}>")
+                previous = collection
+            parts.append(ET.tostring(rule, encoding='unicode').strip())
+        if previous is not None:
+            parts.append('</RuleCollection>')
+        return '\n'.join(parts)
+
+    def _collection_of_type(self, collection_type, page):
+        # Prefer the collection the page showed under this Type, then the first in the policy
+        for collection, _, _, _ in page:
+            if collection.get('Type', 'Unknown') == collection_type:
+                return collection
+        for collection in self.root.iter('RuleCollection'):
+            if collection.get('Type', 'Unknown') == collection_type:
+                return collection
+        return ET.SubElement(self.root, 'RuleCollection', Type=collection_type, EnforcementMode='NotConfigured')
+
+    def replace(self, positions, edited_xml):
+        """Apply an edited page of rules to the tree
+
+        Rules are matched by Id: a rule whose Id was on the page replaces it at
+        its offset, Ids no longer present are deleted, and new Ids are inserted
+        after the page's last rule in their collection. A rule placed under a
+        RuleCollection element of another Type moves to that collection (which
+        is created if the policy has none); rules outside any RuleCollection
+        element stay in theirs. Each affected collection is rebuilt once.
+        Raises ET.ParseError on invalid XML and ValueError, leaving the tree
+        untouched, when a new rule reuses an Id the policy already has.
+        """
+        edited = []
+        for element in ET.fromstring(f"<Rules>{edited_xml}</Rules>"):
+            if element.tag == 'RuleCollection':
+                edited.extend((element.get('Type', 'Unknown'), rule) for rule in element)
+            else:
+                edited.append((None, element))
+        page = [self.entries[position] for position in positions]
+        by_id = {}
+        for collection, offset, rule, _ in page:
+            by_id.setdefault(rule.get('Id', ''), []).append((collection, offset, rule))
+
+        # collection -> {offset: replacement rule, or None to delete}
+        changes = {}
+        for collection, offset, _, _ in page:
+            changes.setdefault(collection, {})[offset] = None
+        kept_ids = set()
+        moved = []
+        added = []
+        for collection_type, new_rule in edited:
+            matches = by_id.get(new_rule.get('Id', ''))
+            if not matches:
+                added.append((collection_type, new_rule))
+                continue
+            collection, offset, old_rule = matches.pop(0)
+            kept_ids.add(new_rule.get('Id', ''))
+            if collection_type is None or collection_type == collection.get('Type', 'Unknown'):
+                new_rule.tail = old_rule.tail
+                changes[collection][offset] = new_rule
+            else:
+                moved.append((collection_type, new_rule))
+
+        on_page = set(positions)
+        taken = {rule.get('Id', '') for position, (_, _, rule, _) in enumerate(self.entries) if position not in on_page}
+        taken |= kept_ids
+        for _, new_rule in added:
+            rule_id = new_rule.get('Id', '')
+            if rule_id in taken:
+                raise ValueError(f"Rule Id {rule_id!r} is already used by another rule in the policy; give the new rule a new Id")
+            taken.add(rule_id)
+
+        # collection -> rules to insert after the page's last rule in it, or after its last child
+        inserted = {}
+        for collection_type, new_rule in moved + added:
+            if collection_type is not None:
+                collection = self._collection_of_type(collection_type, page)
+            elif page:
+                collection = page[-1][0]
+            else:
+                collection = next(self.root.iter('RuleCollection'), None)
+                if collection is None:
+                    collection = ET.SubElement(self.root, 'RuleCollection', Type='Exe', EnforcementMode='NotConfigured')
+            inserted.setdefault(collection, []).append(new_rule)
+        anchors = {}
+        for collection, rules in inserted.items():
+            anchor_offset = max((offset for page_collection, offset, _, _ in page if page_collection is collection), default=len(collection) - 1)
+            tail = collection[anchor_offset].tail if anchor_offset >= 0 else '\n'
+            for new_rule in rules:
+                new_rule.tail = tail
+            anchors[collection] = anchor_offset
+            changes.setdefault(collection, {})
+
+        for collection, replacements in changes.items():
+            rules = inserted.get(collection, [])
+            anchor_offset = anchors.get(collection)
+            children = []
+            if anchor_offset is not None and anchor_offset < 0:
+                children.extend(rules)
+            for offset, child in enumerate(collection):
+                replacement = replacements.get(offset, child)
+                if replacement is not None:
+                    children.append(replacement)
+                if offset == anchor_offset:
+                    children.extend(rules)
+            collection[:] = children
+        self.edits += 1
+        self._reindex()
+
+    def load(self, xml_content):
+        """Replace the whole tree with an edited document; raises ET.ParseError on invalid XML"""
+        root = ET.fromstring(xml_content)
+        self.root = root
+        self.edits += 1
+        self._reindex()
+
+    def to_xml(self):
+        return ET.tostring(self.root, encoding='unicode')
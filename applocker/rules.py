@@ -0,0 +1,72 @@
+"""Canonical forms of AppLocker rules for indexing, dedup and diffing"""
+import hashlib
+
+UNBOUNDED_VERSION = (float('inf'),) * 4
+
+def _normalized_condition(condition):
+    tag = condition.tag
+    if tag == 'FilePathCondition':
+        return (tag, condition.get('Path', '').lower())
+    if tag == 'FilePublisherCondition':
+        version_range = condition.find('BinaryVersionRange')
+        low = version_range.get('LowSection', '*') if version_range is not None else '*'
+        high = version_range.get('HighSection', '*') if version_range is not None else '*'
+        return (
+            tag,
+            condition.get('PublisherName', '').lower(),
+            condition.get('ProductName', '').lower(),
+            condition.get('BinaryName', '').lower(),
+            low,
+            high,
+        )
+    if tag == 'FileHashCondition':
+        # SourceFileName/SourceFileLength are informational; only the digests match files
+        hashes = sorted((h.get('Type', ''), h.get('Data', '').upper()) for h in condition.iter('FileHash'))
+        return (tag, *hashes)
+    return (tag, tuple(sorted(condition.attrib.items())))
+
+def canonical_conditions(rule):
+    """Normalized, order-independent (conditions, exceptions) of a rule"""
+    conditions = []
+    exceptions = []
+    for section in rule:
+        if section.tag == 'Conditions':
+            conditions.extend(_normalized_condition(c) for c in section)
+        elif section.tag == 'Exceptions':
+            exceptions.extend(_normalized_condition(c) for c in section)
+    return tuple(sorted(conditions)), tuple(sorted(exceptions))
+
+def rule_content_key(rule):
+    """Everything that decides what a rule matches and does, independent of Id, Name and Description"""
+    conditions, exceptions = canonical_conditions(rule)
+    return (rule.tag, rule.get('Action', ''), rule.get('UserOrGroupSid', '').upper(), conditions, exceptions)
+
+def rule_content_hash(rule):
+    """Compact digest of rule_content_key, for indexes over very large policies"""
+    return hashlib.blake2b(repr(rule_content_key(rule)).encode('utf-8'), digest_size=16).digest()
+
+def parse_fqbn(fqbn):
+    """Split an event's fully qualified binary name into (publisher, product, binary, version)
+
+    Unsigned files are logged with '-', which yields None.
+    """
+    if not fqbn or fqbn == '-':
+        return None
+    parts = fqbn.split('\\')
+    parts += [''] * (4 - len(parts))
+    # The publisher itself never contains a backslash, but product names may
+    publisher, binary, version = parts[0], parts[-2], parts[-1]
+    product = '\\'.join(parts[1:-2])
+    return publisher, product, binary, version
+
+def parse_version(version, default=(0, 0, 0, 0)):
+    """'1.2.3.4' as a comparable 4-tuple; '*' and empty give the default"""
+    if not version or version == '*':
+        return default
+    parts = []
+    for part in version.split('.')[:4]:
+        try:
+            parts.append(int(part))
+        except ValueError:
+            parts.append(0)
+    return tuple(parts + [0] * (4 - len(parts)))
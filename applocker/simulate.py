@@ -0,0 +1,254 @@
+"""What-if simulation of a candidate policy against an endpoint inventory
+
+Replays an inventory CSV (path, SHA256, signer, version, host, ...) against
+one or more policies, e.g. a Combiner output plus files from default/, and
+reports how many files each host would have blocked and how often each rule
+fires. Evaluation uses the compiled matcher from applocker.evaluate.
+
+The CSV is split into byte ranges that end on line boundaries and each range
+is evaluated in a worker process holding its own compiled policy, so only
+small per-host and per-rule tallies cross process boundaries. Inventories
+repeat the same files across hosts, so each worker also memoizes decisions
+per distinct file. Quoted fields must not contain line breaks.
+
+Usage:
+    python -m applocker.simulate inventory.csv --policy combined.xml --policy default/PathBlockRules-EXE.xml --hosts host_blocks.csv --rules rule_hits.csv
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+
+from applocker.evaluate import compile_policies, inventory_columns, query_from_row
+from applocker.parallel import map_chunks
+
+HOST_COLUMNS = ('host', 'hostname', 'computer', 'computername', 'device', 'devicename')
+BLOCKED_DECISIONS = ('Denied', 'DeniedByDefault')
+
+# Distinct files a worker remembers decisions for before starting over
+MAX_MEMO_ENTRIES = 200_000
+
+def host_column(fieldnames):
+    lowered = {name.strip().lower(): name for name in fieldnames}
+    for candidate in HOST_COLUMNS:
+        if candidate in lowered:
+            return lowered[candidate]
+    return None
+
+class SimulationResult:
+    """Per-host and per-rule tallies of the decisions for an inventory
+
+    `enforcement_modes` (collection -> EnforcementMode) marks which denials
+    only get logged: those in AuditOnly collections count as audited, not blocked.
+    """
+
+    def __init__(self, enforcement_modes=None):
+        self.enforcement_modes = enforcement_modes or {}
+        # host -> {decision: files}
+        self.hosts = {}
+        # host -> denied files in AuditOnly collections, which run anyway
+        self.audited = {}
+        # (collection, rule id) -> {decision: files}; rule id '' is the collection's default deny
+        self.rules = {}
+        # (collection, rule id) -> set of hosts where the rule or default deny blocked a file
+        self.blocking_hosts = {}
+        self.files = 0
+
+    def add(self, host, collection, decision, rule):
+        self.files += 1
+        host_counts = self.hosts.setdefault(host, {})
+        host_counts[decision] = host_counts.get(decision, 0) + 1
+        if decision in BLOCKED_DECISIONS and self.enforcement_modes.get(collection) == 'AuditOnly':
+            self.audited[host] = self.audited.get(host, 0) + 1
+        if decision == 'AllowedByDefault':
+            return
+        key = (rule.collection, rule.id) if rule is not None else (collection, '')
+        rule_counts = self.rules.setdefault(key, {})
+        rule_counts[decision] = rule_counts.get(decision, 0) + 1
+        if decision in BLOCKED_DECISIONS:
+            self.blocking_hosts.setdefault(key, set()).add(host)
+
+    def update(self, other):
+        """Merge another result, e.g. one produced by a worker for a single range"""
+        self.files += other.files
+        for tallies, other_tallies in ((self.hosts, other.hosts), (self.rules, other.rules)):
+            for key, counts in other_tallies.items():
+                mine = tallies.setdefault(key, {})
+                for decision, count in counts.items():
+                    mine[decision] = mine.get(decision, 0) + count
+        for key, hosts in other.blocking_hosts.items():
+            self.blocking_hosts.setdefault(key, set()).update(hosts)
+        for host, count in other.audited.items():
+            self.audited[host] = self.audited.get(host, 0) + count
+
+    def audited_count(self):
+        return sum(self.audited.values())
+
+    def blocked(self):
+        """Denied files in enforced collections"""
+        denied = sum(counts.get(decision, 0) for counts in self.hosts.values() for decision in BLOCKED_DECISIONS)
+        return denied - self.audited_count()
+
+    def host_rows(self):
+        """One dict per host, most blocked files first; Audited denials are not in Blocked"""
+        rows = []
+        for host, counts in self.hosts.items():
+            audited = self.audited.get(host, 0)
+            rows.append({
+                'Host': host,
+                'Files': sum(counts.values()),
+                'Allowed': counts.get('Allowed', 0) + counts.get('AllowedByDefault', 0),
+                'Denied': counts.get('Denied', 0),
+                'DeniedByDefault': counts.get('DeniedByDefault', 0),
+                'Blocked': counts.get('Denied', 0) + counts.get('DeniedByDefault', 0) - audited,
+                'Audited': audited,
+            })
+        rows.sort(key=lambda row: (-row['Blocked'], row['Host']))
+        return rows
+
+    def rule_rows(self, policy):
+        """One dict per policy rule, then one per collection's default deny, in policy order"""
+        rows = []
+        for rule in policy.rules:
+            counts = self.rules.get((rule.collection, rule.id), {})
+            rows.append({
+                'Collection': rule.collection,
+                'EnforcementMode': policy.enforcement_modes.get(rule.collection, 'NotConfigured'),
+                'RuleId': rule.id,
+                'RuleName': rule.name,
+                'Action': rule.action,
+                'Allowed': counts.get('Allowed', 0),
+                'Blocked': counts.get('Denied', 0),
+                'BlockedHosts': len(self.blocking_hosts.get((rule.collection, rule.id), ())),
+            })
+        for (collection, rule_id), counts in self.rules.items():
+            if rule_id:
+                continue
+            rows.append({
+                'Collection': collection,
+                'EnforcementMode': policy.enforcement_modes.get(collection, 'NotConfigured'),
+                'RuleId': '',
+                'RuleName': '(default deny: no allow rule matched)',
+                'Action': 'Deny',
+                'Allowed': 0,
+                'Blocked': counts.get('DeniedByDefault', 0),
+                'BlockedHosts': len(self.blocking_hosts.get((collection, ''), ())),
+            })
+        return rows
+
+def simulate_rows(policy, rows, columns, host, memo=None):
+    """Evaluate inventory rows (dicts) into a SimulationResult
+
+    `memo` maps a file's raw column values to its decision and is reused
+    across calls; it is cleared once it holds MAX_MEMO_ENTRIES files.
+    """
+    result = SimulationResult(policy.enforcement_modes)
+    memo = {} if memo is None else memo
+    query_columns = list(columns.values())
+    for row in rows:
+        key = tuple(row.get(column) for column in query_columns)
+        decided = memo.get(key)
+        if decided is None:
+            query = query_from_row(row, columns, policy.variables)
+            decision, rule = policy.evaluate(query)
+            if len(memo) >= MAX_MEMO_ENTRIES:
+                memo.clear()
+            decided = memo[key] = (query.collection, decision, rule)
+        result.add((row.get(host) or '') if host else '', *decided)
+    return result
+
+def inventory_ranges(inventory_path, chunk_bytes=8 * 1024 * 1024):
+    """Read the header and split the rest of an inventory into (start, end) byte ranges"""
+    with open(inventory_path, 'rb') as f:
+        header_line = f.readline()
+        data_start = f.tell()
+    size = os.path.getsize(inventory_path)
+    fieldnames = next(csv.reader([header_line.decode('utf-8-sig')]), [])
+    return fieldnames, [(start, min(start + chunk_bytes, size)) for start in range(data_start, size, chunk_bytes)]
+
+def _iter_range_lines(inventory_path, start, end):
+    # A range owns every line that starts inside it; the line straddling `start` belongs to the previous range
+    with open(inventory_path, 'rb') as f:
+        f.seek(start - 1)
+        position = start - 1 + len(f.readline())
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line.decode('utf-8', errors='replace')
+
+_worker_state = {}
+
+def _init_worker(policy_sources, inventory_path, fieldnames):
+    policy = compile_policies(policy_sources)
+    _worker_state.update(
+        policy=policy,
+        inventory_path=inventory_path,
+        fieldnames=fieldnames,
+        columns=inventory_columns(fieldnames),
+        host=host_column(fieldnames),
+        memo={},
+    )
+
+def simulate_range(task):
+    """Worker: evaluate the inventory lines in one byte range"""
+    start, end = task
+    state = _worker_state
+    rows = csv.DictReader(_iter_range_lines(state['inventory_path'], start, end), fieldnames=state['fieldnames'])
+    return simulate_rows(state['policy'], rows, state['columns'], state['host'], state['memo'])
+
+def simulate_inventory(policy_sources, inventory_path, workers=None, chunk_bytes=8 * 1024 * 1024, progress=None):
+    """Replay an inventory CSV against the combined policies
+
+    Returns (result, stats). Policies are given as paths or raw bytes so each
+    worker can compile its own copy.
+    """
+    started = time.perf_counter()
+    fieldnames, tasks = inventory_ranges(inventory_path, chunk_bytes)
+    if 'path' not in inventory_columns(fieldnames):
+        raise ValueError(f"{inventory_path} has no Path column")
+    result = SimulationResult()
+    for range_result in map_chunks(simulate_range, tasks, workers, 1, progress, initializer=_init_worker, initargs=(policy_sources, inventory_path, fieldnames)):
+        result.update(range_result)
+    seconds = time.perf_counter() - started
+    stats = {'ranges': len(tasks), 'files': result.files, 'hosts': len(result.hosts), 'blocked': result.blocked(), 'audited': result.audited_count(), 'seconds': seconds}
+    return result, stats
+
+def write_rows(rows, output_path):
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        if rows:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay an endpoint inventory against candidate AppLocker policies and count blocks per host and per rule.")
+    parser.add_argument('inventory', help="Inventory CSV with Path, SHA256, Signer, Version and Host columns")
+    parser.add_argument('-p', '--policy', action='append', required=True, help="Policy XML; repeat to combine several (e.g. a Combiner output and default/ files) in order of increasing GPO precedence, so the last EnforcementMode configured for a collection wins")
+    parser.add_argument('--hosts', default='host_blocks.csv', help="CSV of per-host block counts")
+    parser.add_argument('--rules', default='rule_hits.csv', help="CSV of per-rule allow and block counts")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Worker processes (default: CPU count; 1 disables the pool)")
+    parser.add_argument('--chunk-mb', type=int, default=8, help="Inventory megabytes per work unit")
+    args = parser.parse_args(argv)
+
+    try:
+        result, stats = simulate_inventory(args.policy, args.inventory, workers=args.workers, chunk_bytes=args.chunk_mb * 1024 * 1024)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    policy = compile_policies(args.policy)
+    for collection, modes in policy.enforcement_disagreements().items():
+        configured = ', '.join(f"{args.policy[number]}: {mode}" for number, mode in modes)
+        print(f"Warning: the policies disagree on the {collection} EnforcementMode ({configured}); "
+              f"using {policy.enforcement_modes[collection]} from the highest-precedence one", file=sys.stderr)
+    write_rows(result.host_rows(), args.hosts)
+    write_rows(result.rule_rows(policy), args.rules)
+    print(f"Files: {stats['files']}, hosts: {stats['hosts']}, blocked: {stats['blocked']}, audited: {stats['audited']} "
+          f"in {stats['seconds']:.2f}s ({stats['files'] / stats['seconds'] if stats['seconds'] else 0:.0f} files/sec)")
+    print(f"Per-host counts written to {args.hosts}, per-rule counts to {args.rules}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Streaming AppLocker policy reader built on iterparse
+
+Rules are handed out one at a time and detached from the tree as soon as the
+consumer moves on, so memory stays flat no matter how many rules a policy has.
+"""
+import io
+import xml.etree.ElementTree as ET
+
+RULE_TYPES = ('FilePathRule', 'FilePublisherRule', 'FileHashRule')
+
+def open_policy_source(source):
+    """Return something iterparse can read from a path, raw bytes, XML text or file object"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if isinstance(source, str):
+        if source[:256].lstrip('\ufeff \t\r\n').startswith('<'):
+            return io.StringIO(source)
+        return source
+    return source
+
+def iter_policy_events(source):
+    """Stream (event, collection_type, element) tuples from a policy
+
+    Events are 'policy' when the AppLockerPolicy root opens, 'collection' when a
+    RuleCollection opens and 'rule' when a rule element has been read in full.
+    Only attributes are populated on 'policy' and 'collection' elements. A 'rule'
+    element is removed from its collection once the consumer resumes, so callers
+    that keep it (e.g. to append it to another tree) own the only reference.
+    """
+    depth = 0
+    collection = None
+    collection_type = None
+    for event, elem in ET.iterparse(open_policy_source(source), events=('start', 'end')):
+        if event == 'start':
+            depth += 1
+            if depth == 1:
+                yield 'policy', None, elem
+            elif depth == 2 and elem.tag == 'RuleCollection':
+                collection = elem
+                collection_type = elem.get('Type', 'Unknown')
+                yield 'collection', collection_type, elem
+            continue
+
+        depth -= 1
+        if depth == 2 and collection is not None:
+            yield 'rule', collection_type, elem
+            collection.remove(elem)
+        elif depth == 1 and elem is collection:
+            collection = None
+            collection_type = None
+
+def _condition_record(condition):
+    record = {'Type': condition.tag, **condition.attrib}
+    for child in condition:
+        if child.tag == 'FileHash':
+            record.setdefault('FileHashes', []).append(dict(child.attrib))
+        else:
+            record[child.tag] = dict(child.attrib)
+    return record
+
+def rule_record(collection_type, rule):
+    """Flatten a rule element into a plain dict"""
+    record = {
+        'Collection': collection_type,
+        'RuleType': rule.tag,
+        'Id': rule.get('Id', ''),
+        'Name': rule.get('Name', ''),
+        'Description': rule.get('Description', ''),
+        'UserOrGroupSid': rule.get('UserOrGroupSid', ''),
+        'Action': rule.get('Action', ''),
+        'Conditions': [],
+        'Exceptions': [],
+    }
+    for section in rule:
+        if section.tag == 'Conditions':
+            record['Conditions'].extend(_condition_record(c) for c in section)
+        elif section.tag == 'Exceptions':
+            record['Exceptions'].extend(_condition_record(c) for c in section)
+    return record
+
+def iter_rule_records(source):
+    """Stream every rule in a policy as a plain dict, clearing each element after it is read"""
+    for event, collection_type, elem in iter_policy_events(source):
+        if event == 'rule':
+            record = rule_record(collection_type, elem)
+            elem.clear()
+            yield record
+
+def iter_collections(source):
+    """Stream (collection_type, enforcement_mode) for every RuleCollection in a policy"""
+    for event, collection_type, elem in iter_policy_events(source):
+        if event == 'collection':
+            yield collection_type, elem.get('EnforcementMode', 'NotConfigured')
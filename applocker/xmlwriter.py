@@ -0,0 +1,75 @@
+"""Incremental, pretty-printed XML output for generated policies
+
+Produces byte-for-byte the same text as serializing a whole ElementTree and
+running it through minidom's toprettyxml(indent="  "), but writes each rule as
+soon as it is built instead of keeping several copies of the document around.
+"""
+from xml.dom import minidom
+
+XML_DECLARATION = '<?xml version="1.0" ?>\n'
+
+# Python 3.13's minidom also escapes tabs and line breaks in attribute values
+_ESCAPES_WHITESPACE = '&#10;' in minidom.parseString('<a b="&#10;"/>').documentElement.toxml()
+
+def escape_attribute(value):
+    """Escape an attribute value the way minidom writes it"""
+    value = value.replace('&', '&amp;').replace('<', '&lt;').replace('"', '&quot;').replace('>', '&gt;')
+    if _ESCAPES_WHITESPACE:
+        value = value.replace('\r', '&#13;').replace('\n', '&#10;').replace('\t', '&#9;')
+    return value
+
+def _start_tag(tag, attrib):
+    return '<' + tag + ''.join(f' {name}="{escape_attribute(value)}"' for name, value in attrib.items())
+
+class PolicyWriter:
+    """Write nested elements to a text stream as they are produced
+
+    start()/end() bracket container elements such as AppLockerPolicy and
+    RuleCollection; element() writes a complete, text-free ElementTree subtree
+    such as a single rule. A container closed without children is written as
+    an empty element, as minidom does.
+    """
+
+    def __init__(self, out, indent='  '):
+        self.out = out
+        self.indent = indent
+        self._open = []
+        self._pending = None
+        out.write(XML_DECLARATION)
+
+    def _flush_pending(self):
+        if self._pending is not None:
+            self.out.write(self._pending + '>\n')
+            self._pending = None
+
+    def start(self, tag, attrib=None):
+        self._flush_pending()
+        self._pending = self.indent * len(self._open) + _start_tag(tag, attrib or {})
+        self._open.append(tag)
+
+    def end(self):
+        tag = self._open.pop()
+        if self._pending is not None:
+            self.out.write(self._pending + '/>\n')
+            self._pending = None
+        else:
+            self.out.write(f"{self.indent * len(self._open)}</{tag}>\n")
+
+    def element(self, elem):
+        self._flush_pending()
+        self._write_element(elem, len(self._open))
+
+    def _write_element(self, elem, depth):
+        padding = self.indent * depth
+        start_tag = padding + _start_tag(elem.tag, elem.attrib)
+        if not len(elem):
+            self.out.write(start_tag + '/>\n')
+            return
+        self.out.write(start_tag + '>\n')
+        for child in elem:
+            self._write_element(child, depth + 1)
+        self.out.write(f"{padding}</{elem.tag}>\n")
+
+    def close(self):
+        while self._open:
+            self.end()
@@ -0,0 +1,54 @@
+"""Benchmark: one FileHashRule per file vs batched multi-hash FileHashConditions
+
+Generates synthetic analyze_file() records and times write_policy_xml() in
+both modes, reporting generation time, serialized size and rule count.
+
+    python benchmarks/bench_multi_hash.py [--files 1000 10000 100000] [--max-hashes-per-rule 1000]
+"""
+import argparse
+import hashlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from applocker.exe_policy import write_policy_xml
+
+def synthetic_records(count):
+    for i in range(count):
+        yield {
+            'publisher': None,
+            'version': '',
+            'internal_name': '',
+            'hash': hashlib.sha256(i.to_bytes(8, 'little')).hexdigest(),
+            'filename': f"tool{i}.exe",
+            'length': 4096 + i,
+        }
+
+def generate(count, max_hashes_per_rule):
+    buffer = io.StringIO()
+    started = time.perf_counter()
+    write_policy_xml(synthetic_records(count), buffer, 'Audit', True, False, max_hashes_per_rule)
+    seconds = time.perf_counter() - started
+    xml_content = buffer.getvalue()
+    return seconds, len(xml_content.encode('utf-8')), xml_content.count('<FileHashRule ')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--max-hashes-per-rule', type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'files':>8} {'mode':>12} {'seconds':>8} {'MB':>8} {'rules':>8}")
+    for count in args.files:
+        single = generate(count, 1)
+        batched = generate(count, args.max_hashes_per_rule)
+        for label, (seconds, size, rules) in (('per file', single), (f"{args.max_hashes_per_rule}/rule", batched)):
+            print(f"{count:>8} {label:>12} {seconds:>8.3f} {size / (1024 * 1024):>8.2f} {rules:>8}")
+        print(f"{'':>8} {'saving':>12} {single[0] / batched[0]:>7.1f}x {100 * (1 - batched[1] / single[1]):>7.1f}%")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
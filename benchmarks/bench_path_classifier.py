@@ -0,0 +1,98 @@
+"""Micro-benchmark: legacy per-pattern path checks vs the precompiled classifier
+
+Collects every FilePathCondition from default/*.xml, repeats them to 100k rules
+and times both implementations over the same paths.
+
+    python benchmarks/bench_path_classifier.py [--rules 100000]
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from applocker.inspector import classify_path
+
+# The pattern lists and checks as they were before the classifier: one
+# re.search per pattern and a fresh lower() per check.
+LEGACY_USER_WRITABLE = [
+    r'\\users\\.*\\appdata\\',
+    r'\\users\\.*\\temp\\',
+    r'\\users\\.*\\downloads\\',
+    r'\\users\\.*\\documents\\',
+    r'\\temp\\',
+    r'\\windows\\temp\\',
+    r'^[a-z]:\\$',
+    r'^[a-z]:\\\\$',
+    r'\\\\.*\\.*\\.*',
+]
+LEGACY_PROTECTED = [
+    r'\\program files\\',
+    r'\\program files \(x86\)\\',
+    r'\\windows\\(?!temp)',
+    r'\\windows\\system32\\',
+    r'\\windows\\syswow64\\',
+]
+LEGACY_DANGEROUS_WILDCARDS = [
+    r'\*\.exe$',
+    r'\*\.dll$',
+    r'\*\.ps1$',
+    r'\*\.bat$',
+    r'\*\.cmd$',
+    r'\\\*\\',
+]
+
+def legacy_traits(path):
+    return (
+        any(re.search(p, path.lower()) for p in LEGACY_USER_WRITABLE),
+        any(re.search(p, path.lower()) for p in LEGACY_PROTECTED),
+        any(re.search(p, path.lower()) for p in LEGACY_DANGEROUS_WILDCARDS),
+        re.match(r'^[a-z]:\\?$', path.lower()) is not None,
+    )
+
+def load_paths(policy_dir):
+    paths = []
+    for policy in sorted(glob.glob(os.path.join(policy_dir, '*.xml'))):
+        root = ET.parse(policy).getroot()
+        paths.extend(c.get('Path', '') for c in root.iter('FilePathCondition'))
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rules', type=int, default=100_000)
+    parser.add_argument('--policies', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'default'))
+    args = parser.parse_args()
+
+    base = load_paths(args.policies)
+    base += ['C:\\', 'C:\\\\', 'D:', '\\\\server\\share\\tools\\*.exe', 'C:\\Users\\bob\\AppData\\Local\\Temp\\*',
+             'C:\\Windows\\Temp\\x.ps1', 'C:\\Program Files (x86)\\App\\*\\bin\\*.dll',
+             '\\\\server\\share', 'C:\\Users\\bob\\Downloads\\setup.exe', 'C:\\Windows\\System32\\*.cmd']
+    paths = (base * (args.rules // len(base) + 1))[:args.rules]
+
+    mismatches = [p for p in base if tuple(classify_path(p)) != legacy_traits(p)]
+    if mismatches:
+        print(f"Classifier disagrees with legacy checks on: {mismatches}")
+        return 1
+
+    started = time.perf_counter()
+    for path in paths:
+        legacy_traits(path)
+    legacy = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for path in paths:
+        classify_path(path)
+    compiled = time.perf_counter() - started
+
+    print(f"{len(paths)} path conditions ({len(base)} distinct) from {args.policies}")
+    print(f"legacy re.search loops: {legacy:.3f}s ({len(paths) / legacy:,.0f} paths/sec)")
+    print(f"precompiled classifier: {compiled:.3f}s ({len(paths) / compiled:,.0f} paths/sec)")
+    print(f"speedup: {legacy / compiled:.1f}x")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
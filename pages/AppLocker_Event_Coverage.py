@@ -0,0 +1,141 @@
+import streamlit as st
+import xml.etree.ElementTree as ET
+import pandas as pd
+from datetime import datetime
+import io
+import os
+import tempfile
+
+from applocker.audit_policy import allow_list_from_counts, write_allow_policy_xml
+from applocker.events import aggregate_event_logs, event_count_rows, policy_rule_coverage, would_block_rows
+from applocker.policy_store import decode_policy, policy_upload
+
+st.set_page_config(
+    page_title="📈 AppLocker Event Coverage",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+st.title("📈 AppLocker Event Coverage")
+st.markdown("""
+Upload exported AppLocker event logs (`Microsoft-Windows-AppLocker/EXE and DLL`, `MSI and Script`, ...) to see
+which files ran, which would be blocked once the policy is switched from Audit to Enforce (events 8003/8006),
+and, with a policy, which of its rules actually fire and which never do.
+""")
+
+uploaded_logs = st.file_uploader(
+    "Upload AppLocker EVTX files",
+    type=['evtx'],
+    accept_multiple_files=True,
+    help="Export with Event Viewer (Save All Events As...) or wevtutil epl"
+)
+policy_name, raw_policy = policy_upload("Optional: AppLocker policy XML to report rule coverage", key="coverage_policy")
+
+def download_csv(label, rows, prefix):
+    csv_buffer = io.StringIO()
+    pd.DataFrame(rows).to_csv(csv_buffer, index=False)
+    st.download_button(
+        label=label,
+        data=csv_buffer.getvalue(),
+        file_name=f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        mime="text/csv"
+    )
+
+if uploaded_logs:
+    # The EVTX reader maps files from disk, so spool the uploads to temp files
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = []
+        for i, uploaded_log in enumerate(uploaded_logs):
+            path = os.path.join(temp_dir, f"{i}.evtx")
+            with open(path, 'wb') as f:
+                f.write(uploaded_log.getvalue())
+            paths.append(path)
+
+        progress_bar = st.progress(0.0, text="Parsing event log chunks...")
+        try:
+            counts, stats = aggregate_event_logs(
+                paths,
+                progress=lambda done, total: progress_bar.progress(done / total, text=f"Parsed {done} of {total} chunks")
+            )
+        except Exception as e:
+            st.error(f"Unable to read the event logs: {e}")
+            st.stop()
+        progress_bar.empty()
+
+    for error in stats['errors']:
+        st.warning(error)
+
+    would_block = would_block_rows(counts)
+
+    st.markdown("## 📊 Summary")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Records", stats['records'])
+    with col2:
+        st.metric("AppLocker Events", stats['events'])
+    with col3:
+        st.metric("Distinct Events", len(counts))
+    with col4:
+        st.metric("Files Blocked if Enforced", len(would_block))
+    st.caption(f"Parsed {stats['chunks']} chunks in {stats['seconds']:.2f}s")
+
+    if raw_policy is not None:
+        xml_content, encoding = decode_policy(raw_policy)
+        if xml_content is None:
+            st.error("❌ Unable to decode the policy. Please ensure it's a valid XML file saved with UTF-8, UTF-16, or Windows encoding.")
+        else:
+            try:
+                coverage = policy_rule_coverage(io.StringIO(xml_content), counts)
+            except ET.ParseError as e:
+                st.error(f"Invalid XML format: {e}")
+                coverage = None
+            if coverage is not None:
+                st.markdown("## 🎯 Rule Coverage")
+                never = [row for row in coverage if row['Status'] == 'Never fires']
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Rules", len(coverage))
+                with col2:
+                    st.metric("Fired", len(coverage) - len(never))
+                with col3:
+                    st.metric("Never Fired", len(never))
+                coverage_df = pd.DataFrame(coverage)
+                if not coverage_df.empty:
+                    st.dataframe(coverage_df, use_container_width=True, height=400)
+                    download_csv("📊 Download Rule Coverage", coverage, "applocker_rule_coverage")
+
+    st.markdown("## 🚨 Would Block in Enforce Mode")
+    if would_block:
+        st.dataframe(pd.DataFrame(would_block), use_container_width=True, height=400)
+        download_csv("📊 Download Would-Block Files", would_block, "applocker_would_block")
+
+        st.markdown("### ✅ Allow Policy for These Files")
+        st.markdown("The fewest Publisher, Hash and Path rules that allow every file above. Merge it into your policy with the Combiner before switching to Enforce.")
+        allow_list = allow_list_from_counts(counts)
+        rule_counts = allow_list.rule_counts()
+        enforcement = st.radio("EnforcementMode of the generated collections", ['AuditOnly', 'Enabled'], horizontal=True)
+        policy_buffer = io.StringIO()
+        write_allow_policy_xml(allow_list, policy_buffer, enforcement)
+        st.caption(f"{rule_counts['Publisher']} publisher, {rule_counts['Hash']} hash and {rule_counts['Path']} path rules")
+        st.download_button(
+            label="📥 Download Allow Policy",
+            data=policy_buffer.getvalue(),
+            file_name=f"applocker_audit_allow_policy_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xml",
+            mime="application/xml"
+        )
+    else:
+        st.success("No 8003/8006 events: nothing in these logs would be blocked by enforcing the policy.")
+
+    st.markdown("## 📋 Event Counts")
+    event_rows = event_count_rows(counts)
+    if event_rows:
+        st.dataframe(pd.DataFrame(event_rows).head(1000), use_container_width=True, height=400)
+        if len(event_rows) > 1000:
+            st.caption(f"Showing the 1000 most frequent of {len(event_rows)} distinct events; download the results for the full list.")
+        download_csv("📊 Download Event Counts", event_rows, "applocker_event_counts")
+
+try:
+    st.sidebar.image("assets/logo.png", width=250)
+except:
+    # Fallback if logo can't be loaded
+    st.sidebar.markdown("### 🔒 AppLockerGen")
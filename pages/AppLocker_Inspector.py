@@ -1,325 +1,49 @@
 import streamlit as st
 import xml.etree.ElementTree as ET
-import pandas as pd
-import re
 from datetime import datetime
-from collections import defaultdict
 import io
+import os
 
-def parse_applocker_xml(xml_content):
-    """Parse AppLocker XML and extract policy information"""
-    try:
-        root = ET.fromstring(xml_content)
-        return root
-    except ET.ParseError as e:
-        st.error(f"Invalid XML format: {e}")
-        return None
+import pandas as pd
 
-def assess_collection_risk(rule_collections):
-    """Assess risk for collection enforcement modes"""
-    findings = []
-    
-    for collection in rule_collections:
-        collection_type = collection.get('Type', 'Unknown')
-        enforcement_mode = collection.get('EnforcementMode', 'NotConfigured')
-        
-        if enforcement_mode == 'NotConfigured':
-            findings.append({
-                'Severity': 'High',
-                'Collection': collection_type,
-                'RuleType': '(collection)',
-                'Action': 'n/a',
-                'Principal': 'n/a',
-                'RuleName': 'n/a',
-                'ConditionType': 'n/a',
-                'Condition': 'n/a',
-                'Reason': f"Collection '{collection_type}' is NotConfigured → default-allow for this type.",
-                'Recommendation': f"Set EnforcementMode=Enabled for {collection_type} (or AuditOnly during pilot)."
-            })
-        elif enforcement_mode == 'AuditOnly':
-            findings.append({
-                'Severity': 'Medium',
-                'Collection': collection_type,
-                'RuleType': '(collection)',
-                'Action': 'n/a',
-                'Principal': 'n/a',
-                'RuleName': 'n/a',
-                'ConditionType': 'n/a',
-                'Condition': 'n/a',
-                'Reason': f"Collection '{collection_type}' is in AuditOnly mode → not enforcing blocks.",
-                'Recommendation': f"Consider setting EnforcementMode=Enabled for {collection_type} after testing."
-            })
-    
-    return findings
+from applocker.cache import FindingsCache, policy_cache_key
+from applocker.filecache import FileMetadataCache
+from applocker.findings import (
+    SEVERITIES,
+    filter_findings,
+    findings_from_columns,
+    findings_to_columns,
+    inspect_policy_text_frame,
+    summarize_findings_frame,
+)
+from applocker.policy_store import POLICY_CACHE_MAX_ENTRIES, POLICY_CACHE_TTL, decode_policy, policy_upload
+from applocker.redundancy import find_redundant_rules, prune_policy
 
-def is_broad_principal(principal):
-    """Check if a principal is considered broad/risky"""
-    broad_principals = [
-        'Everyone',
-        'Authenticated Users', 
-        'BUILTIN\\Users',
-        'Users',
-        'Domain Users',
-        'S-1-1-0',  # Everyone SID
-        'S-1-5-11', # Authenticated Users SID
-        'S-1-5-32-545'  # Users SID
-    ]
-    
-    return any(bp.lower() in principal.lower() for bp in broad_principals)
+PAGE_SIZES = [100, 500, 1000, 5000]
+MAX_RECOMMENDATION_EXPANDERS = 50
 
-def is_user_writable_path(path):
-    """Check if a path is typically user-writable"""
-    user_writable_patterns = [
-        r'\\users\\.*\\appdata\\',
-        r'\\users\\.*\\temp\\',
-        r'\\users\\.*\\downloads\\',
-        r'\\users\\.*\\documents\\',
-        r'\\temp\\',
-        r'\\windows\\temp\\',
-        r'^[a-z]:\\$',  # Drive roots
-        r'^[a-z]:\\\\$',  # Drive roots with backslash
-        r'\\\\.*\\.*\\.*',  # UNC paths (potentially writable)
-    ]
-    
-    return any(re.search(pattern, path.lower()) for pattern in user_writable_patterns)
+@st.cache_resource
+def get_findings_cache():
+    # Shared by every session; set APPLOCKERGEN_CACHE_DIR to keep findings across restarts
+    cache_dir = os.environ.get('APPLOCKERGEN_CACHE_DIR')
+    return FindingsCache(
+        max_entries=64,
+        disk_dir=os.path.join(cache_dir, 'inspector_frames') if cache_dir else None,
+        encode=findings_to_columns,
+        decode=findings_from_columns,
+    )
 
-def is_protected_path(path):
-    """Check if a path is in a protected/read-only location"""
-    protected_patterns = [
-        r'\\program files\\',
-        r'\\program files \(x86\)\\',
-        r'\\windows\\(?!temp)',  # Windows folder but not temp
-        r'\\windows\\system32\\',
-        r'\\windows\\syswow64\\',
-    ]
-    
-    return any(re.search(pattern, path.lower()) for pattern in protected_patterns)
-
-def has_dangerous_wildcards(path):
-    """Check for dangerous wildcard patterns"""
-    dangerous_patterns = [
-        r'\*\.exe$',
-        r'\*\.dll$', 
-        r'\*\.ps1$',
-        r'\*\.bat$',
-        r'\*\.cmd$',
-        r'\\\*\\',  # Wildcard in directory path
-    ]
-    
-    return any(re.search(pattern, path.lower()) for pattern in dangerous_patterns)
+@st.cache_resource
+def get_file_metadata_cache():
+    # Lets hash rules be matched against publisher rules for files the EXE Policy page has seen
+    cache_dir = os.environ.get('APPLOCKERGEN_CACHE_DIR')
+    return FileMetadataCache(os.path.join(cache_dir, 'file_metadata.sqlite')) if cache_dir else None
 
-def assess_path_rule_risk(rule, collection_type):
-    """Assess risk for file path rules"""
-    findings = []
-    
-    rule_name = rule.get('Name', 'Unnamed Rule')
-    action = rule.get('Action', 'Unknown')
-    user_or_group = rule.find('UserOrGroupSid')
-    principal = user_or_group.text if user_or_group is not None else 'Unknown'
-    
-    # Find path conditions
-    conditions = rule.find('Conditions')
-    if conditions is not None:
-        for condition in conditions:
-            if condition.tag == 'FilePathCondition':
-                path = condition.get('Path', '')
-                
-                severity = 'Info'
-                reasons = []
-                recommendations = []
-                
-                # Check for broad principals
-                if is_broad_principal(principal):
-                    reasons.append("Principal is broad")
-                    recommendations.append("reduce principal scope")
-                
-                # Check for user-writable paths
-                if is_user_writable_path(path):
-                    reasons.append("User-writable path")
-                    recommendations.append("avoid user-writable paths; replace with Publisher/Hash rules")
-                    severity = 'High'
-                
-                # Check for dangerous wildcards
-                if has_dangerous_wildcards(path):
-                    filename_part = path.split('\\')[-1]
-                    reasons.append(f"Wildcard extension pattern ({filename_part})")
-                    recommendations.append("avoid wildcard allows on executable types")
-                    if severity != 'High':
-                        severity = 'Medium'
-                
-                # Check for drive roots
-                if re.match(r'^[a-z]:\\?$', path.lower()):
-                    reasons.append("Drive root access")
-                    recommendations.append("specify exact paths instead of drive roots")
-                    severity = 'High'
-                
-                # Downgrade if protected path
-                if is_protected_path(path) and severity == 'High':
-                    severity = 'Info'
-                    recommendations = ["No change needed if file remains locked down; consider Publisher/Hash for defense-in-depth"]
-                
-                if reasons:
-                    findings.append({
-                        'Severity': severity,
-                        'Collection': collection_type,
-                        'RuleType': 'FilePathRule',
-                        'Action': action,
-                        'Principal': principal,
-                        'RuleName': rule_name,
-                        'ConditionType': 'Path',
-                        'Condition': path,
-                        'Reason': '; '.join(reasons) + '.',
-                        'Recommendation': '; '.join(recommendations) + '.'
-                    })
-    
-    return findings
-
-def assess_publisher_rule_risk(rule, collection_type):
-    """Assess risk for file publisher rules"""
-    findings = []
-    
-    rule_name = rule.get('Name', 'Unnamed Rule')
-    action = rule.get('Action', 'Unknown')
-    user_or_group = rule.find('UserOrGroupSid')
-    principal = user_or_group.text if user_or_group is not None else 'Unknown'
-    
-    conditions = rule.find('Conditions')
-    if conditions is not None:
-        for condition in conditions:
-            if condition.tag == 'FilePublisherCondition':
-                publisher_name = condition.get('PublisherName', '')
-                product_name = condition.get('ProductName', '')
-                binary_name = condition.get('BinaryName', '')
-                
-                binary_version_range = condition.find('BinaryVersionRange')
-                low_section = binary_version_range.get('LowSection', '') if binary_version_range is not None else ''
-                high_section = binary_version_range.get('HighSection', '') if binary_version_range is not None else ''
-                
-                reasons = []
-                recommendations = []
-                severity = 'Info'
-                
-                # Check for overly broad publisher rules
-                if product_name == '*' and binary_name == '*':
-                    reasons.append("Any product and any binary from the publisher are allowed")
-                    recommendations.append("constrain to specific Product/Binary")
-                    severity = 'Medium'
-                
-                if product_name == '*':
-                    reasons.append("Any product from publisher allowed")
-                    recommendations.append("specify exact product name")
-                    if severity == 'Info':
-                        severity = 'Medium'
-                
-                if binary_name == '*':
-                    reasons.append("Any binary from publisher/product allowed")
-                    recommendations.append("specify exact binary name")
-                    if severity == 'Info':
-                        severity = 'Medium'
-                
-                # Check for no upper version bound
-                if high_section == '*' or not high_section:
-                    reasons.append("No upper version bound")
-                    recommendations.append("set an upper version bound")
-                    if severity == 'Info':
-                        severity = 'Medium'
-                
-                # Check for broad principals
-                if is_broad_principal(principal):
-                    reasons.append("Principal is broad")
-                    recommendations.append("reduce principal scope")
-                
-                condition_text = f"Publisher='{publisher_name}'; Product='{product_name}'; Binary='{binary_name}'; VersionRange=[{low_section}, {high_section}]"
-                
-                if reasons:
-                    findings.append({
-                        'Severity': severity,
-                        'Collection': collection_type,
-                        'RuleType': 'FilePublisherRule',
-                        'Action': action,
-                        'Principal': principal,
-                        'RuleName': rule_name,
-                        'ConditionType': 'Publisher',
-                        'Condition': condition_text,
-                        'Reason': '; '.join(reasons) + '.',
-                        'Recommendation': '; '.join(recommendations) + '.'
-                    })
-    
-    return findings
-
-def assess_hash_rule_risk(rule, collection_type):
-    """Assess risk for file hash rules"""
-    findings = []
-    
-    rule_name = rule.get('Name', 'Unnamed Rule')
-    action = rule.get('Action', 'Unknown')
-    user_or_group = rule.find('UserOrGroupSid')
-    principal = user_or_group.text if user_or_group is not None else 'Unknown'
-    
-    conditions = rule.find('Conditions')
-    if conditions is not None:
-        for condition in conditions:
-            if condition.tag == 'FileHashCondition':
-                file_hash = condition.find('FileHash')
-                hash_value = file_hash.get('Data', '') if file_hash is not None else ''
-                hash_type = file_hash.get('Type', 'Unknown') if file_hash is not None else 'Unknown'
-                
-                # Hash rules are generally good, but check for broad principals
-                if is_broad_principal(principal):
-                    findings.append({
-                        'Severity': 'Low',
-                        'Collection': collection_type,
-                        'RuleType': 'FileHashRule',
-                        'Action': action,
-                        'Principal': principal,
-                        'RuleName': rule_name,
-                        'ConditionType': 'Hash',
-                        'Condition': f"{hash_type}: {hash_value[:16]}...",
-                        'Reason': "Allow-by-hash given to broad principals (rule is tight, group is broad).",
-                        'Recommendation': "Consider reducing principal scope for defense-in-depth."
-                    })
-    
-    return findings
-
-def inspect_applocker_policy(xml_content):
-    """Main inspection function that analyzes an AppLocker policy"""
-    root = parse_applocker_xml(xml_content)
-    if root is None:
-        return []
-    
-    findings = []
-    
-    # Find all rule collections
-    rule_collections = root.findall('RuleCollection')
-    
-    # Assess collection-level risks
-    findings.extend(assess_collection_risk(rule_collections))
-    
-    # Assess individual rules
-    for collection in rule_collections:
-        collection_type = collection.get('Type', 'Unknown')
-        
-        # Check each rule type
-        for rule in collection:
-            if rule.tag == 'FilePathRule':
-                findings.extend(assess_path_rule_risk(rule, collection_type))
-            elif rule.tag == 'FilePublisherRule':
-                findings.extend(assess_publisher_rule_risk(rule, collection_type))
-            elif rule.tag == 'FileHashRule':
-                findings.extend(assess_hash_rule_risk(rule, collection_type))
-    
-    return findings
-
-def generate_summary_metrics(findings):
-    """Generate summary metrics from findings"""
-    severity_counts = defaultdict(int)
-    collection_counts = defaultdict(int)
-    
-    for finding in findings:
-        severity_counts[finding['Severity']] += 1
-        collection_counts[finding['Collection']] += 1
-    
-    return severity_counts, collection_counts
+@st.cache_data(ttl=POLICY_CACHE_TTL, max_entries=POLICY_CACHE_MAX_ENTRIES, show_spinner=False)
+def get_redundant_rules(cache_key, _xml_content):
+    redundant = find_redundant_rules(_xml_content, metadata_cache=get_file_metadata_cache())
+    pruned_xml = prune_policy(_xml_content, [finding['RuleNumber'] for finding in redundant]) if redundant else None
+    return redundant, pruned_xml
 
 # Streamlit UI
 st.set_page_config(
@@ -339,36 +63,40 @@ Upload your AppLocker policy to get detailed security recommendations.
 """)
 
 # File upload
-uploaded_file = st.file_uploader(
-    "Upload AppLocker Policy XML", 
-    type=['xml'],
+policy_name, raw_content = policy_upload(
+    "Upload AppLocker Policy XML",
+    key="inspector_policy",
     help="Upload your AppLocker policy XML file for security analysis"
 )
 
-if uploaded_file is not None:
-    raw_content = uploaded_file.getvalue()
+if raw_content is not None:
     
-    xml_content = None
-    encodings_to_try = ['utf-8-sig', 'utf-16', 'utf-16-le', 'utf-16-be', 'utf-8', 'latin1', 'cp1252']
+    findings_cache = get_findings_cache()
+    cache_key = policy_cache_key(raw_content)
+    findings = findings_cache.get(cache_key)
     
-    for encoding in encodings_to_try:
-        try:
-            xml_content = raw_content.decode(encoding)
-            st.success(f"✅ File decoded successfully using {encoding} encoding")
-            break
-        except UnicodeDecodeError:
-            continue
-    
-    if xml_content is None:
-        st.error("❌ Unable to decode the file. Please ensure it's a valid XML file saved with UTF-8, UTF-16, or Windows encoding.")
-        st.stop()
+    if findings is None:
+        xml_content, encoding = decode_policy(raw_content)
+        
+        if xml_content is None:
+            st.error("❌ Unable to decode the file. Please ensure it's a valid XML file saved with UTF-8, UTF-16, or Windows encoding.")
+            st.stop()
+        st.success(f"✅ File decoded successfully using {encoding} encoding")
+        
+        with st.spinner('🔍 Analyzing AppLocker policy...'):
+            try:
+                findings = inspect_policy_text_frame(xml_content)
+            except ET.ParseError as e:
+                st.error(f"Invalid XML format: {e}")
+                st.stop()
+        findings_cache.put(cache_key, findings)
     
-    with st.spinner('🔍 Analyzing AppLocker policy...'):
-        findings = inspect_applocker_policy(xml_content)
+    stats = findings_cache.stats
+    st.caption(f"Findings cache: {stats['memory_hits'] + stats['disk_hits']} hits, {stats['misses']} misses")
     
-    if findings:
+    if not findings.empty:
         # Generate summary metrics
-        severity_counts, collection_counts = generate_summary_metrics(findings)
+        severity_counts, collection_counts = summarize_findings_frame(findings)
         
         # Display summary metrics
         st.markdown("## 📊 Security Analysis Summary")
@@ -392,8 +120,6 @@ if uploaded_file is not None:
         
         st.markdown("## 🔍 Detailed Findings")
         
-        df = pd.DataFrame(findings)
-        
         def style_severity(val):
             if val == 'High':
                 return 'background-color: #ffebee; color: #c62828'
@@ -406,23 +132,31 @@ if uploaded_file is not None:
         
         severity_filter = st.multiselect(
             "Filter by Severity",
-            options=['High', 'Medium', 'Low', 'Info'],
-            default=['High', 'Medium', 'Low', 'Info']
+            options=SEVERITIES,
+            default=SEVERITIES
         )
         
+        collections = list(collection_counts)
         collection_filter = st.multiselect(
             "Filter by Collection",
-            options=df['Collection'].unique(),
-            default=df['Collection'].unique()
+            options=collections,
+            default=collections
         )
         
-        filtered_df = df[
-            (df['Severity'].isin(severity_filter)) & 
-            (df['Collection'].isin(collection_filter))
-        ]
+        filtered_df = filter_findings(findings, severity_filter, collection_filter)
         
         if not filtered_df.empty:
-            styled_df = filtered_df.style.applymap(style_severity, subset=['Severity'])
+            # Style only the rows on screen; styling every cell of a large result stalls the UI
+            page_col, size_col = st.columns([3, 1])
+            with size_col:
+                page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1)
+            page_count = (len(filtered_df) - 1) // page_size + 1
+            with page_col:
+                page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1)
+            start = (page - 1) * page_size
+            page_df = filtered_df.iloc[start:start + page_size]
+            st.caption(f"Showing findings {start + 1}–{start + len(page_df)} of {len(filtered_df)}")
+            styled_df = page_df.style.map(style_severity, subset=['Severity'])
             st.dataframe(styled_df, use_container_width=True, height=400)
             
             st.markdown("## 📤 Export Results")
@@ -454,7 +188,9 @@ if uploaded_file is not None:
             high_findings = filtered_df[filtered_df['Severity'] == 'High']
             if not high_findings.empty:
                 st.markdown("## 🚨 High Priority Recommendations")
-                for _, finding in high_findings.iterrows():
+                if len(high_findings) > MAX_RECOMMENDATION_EXPANDERS:
+                    st.caption(f"Showing the first {MAX_RECOMMENDATION_EXPANDERS} of {len(high_findings)} high-risk findings; download the results for the full list.")
+                for _, finding in high_findings.head(MAX_RECOMMENDATION_EXPANDERS).iterrows():
                     with st.expander(f"🔴 {finding['Collection']} - {finding['RuleName']}"):
                         st.markdown(f"**Issue:** {finding['Reason']}")
                         st.markdown(f"**Recommendation:** {finding['Recommendation']}")
@@ -466,6 +202,40 @@ if uploaded_file is not None:
     else:
         st.success("🎉 No security issues found in the AppLocker policy!")
         st.balloons()
+    
+    st.markdown("## ♻️ Redundant and Shadowed Rules")
+    xml_content, encoding = decode_policy(raw_content)
+    with st.spinner('Looking for rules covered by broader rules...'):
+        redundant, pruned_xml = get_redundant_rules(cache_key, xml_content)
+    
+    if redundant:
+        shadowed_count = sum(1 for finding in redundant if finding['Kind'] == 'Shadowed')
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Redundant Rules", len(redundant) - shadowed_count)
+        col2.metric("Shadowed Rules", shadowed_count)
+        col3.metric("Policy Size After Removal", f"{len(pruned_xml.encode('utf-8')) / 1024:,.1f} KB", f"{(len(pruned_xml.encode('utf-8')) - len(xml_content.encode('utf-8'))) / 1024:,.1f} KB", delta_color="inverse")
+        st.caption("Redundant rules match only files that a broader rule with the same action already covers; shadowed Allow rules match only files a Deny rule blocks. Removing all of them leaves every decision unchanged.")
+        st.dataframe(redundant, use_container_width=True, height=300)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            csv_buffer = io.StringIO()
+            pd.DataFrame(redundant).to_csv(csv_buffer, index=False)
+            st.download_button(
+                label="📊 Download Redundant Rules as CSV",
+                data=csv_buffer.getvalue(),
+                file_name=f"applocker_redundant_rules_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv"
+            )
+        with col2:
+            st.download_button(
+                label="🧹 Download Policy Without Them",
+                data=pruned_xml,
+                file_name=f"{os.path.splitext(policy_name or 'applocker_policy.xml')[0]}_pruned.xml",
+                mime="text/xml"
+            )
+    else:
+        st.success("No rule is covered by a broader rule.")
 
 else:
     st.markdown("## 🔍 What does AppLocker Inspector check?")
@@ -498,6 +268,7 @@ else:
         st.markdown("""
         ### ℹ️ Informational
         - **Protected paths** - Rules in Program Files, Windows
+        - **Redundant and shadowed rules** - Rules a broader folder, publisher or Deny rule already decides
         - **Well-configured rules** - Specific paths and principals
         """)
 
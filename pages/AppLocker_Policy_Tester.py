@@ -0,0 +1,103 @@
+import streamlit as st
+import xml.etree.ElementTree as ET
+import pandas as pd
+from datetime import datetime
+import csv
+import io
+
+from applocker.evaluate import evaluate_inventory, inventory_columns, make_query
+from applocker.policy_store import compiled_policy, decode_policy, policy_upload
+from applocker.simulate import host_column, simulate_rows
+
+MAX_RESULT_ROWS = 5000
+
+st.set_page_config(
+    page_title="🧪 AppLocker Policy Tester",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+st.title("🧪 AppLocker Policy Tester")
+st.markdown("""
+Answer what `Test-AppLockerPolicy` would, without a Windows machine: upload a policy, then check a single file
+or a whole inventory CSV. Path variables such as `%WINDIR%`, `%PROGRAMFILES%` and `%OSDRIVE%` are expanded, deny rules
+win over allow rules, and files no allow rule covers are **DeniedByDefault**.
+""")
+
+policy_name, raw_content = policy_upload("Upload AppLocker Policy XML", key="tester_policy")
+
+if raw_content is not None:
+    xml_content, encoding = decode_policy(raw_content)
+    if xml_content is None:
+        st.error("❌ Unable to decode the file. Please ensure it's a valid XML file saved with UTF-8, UTF-16, or Windows encoding.")
+        st.stop()
+    try:
+        policy = compiled_policy(xml_content)
+    except ET.ParseError as e:
+        st.error(f"Invalid XML format: {e}")
+        st.stop()
+    st.success(f"✅ Compiled {policy.rule_count} rules in {len(policy.rule_counts)} collections")
+
+    st.markdown("## 📄 Test a File")
+    col1, col2 = st.columns(2)
+    with col1:
+        path = st.text_input("File path", "C:\\Users\\Public\\app.exe")
+        file_hash = st.text_input("SHA256 (optional)")
+        user_sids = st.text_input("User and group SIDs, separated by ';'", "S-1-1-0")
+    with col2:
+        publisher = st.text_input("Publisher (optional)", help="e.g. O=MICROSOFT CORPORATION, L=REDMOND, S=WASHINGTON, C=US, or a full Fqbn from an event")
+        product = st.text_input("Product (optional)")
+        version = st.text_input("Version (optional)")
+
+    decision, rule = policy.evaluate(make_query(path, file_hash, publisher, product, '', version, user_sids.split(';')))
+    result = pd.DataFrame([{'FilePath': path, 'PolicyDecision': decision, 'MatchingRule': rule.name if rule else ''}])
+    st.dataframe(result, use_container_width=True)
+
+    st.markdown("## 📋 Test an Inventory")
+    uploaded_inventory = st.file_uploader(
+        "Upload inventory CSV",
+        type=['csv'],
+        help="Columns: Path, SHA256, Publisher (or Signer/Fqbn), Product, BinaryName, Version, UserSid, Collection. Only Path is required."
+    )
+    if uploaded_inventory is not None:
+        reader = csv.DictReader(io.StringIO(uploaded_inventory.getvalue().decode('utf-8-sig')))
+        columns = inventory_columns(reader.fieldnames or [])
+        if 'path' not in columns:
+            st.error("The inventory needs a Path column.")
+            st.stop()
+        rows = list(reader)
+        results = pd.DataFrame(evaluate_inventory(policy, rows, columns))
+        if results.empty:
+            st.info("The inventory has no rows.")
+        else:
+            decision_counts = results['PolicyDecision'].value_counts()
+            cols = st.columns(4)
+            for i, decision in enumerate(['Allowed', 'Denied', 'DeniedByDefault', 'AllowedByDefault']):
+                with cols[i]:
+                    st.metric(decision, int(decision_counts.get(decision, 0)))
+            st.dataframe(results.head(MAX_RESULT_ROWS), use_container_width=True, height=400)
+            if len(results) > MAX_RESULT_ROWS:
+                st.caption(f"Showing the first {MAX_RESULT_ROWS} of {len(results)} files; download the results for the full list.")
+            csv_buffer = io.StringIO()
+            results.to_csv(csv_buffer, index=False)
+            st.download_button(
+                label="📊 Download Decisions",
+                data=csv_buffer.getvalue(),
+                file_name=f"applocker_policy_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv"
+            )
+
+            st.markdown("## 🖥️ What-If: Blocks per Host and per Rule")
+            host = host_column(reader.fieldnames or [])
+            simulation = simulate_rows(policy, rows, columns, host)
+            if host is not None:
+                st.dataframe(pd.DataFrame(simulation.host_rows()), use_container_width=True, height=300)
+            else:
+                st.caption("Add a Host column to the inventory to see block counts per endpoint.")
+            st.dataframe(pd.DataFrame(simulation.rule_rows(policy)), use_container_width=True, height=300)
+
+try:
+    st.sidebar.image("assets/logo.png", width=250)
+except:
+    # Fallback if logo can't be loaded
+    st.sidebar.markdown("### 🔒 AppLockerGen")
@@ -1,13 +1,7 @@
 import streamlit as st
 import os
-import xml.etree.ElementTree as ET
 
-def validate_xml(xml_string):
-    try:
-        ET.fromstring(xml_string)
-        return True
-    except ET.ParseError:
-        return False
+from applocker.policy_store import is_valid_policy_xml, read_policy_file
 
 st.set_page_config(
     page_title="🔒 AppLocker Pre-Built Policies",
@@ -31,14 +25,12 @@ selected_policy = st.selectbox("Select a pre-created AppLocker policy", policy_f
 
 if 'selected_policy' not in st.session_state or st.session_state.selected_policy != selected_policy:
     st.session_state.selected_policy = selected_policy
-    policy_path = os.path.join(default_policies_path, selected_policy)
-    with open(policy_path, 'r') as policy_file:
-        st.session_state.policy_content = policy_file.read()
+    st.session_state.policy_content = read_policy_file(os.path.join(default_policies_path, selected_policy))
 
 policy_content = st.text_area("Edit the policy XML:", st.session_state.policy_content, height=500)
 
 if st.button("Download Policy"):
-    if validate_xml(policy_content):
+    if is_valid_policy_xml(policy_content):
         st.download_button(label="Download XML", data=policy_content, file_name=selected_policy, mime='text/xml')
     else:
         st.error("The modified XML is not valid. Please check your changes and try again.")
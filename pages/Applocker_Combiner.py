@@ -1,31 +1,7 @@
 import streamlit as st
-import xml.etree.ElementTree as ET
 from lxml import etree
 
-def parse_xml(xml_content):
-    return ET.fromstring(xml_content)
-def combine_xml_roots(root1, root2):
-    rule_collections = {rc.get('Type'): rc for rc in root1.findall('RuleCollection')}
-    
-    for rc in root2.findall('RuleCollection'):
-        rc_type = rc.get('Type')
-        if rc_type in rule_collections:
-            existing_rc = rule_collections[rc_type]
-            existing_ids = {rule.get('Id') for rule in existing_rc}
-            for rule in rc:
-                if rule.get('Id') not in existing_ids:
-                    existing_rc.append(rule)
-                    existing_ids.add(rule.get('Id'))
-        else:
-            root1.append(rc)
-            rule_collections[rc_type] = rc
-    return root1
-
-def pretty_print_xml(xml_root):
-    xml_str = ET.tostring(xml_root, encoding='unicode')
-    parser = etree.XMLParser(remove_blank_text=True)
-    xml_etree = etree.fromstring(xml_str.encode(), parser)
-    return etree.tostring(xml_etree, pretty_print=True).decode()
+from applocker.policy_store import merged_policy, remember_upload
 
 def validate_xml(xml_content):
     try:
@@ -43,19 +19,24 @@ st.markdown("""
 uploaded_files = st.file_uploader("Upload XML Files", accept_multiple_files=True, type=['xml'])
 
 if uploaded_files and st.button('Combine Policies'):
-    combined_root = None
-
-    for uploaded_file in uploaded_files:
-        content = uploaded_file.getvalue()
-        if combined_root is None:
-            combined_root = parse_xml(content)
-        else:
-            root_to_combine = parse_xml(content)
-            combined_root = combine_xml_roots(combined_root, root_to_combine)
+    # Cached by the inputs' content hashes, so combining the same files again is instant
+    combined_xml_str, merge_report = merged_policy((uploaded_file.getvalue(), uploaded_file.name) for uploaded_file in uploaded_files)
 
-    if combined_root is not None:
-        combined_xml_str = pretty_print_xml(combined_root)
+    if combined_xml_str is not None:
         if validate_xml(combined_xml_str):
+            # Offer the result to the Inspector, Modify and Tester pages without a download/upload round trip
+            remember_upload("combined_applocker_policy.xml", combined_xml_str.encode('utf-8'))
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric(label="Rules Merged", value=merge_report['merged'])
+            col2.metric(label="Duplicates Removed", value=merge_report['duplicate_ids'] + merge_report['duplicate_content'])
+            col3.metric(label="Merge Conflicts", value=len(merge_report['conflicts']))
+            col4.metric(label="Allow/Deny Conflicts", value=len(merge_report['rule_conflicts']))
+            if merge_report['conflicts']:
+                with st.expander("Merge Conflicts"):
+                    st.dataframe(merge_report['conflicts'], use_container_width=True)
+            if merge_report['rule_conflicts']:
+                with st.expander("Allow/Deny Conflicts"):
+                    st.dataframe(merge_report['rule_conflicts'], use_container_width=True)
             st.code(combined_xml_str, language='xml')
             st.download_button(label="Download Combined XML", data=combined_xml_str, file_name="combined_applocker_policy.xml", mime="text/xml")
         else:
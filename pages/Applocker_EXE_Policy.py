@@ -1,13 +1,13 @@
 import streamlit as st
-import hashlib
-import xml.etree.ElementTree as ET
 import base64
-from xml.dom import minidom
-import uuid
 import os
-import lief
 #import exiftool
 
+from applocker.compact import MAX_HASHES_PER_RULE, RecordMetadata, compact_policy
+from applocker.exe_policy import generate_policy_xml
+from applocker.filecache import FileMetadataCache
+from applocker.ingest import ARCHIVE_ERRORS, analyze_stream, archive_kind, iter_archive
+
 st.set_page_config(
     page_title="⚒️ Applocker EXE Policy Generator",
     layout="wide",
@@ -19,94 +19,45 @@ except:
     # Fallback if logo can't be loaded
     st.sidebar.markdown("### 🔒 AppLockerGen")
 
-def extract_publisher_and_version_info(file_path):
-    try:
-        pe = lief.parse(file_path)
-        if len(pe.signatures) == 0:
-            return None, None, None
-
-        cert = pe.signatures[0].certificates[0]
-        publisher = cert.subject.replace('\\', '').replace('-', ',')
-
-        version_info = pe.resources_manager.version.string_file_info.langcode_items[0].items
-        version = version_info.get('FileVersion', b'').decode("utf-8")
-        internal_name = version_info.get('InternalName', b'').decode("utf-8")
-
-        return publisher, version, internal_name
-    except Exception as e:
-        print(f"Could not extract publisher, version info, and internal name: {e}")
-        return None, None, None
-
-def calculate_hash_and_length(file):
-    sha256_hash = hashlib.sha256()
-    file_length = 0
-    file.seek(0)
-    for byte_block in iter(lambda: file.read(4096), b""):
-        file_length += len(byte_block)
-        sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest(), file_length
-
-def generate_xml(publishers, versions, internal_names, file_hashes, filenames, lengths, mode, include_hash, include_publisher):
-    enforcement_mode = "AuditOnly" if mode == 'Audit' else "Enabled"
-    action = "Deny" if mode == 'Block' else "Allow"
-    root = ET.Element("AppLockerPolicy", Version="1")
-    rule_collection = ET.SubElement(root, "RuleCollection", Type="Exe", EnforcementMode=enforcement_mode)
-
-    publisher_rules_dict = {}
-
-    for publisher, version, internal_name, file_hash, filename, length in zip(publishers, versions, internal_names, file_hashes, filenames, lengths):
-        binary_name = internal_name if internal_name and '.' in internal_name else filename
-
-        if include_hash:
-            rule_id_hash = str(uuid.uuid4())
-            file_hash_rule = ET.SubElement(rule_collection, "FileHashRule", Id=rule_id_hash, Name="Hash Rule for " + binary_name, Description="", UserOrGroupSid="S-1-1-0", Action=action)
-            conditions_hash = ET.SubElement(file_hash_rule, "Conditions")
-            file_hash_condition = ET.SubElement(conditions_hash, "FileHashCondition")
-            formatted_hash = f"0x{file_hash.upper()}"
-            ET.SubElement(file_hash_condition, "FileHash", Type="SHA256", Data=formatted_hash, SourceFileName=binary_name, SourceFileLength=str(length))
-
-        if include_publisher and publisher:
-            publisher_rule_key = (publisher, version, binary_name)
-            if publisher_rule_key not in publisher_rules_dict:
-                publisher_rules_dict[publisher_rule_key] = {
-                    'rule_id': str(uuid.uuid4()),
-                    'filenames': [filename]
-                }
-            else:
-                publisher_rules_dict[publisher_rule_key]['filenames'].append(filename)
-
-    if include_publisher:
-        for (publisher, version, binary_name), rule_info in publisher_rules_dict.items():
-            rule_id_publisher = rule_info['rule_id']
-            covered_filenames = ', '.join(rule_info['filenames'])
-            description = f"Files covered by this rule: {covered_filenames}"
-
-            file_publisher_rule = ET.SubElement(rule_collection, "FilePublisherRule", Id=rule_id_publisher, Name="Publisher Rule for " + binary_name, Description=description, UserOrGroupSid="S-1-1-0", Action=action)
-            conditions_publisher = ET.SubElement(file_publisher_rule, "Conditions")
-            file_publisher_condition = ET.SubElement(conditions_publisher, "FilePublisherCondition", PublisherName=publisher, ProductName="*", BinaryName=binary_name)
-            version_range_low = version_range_high = version or "0.0.0.0"
-            ET.SubElement(file_publisher_condition, "BinaryVersionRange", LowSection=version_range_low, HighSection=version_range_high)
-
-    rough_string = ET.tostring(root, 'utf-8')
-    reparsed = minidom.parseString(rough_string)
-    return reparsed.toprettyxml(indent="  ")
+@st.cache_resource
+def get_file_metadata_cache():
+    # Persist PE metadata across runs only when a cache directory is configured
+    cache_dir = os.environ.get('APPLOCKERGEN_CACHE_DIR')
+    return FileMetadataCache(os.path.join(cache_dir, 'file_metadata.sqlite')) if cache_dir else None
+
+# Archive members held in memory at once while uploads are analyzed
+ANALYSIS_BATCH_SIZE = 256
 
+def iter_uploaded_sources(uploaded_files):
+    # Archives are expanded in memory; only their PE members are analyzed
+    for uploaded_file in uploaded_files:
+        kind = archive_kind(uploaded_file.name)
+        if kind:
+            try:
+                for member_name, data in iter_archive(uploaded_file.name, uploaded_file, kind):
+                    yield os.path.basename(member_name.rsplit('!', 1)[-1]), data
+            except ARCHIVE_ERRORS as e:
+                st.error(f"Error reading archive {uploaded_file.name}: {e}")
+        else:
+            yield uploaded_file.name, uploaded_file.getbuffer()
 
 st.title("Applocker EXE Policy Generator")
 
 st.markdown("""
 This application generates XML policies for uploaded .exe, .sys, .dll, or .bin files.
 
-For each uploaded file, it extracts the publisher and version information, calculates the SHA256 hash and file length, and generates an AppLocker policy.
+For each uploaded file, it extracts the publisher and version information, calculates the SHA256 hash (the Authenticode hash AppLocker matches, for PE files) and file length, and generates an AppLocker policy.
 
 The policy includes both a Publisher Rule and a Hash Rule for each file. The Publisher Rule allows execution of files from the same publisher and with the same internal name, within a specific version range. The Hash Rule allows execution of files with the same SHA256 hash.
 
 You can choose to generate the policies in 'Block' or 'Audit' mode. In 'Block' mode, the policies are enforced and execution of non-compliant files is blocked. In 'Audit' mode, policy violations are only logged and execution is not blocked.
 
+ZIP and TAR archives (including .nupkg, .appx and .msix packages) and gzip, bzip2 or xz-compressed files are expanded in memory and every PE file inside them is included.
+
 After generating the policies, you can view the generated XML and download it as an 'applocker_config.xml' file.
 """)
 
-uploaded_files = st.file_uploader("Upload .exe, .sys, or .dll files", accept_multiple_files=True, type=['exe', 'sys', 'dll', 'bin'])
+uploaded_files = st.file_uploader("Upload .exe, .sys, or .dll files, or archives containing them", accept_multiple_files=True, type=['exe', 'sys', 'dll', 'bin', 'zip', 'nupkg', 'appx', 'msix', 'tar', 'gz', 'tgz', 'bz2', 'xz'])
 mode = st.radio("Select Mode", ('Block', 'Audit'))
 
 rule_options = st.multiselect(
@@ -115,36 +66,47 @@ rule_options = st.multiselect(
     default=['Hash', 'Publisher']
 )
 
-publishers = []
-versions = []
-internal_names = []
-file_hashes = []
-filenames = []
-file_lengths = []
+compact = st.checkbox(
+    "Compact hash rules",
+    help="Merge the hash rules into multi-hash rules, which match exactly the same files"
+)
+
+# Compacting merges hash rules up to this size, so it starts from the compactor's cap rather than one file per rule
+max_hashes_per_rule = st.number_input(
+    "Files per hash rule",
+    min_value=1,
+    max_value=10000,
+    value=MAX_HASHES_PER_RULE if compact else 1,
+    key=f"max_hashes_per_rule_{compact}",
+    help="Above 1, file hashes are batched into hash rules with up to this many FileHash entries each, instead of one hash rule per file. Compacted rules hold at most this many too."
+)
+
+collapse_publishers = st.checkbox(
+    "Collapse signed files into publisher rules",
+    disabled=not compact,
+    help="Allow mode only: replace the hashes of signed files sharing a publisher, product and binary name with one publisher rule spanning their versions. This also allows builds in that range that were never uploaded."
+)
+
 xml_content = ""
 
+include_hash = 'Hash' in rule_options
+include_publisher = 'Publisher' in rule_options
+
 if uploaded_files:
-    for uploaded_file in uploaded_files:
-        temp_file_path = f"./{uploaded_file.name}"
-        with open(temp_file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        try:
-            file_hash, file_length = calculate_hash_and_length(uploaded_file)
-            publisher, version, internal_name = extract_publisher_and_version_info(temp_file_path)
-            publishers.append(publisher)
-            versions.append(version)
-            internal_names.append(internal_name)
-            file_hashes.append(file_hash)
-            filenames.append(uploaded_file.name)
-            file_lengths.append(file_length)
-            include_hash = 'Hash' in rule_options
-            include_publisher = 'Publisher' in rule_options
-        except Exception as e:
-            st.error(f"Error processing file {uploaded_file.name}: {e}")
-        finally:
-            os.remove(temp_file_path)
-
-    xml_content = generate_xml(publishers, versions, internal_names, file_hashes, filenames, file_lengths, mode, include_hash, include_publisher)
+    # Archive members are analyzed in bounded batches; only the small per-file records are kept
+    stats = {}
+    records = list(analyze_stream(iter_uploaded_sources(uploaded_files), cache=get_file_metadata_cache(), batch_size=ANALYSIS_BATCH_SIZE, stats=stats))
+    for name, error in stats['errors']:
+        st.error(f"Error processing file {name}: {error}")
+    st.caption(f"Processed {stats['files']} files ({stats['bytes'] / (1024 * 1024):.1f} MB) in {stats['seconds']:.2f}s, {stats['mb_per_sec']:.1f} MB/s")
+
+    xml_content = generate_policy_xml(records, mode, include_hash, include_publisher, max_hashes_per_rule)
+    if compact and include_hash:
+        xml_content, report = compact_policy(xml_content, RecordMetadata(records), collapse_publishers=collapse_publishers, max_hashes_per_rule=max_hashes_per_rule)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Rules", report['rules_after'], report['rules_after'] - report['rules_before'], delta_color="inverse")
+        col2.metric("Policy Size", f"{report['bytes_after'] / 1024:,.1f} KB", f"{(report['bytes_after'] - report['bytes_before']) / 1024:,.1f} KB", delta_color="inverse")
+        col3.metric("Hashes Collapsed", report['hashes_collapsed'])
 
 st.markdown("### Policy", unsafe_allow_html=True)
 policy_content = st.text_area("Modify the policy as needed", xml_content, height=250)
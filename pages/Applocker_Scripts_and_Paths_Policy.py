@@ -1,7 +1,9 @@
 import streamlit as st
+import io
 import uuid
 import xml.etree.ElementTree as ET
-from xml.dom import minidom
+
+from applocker.xmlwriter import PolicyWriter
 
 st.set_page_config(
     page_title="⚒️ Applocker Scripts and Paths Policy Generator",
@@ -15,16 +17,17 @@ except:
     st.sidebar.markdown("### 🔒 AppLockerGen")
 
 def generate_xml(rules, enforcement_mode):
-    root = ET.Element("AppLockerPolicy", Version="1")
-    rule_collection = ET.SubElement(root, "RuleCollection", Type="Script", EnforcementMode=enforcement_mode)
+    buffer = io.StringIO()
+    writer = PolicyWriter(buffer)
+    writer.start("AppLockerPolicy", {'Version': "1"})
+    writer.start("RuleCollection", {'Type': "Script", 'EnforcementMode': enforcement_mode})
     for rule in rules:
-        file_path_rule = ET.SubElement(rule_collection, "FilePathRule", Id=str(uuid.uuid4()), Name=rule['name'], Description=rule.get('description', ""), UserOrGroupSid="S-1-1-0", Action=rule['action'])
+        file_path_rule = ET.Element("FilePathRule", Id=str(uuid.uuid4()), Name=rule['name'], Description=rule.get('description', ""), UserOrGroupSid="S-1-1-0", Action=rule['action'])
         conditions = ET.SubElement(file_path_rule, "Conditions")
         ET.SubElement(conditions, "FilePathCondition", Path=rule['path'])
-
-    rough_string = ET.tostring(root, 'utf-8')
-    reparsed = minidom.parseString(rough_string)
-    return reparsed.toprettyxml(indent="  ")
+        writer.element(file_path_rule)
+    writer.close()
+    return buffer.getvalue()
 
 st.title("Applocker Scripts and Paths Policy Generator")
 
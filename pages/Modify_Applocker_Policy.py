@@ -3,6 +3,9 @@ from code_editor import code_editor
 import xml.etree.ElementTree as ET
 import json
 
+from applocker.diff import diff_policies, summarize_changes
+from applocker.policy_store import decode_policy, is_valid_policy_xml, policy_upload, rule_index as get_rule_index
+
 with open('resources/example_custom_buttons_bar_alt.json') as json_button_file_alt:
     custom_buttons_alt = json.load(json_button_file_alt)
 
@@ -39,59 +42,37 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-def validate_xml(xml_string):
-    try:
-        ET.fromstring(xml_string)
-        return True
-    except ET.ParseError as e:
-        return False
-
-def parse_xml(xml_content):
-    root = ET.fromstring(xml_content)
-    hash_rules = []
-    publisher_rules = []
-    path_rules = []
-    dll_rules = []
-    script_rules = []
-
-    for rule in root.iter('FileHashRule'):
-        hash_rules.append(ET.tostring(rule, encoding='unicode'))
-
-    for rule in root.iter('FilePublisherRule'):
-        publisher_rules.append(ET.tostring(rule, encoding='unicode'))
-
-    for rule in root.iter('FilePathRule'):
-        path_rules.append(ET.tostring(rule, encoding='unicode'))
-
-    for rule in root.iter('FilePathRule'):
-        description_element = rule.find('Description')
-        if description_element is not None:
-            description_text = description_element.text
-            if 'DLLs' in description_text:
-                dll_rules.append(ET.tostring(rule, encoding='unicode'))
-            elif 'scripts' in description_text:
-                script_rules.append(ET.tostring(rule, encoding='unicode'))
-
-    return hash_rules, publisher_rules, path_rules, dll_rules, script_rules
+PAGE_SIZES = [25, 50, 100, 250]
+RULE_TYPE_FILTERS = ['All', 'Hash', 'Publisher', 'Path']
+MAX_FULL_EDITOR_BYTES = 1024 * 1024
 
 st.title("Modify AppLocker Policy")
 
-uploaded_file = st.file_uploader("Upload AppLocker Policy XML file", type=['xml'])
-if uploaded_file is not None:
-    xml_content = uploaded_file.read().decode()
+policy_name, raw_content = policy_upload("Upload AppLocker Policy XML file", key="modify_policy")
+if raw_content is not None:
+    xml_content, encoding = decode_policy(raw_content)
+    if xml_content is None:
+        st.error("Unable to decode the file. Please ensure it's a valid XML file saved with UTF-8, UTF-16, or Windows encoding.")
+        st.stop()
 else:
     xml_content = st.text_area("Or paste your AppLocker Policy XML here")
 
 if xml_content:
-    if validate_xml(xml_content):
-        original_hash_rules, original_publisher_rules, original_path_rules, original_dll_rules, original_script_rules = parse_xml(xml_content)
+    try:
+        # Parsed once per policy and session; page edits accumulate on the same tree across reruns
+        rule_index = get_rule_index(xml_content)
+    except ET.ParseError:
+        rule_index = None
+
+    if rule_index is not None:
+        counts = rule_index.counts()
 
         col1, col2, col3, col4, col5 = st.columns(5)
-        col1.metric(label="Hash Rules", value=len(original_hash_rules))
-        col2.metric(label="Publisher Rules", value=len(original_publisher_rules))
-        col3.metric(label="Path Rules", value=len(original_path_rules))
-        col4.metric(label="DLL Rules", value=len(original_dll_rules))
-        col5.metric(label="Script Rules", value=len(original_script_rules))
+        col1.metric(label="Hash Rules", value=counts['Hash'])
+        col2.metric(label="Publisher Rules", value=counts['Publisher'])
+        col3.metric(label="Path Rules", value=counts['Path'])
+        col4.metric(label="DLL Rules", value=counts['DLL'])
+        col5.metric(label="Script Rules", value=counts['Script'])
 
         comp_props = {"css": css_text, "globalCSS": ":root {\n  --streamlit-dark-font-family: monospace;\n}"}
         ace_props = {"style": {"borderRadius": "0px 0px 8px 8px"}}
@@ -134,28 +115,71 @@ if xml_content:
                 if response_dict_info['type'] == "submit" and len(response_dict_info['text']) != 0:
                     info_bar = json.loads(response_dict_info['text'])
 
-
-        with st.expander("Hash Rules"):
-            hash_rules = code_editor("\n".join(original_hash_rules), lang='xml', height=250, theme=theme, shortcuts=shortcuts, buttons=btns, info=info, props=ace_props, options={"wrap": wrap}, key="hash_rules_editor")
-
-        with st.expander("Publisher Rules"):
-            publisher_rules = code_editor("\n".join(original_publisher_rules), lang='xml', height=250, theme=theme, shortcuts=shortcuts, buttons=btns, info=info, props=ace_props, options={"wrap": wrap}, key="publisher_rules_editor")
-
-        with st.expander("Path Rules"):
-            path_rules = code_editor("\n".join(original_path_rules), lang='xml', height=250, theme=theme, shortcuts=shortcuts, buttons=btns, info=info, props=ace_props, options={"wrap": wrap}, key="path_rules_editor")
-
-        with st.expander("DLL Rules"):
-            dll_rules = code_editor("\n".join(original_dll_rules), lang='xml', height=250, theme=theme, shortcuts=shortcuts, buttons=btns, info=info, props=ace_props, options={"wrap": wrap}, key="dll_rules_editor")
-
-        with st.expander("Script Rules"):
-            script_rules = code_editor("\n".join(original_script_rules), lang='xml', height=250, theme=theme, shortcuts=shortcuts, buttons=btns, info=info, props=ace_props, options={"wrap": wrap}, key="script_rules_editor")
-
-        modified_xml_content = code_editor(xml_content, lang='xml', height=500, theme=theme, shortcuts=shortcuts, buttons=btns, info=info, props=ace_props, options={"wrap": wrap}, key="modified_xml_content_editor")
-
-        if modified_xml_content['text'] != xml_content:
-            if validate_xml(modified_xml_content['text']):
+        # Only the rules on the current page are serialized and sent to the browser
+        st.markdown("### Rules", unsafe_allow_html=True)
+        filter_a, filter_b, filter_c, filter_d = st.columns([2, 2, 4, 2])
+        rule_type = filter_a.selectbox("Rule type", RULE_TYPE_FILTERS)
+        collection_type = filter_b.selectbox("Collection", ['All'] + rule_index.collections())
+        search = filter_c.text_input("Filter by Id, name, path, publisher or hash")
+        page_size = filter_d.selectbox("Rules per page", PAGE_SIZES, index=1)
+
+        positions = rule_index.select(
+            None if rule_type == 'All' else rule_type,
+            None if collection_type == 'All' else collection_type,
+            search,
+        )
+        page_count = max(1, (len(positions) - 1) // page_size + 1)
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1)
+        page_positions = positions[(page - 1) * page_size:page * page_size]
+        if positions:
+            st.caption(f"Showing rules {(page - 1) * page_size + 1}–{(page - 1) * page_size + len(page_positions)} of {len(positions)}. Submit the editor to apply changes; remove a rule to delete it, add one with a new Id, or move it under another RuleCollection to change its collection.")
+        else:
+            st.caption("No rules match the filters.")
+
+        page_xml = rule_index.rules_xml(page_positions)
+        # The key changes with every applied edit, so the editor reloads from the updated tree
+        rules_response = code_editor(page_xml, lang='xml', height=250, theme=theme, shortcuts=shortcuts, buttons=btns, info=info, props=ace_props, options={"wrap": wrap}, key=f"rules_editor_{rule_type}_{collection_type}_{search}_{page_size}_{page}_{rule_index.edits}")
+        if rules_response['type'] == "submit" and rules_response['text'] != page_xml:
+            try:
+                rule_index.replace(page_positions, rules_response['text'])
+                st.rerun()
+            except ET.ParseError as e:
+                st.error(f"The edited rules are not valid XML: {e}")
+            except ValueError as e:
+                st.error(str(e))
+
+        current_xml = rule_index.to_xml() if rule_index.edits else xml_content
+        if len(current_xml) <= MAX_FULL_EDITOR_BYTES:
+            modified_xml_content = code_editor(current_xml, lang='xml', height=500, theme=theme, shortcuts=shortcuts, buttons=btns, info=info, props=ace_props, options={"wrap": wrap}, key=f"modified_xml_content_editor_{rule_index.edits}")
+            modified_text = modified_xml_content['text'] or current_xml
+            # A submitted document replaces the index's tree, so the rule pages show the same edits
+            if modified_xml_content['type'] == "submit" and modified_text != current_xml:
+                if is_valid_policy_xml(modified_text):
+                    rule_index.load(modified_text)
+                    st.rerun()
+                st.error("The edited document is not valid XML; it was not applied to the rule pages.")
+        else:
+            st.caption("This policy is too large to edit as a whole document; use the rule pages above.")
+            modified_text = current_xml
+
+        if modified_text != xml_content:
+            if is_valid_policy_xml(modified_text):
+                changes = diff_policies(xml_content, modified_text)
+                st.markdown("### Changes", unsafe_allow_html=True)
+                if changes:
+                    counts = summarize_changes(changes)
+                    cols = st.columns(4)
+                    cols[0].metric(label="Added", value=counts['Added'])
+                    cols[1].metric(label="Removed", value=counts['Removed'])
+                    cols[2].metric(label="Modified", value=counts['Modified'] + counts['ReGUIDed'])
+                    cols[3].metric(label="Collection Changes", value=counts['CollectionAdded'] + counts['CollectionRemoved'] + counts['EnforcementMode'])
+                    st.dataframe(changes, use_container_width=True)
+                else:
+                    st.info("Only formatting changed; the rules and collections are the same.")
                 st.markdown("### Modified Policy", unsafe_allow_html=True)
-                st.code(modified_xml_content['text'], language="xml")
+                if len(modified_text) <= MAX_FULL_EDITOR_BYTES:
+                    st.code(modified_text, language="xml")
+                st.download_button("Download Modified Policy", modified_text, file_name="modified_applocker_policy.xml", mime="application/xml")
             else:
                 st.error("The modified XML is not valid. Please check your changes and try again.")
         else:
@@ -0,0 +1,120 @@
+"""Minimal EVTX writer for the event-log tests
+
+Records are AppLocker 800x events built from one binary XML template. The
+first record of each chunk carries the template; the others reference it, as
+Windows writes them. Chunk and file header checksums are left at zero, which
+python-evtx does not verify.
+"""
+import struct
+
+CHUNK_SIZE = 0x10000
+CHUNK_HEADER_SIZE = 0x200
+FIELDS = ['EventID', 'Channel', 'Computer', 'UserID', 'PolicyName', 'RuleId', 'RuleName', 'RuleSddl', 'TargetUser', 'FilePath', 'FileHash', 'Fqbn', 'FullFilePath']
+RULE_AND_FILE_DATA = ['PolicyName', 'RuleId', 'RuleName', 'RuleSddl', 'TargetUser', 'FilePath', 'FileHash', 'Fqbn', 'FullFilePath']
+SUBSTITUTION = {field: index for index, field in enumerate(FIELDS)}
+
+def _name(text):
+    encoded = text.encode('utf-16-le')
+    return struct.pack('<IHH', 0, 0, len(text)) + encoded + b'\0\0'
+
+class _Template:
+    """Binary XML template body; offsets inside it are relative to the chunk"""
+
+    def __init__(self, base):
+        self.base = base
+        self.data = bytearray(b'\x0f\x01\x01\x00')
+
+    def element(self, tag, attributes=(), text=None, children=()):
+        start = self.base + len(self.data)
+        self.data += struct.pack('<BHI', 0x41 if attributes else 0x01, 0xFFFF, 0)
+        size_at = len(self.data) - 4
+        self.data += struct.pack('<I', start + 11 + (4 if attributes else 0))
+        if attributes:
+            self.data += struct.pack('<I', 0)
+        self.data += _name(tag)
+        for number, (name, value) in enumerate(attributes):
+            token = 0x06 if number == len(attributes) - 1 else 0x46
+            self.data += struct.pack('<BI', token, self.base + len(self.data) + 5) + _name(name)
+            if isinstance(value, int):
+                self.data += struct.pack('<BHB', 0x0D, value, 0x01)
+            else:
+                self.data += struct.pack('<BBH', 0x05, 0x01, len(value)) + value.encode('utf-16-le')
+        if text is None and not children:
+            self.data += b'\x03'
+        else:
+            self.data += b'\x02'
+            if text is not None:
+                self.data += struct.pack('<BHB', 0x0D, text, 0x01)
+            for child in children:
+                child()
+            self.data += b'\x04'
+        struct.pack_into('<I', self.data, size_at, len(self.data) - size_at - 4)
+
+def _template(base):
+    template = _Template(base)
+
+    def system():
+        template.element('Provider', [('Name', 'Microsoft-Windows-AppLocker'), ('Guid', '{cbda4dbf-8d5d-4f69-9578-be14aa540d22}')])
+        template.element('EventID', [('Qualifiers', '')], text=SUBSTITUTION['EventID'])
+        template.element('Channel', text=SUBSTITUTION['Channel'])
+        template.element('Computer', text=SUBSTITUTION['Computer'])
+        template.element('Security', [('UserID', SUBSTITUTION['UserID'])])
+
+    def rule_and_file_data():
+        for field in RULE_AND_FILE_DATA:
+            template.element(field, text=SUBSTITUTION[field])
+
+    def user_data():
+        template.element('RuleAndFileData', [('xmlns', 'http://schemas.microsoft.com/schemas/event/Microsoft.Windows/1.0.0.0')], children=[rule_and_file_data])
+
+    template.element('Event', [('xmlns', 'http://schemas.microsoft.com/win/2004/08/events/event')],
+                     children=[lambda: template.element('System', children=[system]), lambda: template.element('UserData', children=[user_data])])
+    template.data += b'\x00'
+    return bytes(template.data)
+
+def _record(offset, number, values, template_offset=None):
+    # The template definition starts right after the TemplateInstance token inside the record's root
+    instance = b'\x0f\x01\x01\x00'
+    if template_offset is None:
+        template_offset = offset + 0x18 + 4 + 10
+        body = _template(template_offset + 0x18)
+        instance += struct.pack('<BBII', 0x0C, 1, 7, template_offset) + struct.pack('<II12xI', 0, 7, len(body)) + body
+    else:
+        instance += struct.pack('<BBII', 0x0C, 1, 7, template_offset)
+    encoded = [value.encode('utf-16-le') for value in values]
+    substitutions = struct.pack('<I', len(encoded)) + b''.join(struct.pack('<HBB', len(value), 0x01, 0) for value in encoded) + b''.join(encoded)
+    size = 0x18 + len(instance) + len(substitutions) + 4
+    return struct.pack('<IIQQ', 0x2A2A, size, number, 0) + instance + substitutions + struct.pack('<I', size)
+
+def _close_chunk(chunk, first, last):
+    header = b'ElfChnk\0' + struct.pack('<QQQQIII', first, last, first, last, 0x80, 0, len(chunk))
+    chunk[:len(header)] = header
+    return bytes(chunk) + bytes(CHUNK_SIZE - len(chunk))
+
+def write_evtx(path, events):
+    """Write event dicts keyed by FIELDS (missing fields are empty) to an EVTX file"""
+    chunks = []
+    chunk = bytearray(CHUNK_HEADER_SIZE)
+    number = first = 1
+    template_offset = None
+    for event in events:
+        values = [event.get(field, '') for field in FIELDS]
+        record = _record(len(chunk), number, values, template_offset)
+        if len(chunk) + len(record) > CHUNK_SIZE:
+            chunks.append(_close_chunk(chunk, first, number - 1))
+            chunk = bytearray(CHUNK_HEADER_SIZE)
+            first = number
+            template_offset = None
+            record = _record(len(chunk), number, values)
+        if template_offset is None:
+            template_offset = len(chunk) + 0x18 + 4 + 10
+        chunk += record
+        number += 1
+    if len(chunk) > CHUNK_HEADER_SIZE:
+        chunks.append(_close_chunk(chunk, first, number - 1))
+    header = bytearray(0x1000)
+    struct.pack_into('<8sQQQIHHHH', header, 0, b'ElfFile\0', 0, len(chunks) - 1, number, 0x80, 1, 3, 0x1000, len(chunks))
+    with open(path, 'wb') as f:
+        f.write(header)
+        for data in chunks:
+            f.write(data)
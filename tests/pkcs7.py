@@ -0,0 +1,130 @@
+"""Minimal DER certificates, Authenticode SignedData and PE files for the PE tests
+
+Certificates carry no real key or signature: only the fields the signer and
+publisher lookups read (serial, issuer, subject, basicConstraints) are
+meaningful.
+"""
+import struct
+
+ATTRIBUTE_OIDS = {'C': '2.5.4.6', 'S': '2.5.4.8', 'L': '2.5.4.7', 'O': '2.5.4.10', 'OU': '2.5.4.11', 'CN': '2.5.4.3'}
+PRINTABLE_STRING, UTF8_STRING, BMP_STRING = 0x13, 0x0C, 0x1E
+
+def tlv(tag, content):
+    length = len(content)
+    if length < 0x80:
+        return bytes([tag, length]) + content
+    encoded = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+    return bytes([tag, 0x80 | len(encoded)]) + encoded + content
+
+def sequence(*elements):
+    return tlv(0x30, b''.join(elements))
+
+def set_of(*elements):
+    return tlv(0x31, b''.join(elements))
+
+def oid(dotted):
+    numbers = [int(number) for number in dotted.split('.')]
+    encoded = bytes([40 * numbers[0] + numbers[1]])
+    for number in numbers[2:]:
+        groups = [number & 0x7F]
+        number >>= 7
+        while number:
+            groups.append(0x80 | (number & 0x7F))
+            number >>= 7
+        encoded += bytes(reversed(groups))
+    return tlv(0x06, encoded)
+
+def integer(value):
+    return tlv(0x02, value.to_bytes(value.bit_length() // 8 + 1, 'big'))
+
+def name(*attributes, string_tag=UTF8_STRING):
+    """DER Name from (attribute, value) pairs; C is always a PrintableString"""
+    rdns = []
+    for attribute, value in attributes:
+        if attribute == 'C':
+            encoded = tlv(PRINTABLE_STRING, value.encode('ascii'))
+        elif string_tag == BMP_STRING:
+            encoded = tlv(BMP_STRING, value.encode('utf-16-be'))
+        else:
+            encoded = tlv(string_tag, value.encode('utf-8'))
+        rdns.append(set_of(sequence(oid(ATTRIBUTE_OIDS[attribute]), encoded)))
+    return sequence(*rdns)
+
+SHA256_RSA = sequence(oid('1.2.840.113549.1.1.11'), tlv(0x05, b''))
+SHA256 = sequence(oid('2.16.840.1.101.3.4.2.1'), tlv(0x05, b''))
+
+def certificate(serial, issuer, subject, ca=False):
+    validity = sequence(tlv(0x17, b'200101000000Z'), tlv(0x17, b'300101000000Z'))
+    key = sequence(sequence(oid('1.2.840.113549.1.1.1'), tlv(0x05, b'')), tlv(0x03, b'\0' + sequence(integer(serial * 7 + 3), integer(65537))))
+    constraints = sequence(tlv(0x01, b'\xff')) if ca else sequence()
+    extensions = tlv(0xA3, sequence(sequence(oid('2.5.29.19'), tlv(0x01, b'\xff'), tlv(0x04, constraints))))
+    tbs = sequence(tlv(0xA0, integer(2)), integer(serial), SHA256_RSA, issuer, validity, subject, key, extensions)
+    return sequence(tbs, SHA256_RSA, tlv(0x03, b'\0' + bytes(64)))
+
+def signed_data(certificates, signer_issuer, signer_serial):
+    """Authenticode PKCS #7 SignedData whose SignerInfo names (issuer, serial)"""
+    indirect = sequence(oid('1.3.6.1.4.1.311.2.1.4'), tlv(0xA0, sequence(sequence(oid('1.3.6.1.4.1.311.2.1.15'), sequence()), sequence(SHA256, tlv(0x04, bytes(32))))))
+    signer = sequence(integer(1), sequence(signer_issuer, integer(signer_serial)), SHA256, sequence(oid('1.2.840.113549.1.1.1'), tlv(0x05, b'')), tlv(0x04, bytes(64)))
+    content = sequence(integer(1), set_of(SHA256), indirect, tlv(0xA0, b''.join(certificates)), set_of(signer))
+    return sequence(oid('1.2.840.113549.1.7.2'), tlv(0xA0, content))
+
+HEADERS_SIZE = 0x400
+SECTION_SIZE = 0x200
+RESOURCE_RVA = 0x2000
+RT_VERSION = 16
+
+def _version_block(key, value=b'', value_length=0, value_type=0, children=b''):
+    body = key.encode('utf-16-le') + b'\0\0'
+    body += bytes(-(6 + len(body)) % 4) + value
+    if children:
+        body += bytes(-(6 + len(body)) % 4) + children
+    return struct.pack('<HHH', 6 + len(body), value_length, value_type) + body + bytes(-(6 + len(body)) % 4)
+
+def version_info(file_version=None, strings=None):
+    """VS_VERSIONINFO with a VS_FIXEDFILEINFO for `file_version` (a 4-tuple) and a StringFileInfo table"""
+    fixed = b''
+    if file_version is not None:
+        major, minor, build, revision = file_version
+        fixed = struct.pack('<13I', 0xFEEF04BD, 0x10000, (major << 16) | minor, (build << 16) | revision, (major << 16) | minor, (build << 16) | revision, 0x3F, 0, 0x4, 0x1, 0, 0, 0)
+    table = b''
+    for name_, value in (strings or {}).items():
+        encoded = value.encode('utf-16-le') + b'\0\0'
+        table += _version_block(name_, encoded, len(encoded) // 2, 1)
+    string_file_info = _version_block('StringFileInfo', value_type=1, children=_version_block('040904b0', value_type=1, children=table))
+    return _version_block('VS_VERSION_INFO', fixed, len(fixed), 0, string_file_info)
+
+def _resource_section(version_resource):
+    # Type (RT_VERSION) -> name (1) -> language (0x409) -> IMAGE_RESOURCE_DATA_ENTRY -> data
+    def directory(entry_id, target):
+        return struct.pack('<IIHHHH', 0, 0, 0, 0, 0, 1) + struct.pack('<II', entry_id, target)
+    data_offset = 3 * 24 + 16
+    section = directory(RT_VERSION, 0x80000000 | 24) + directory(1, 0x80000000 | 48) + directory(0x409, 72)
+    section += struct.pack('<IIII', RESOURCE_RVA + data_offset, len(version_resource), 0, 0) + version_resource
+    return section + bytes(-len(section) % SECTION_SIZE)
+
+def pe_file(signature=None, fill=b'\x90', version_resource=None):
+    """A PE32+ with one raw section, an optional .rsrc section holding `version_resource`,
+    and a WIN_CERTIFICATE holding `signature` appended when given"""
+    headers = bytearray(HEADERS_SIZE)
+    headers[:2] = b'MZ'
+    struct.pack_into('<I', headers, 0x3C, 0x80)
+    headers[0x80:0x84] = b'PE\0\0'
+    struct.pack_into('<HH', headers, 0x84, 0x8664, 1 if version_resource is None else 2)
+    struct.pack_into('<H', headers, 0x94, 240)
+    struct.pack_into('<H', headers, 0x98, 0x20B)
+    struct.pack_into('<I', headers, 0x98 + 108, 16)
+    struct.pack_into('<8sIIII', headers, 0x98 + 240, b'.text', SECTION_SIZE, 0x1000, SECTION_SIZE, HEADERS_SIZE)
+    data = bytes(headers) + fill * SECTION_SIZE
+    if version_resource is not None:
+        resources = _resource_section(version_resource)
+        headers = bytearray(data)
+        struct.pack_into('<8sIIII', headers, 0x98 + 240 + 40, b'.rsrc', len(resources), RESOURCE_RVA, len(resources), len(data))
+        struct.pack_into('<II', headers, 0x98 + 112 + 8 * 2, RESOURCE_RVA, len(resources))
+        data = bytes(headers) + resources
+    if signature is None:
+        return data
+    certificate_table = struct.pack('<IHH', 8 + len(signature), 0x0200, 2) + signature
+    certificate_table += bytes(-len(certificate_table) % 8)
+    headers = bytearray(data)
+    struct.pack_into('<II', headers, 0x98 + 112 + 8 * 4, len(data), len(certificate_table))
+    return bytes(headers) + certificate_table
@@ -0,0 +1,42 @@
+"""Small AppLocker policy XML builders for the engine tests"""
+import itertools
+from xml.sax.saxutils import quoteattr
+
+EVERYONE = 'S-1-1-0'
+ADMINISTRATORS = 'S-1-5-32-544'
+
+_rule_ids = itertools.count(1)
+
+def _rule(tag, conditions, action, sid, rule_id, name, exceptions):
+    rule_id = rule_id or f"00000000-0000-0000-0000-{next(_rule_ids):012d}"
+    name = name or f"{tag} {rule_id[-4:]}"
+    exceptions = f"<Exceptions>{exceptions}</Exceptions>" if exceptions else ''
+    return (f'<{tag} Id="{rule_id}" Name={quoteattr(name)} Description="" UserOrGroupSid="{sid}" Action="{action}">'
+            f'<Conditions>{conditions}</Conditions>{exceptions}</{tag}>')
+
+def path_condition(path):
+    return f'<FilePathCondition Path={quoteattr(path)}/>'
+
+def publisher_condition(publisher, product='*', binary='*', low='*', high='*'):
+    return (f'<FilePublisherCondition PublisherName={quoteattr(publisher)} ProductName={quoteattr(product)} BinaryName={quoteattr(binary)}>'
+            f'<BinaryVersionRange LowSection="{low}" HighSection="{high}"/></FilePublisherCondition>')
+
+def path_rule(path, action='Allow', sid=EVERYONE, rule_id=None, name=None, exceptions=''):
+    return _rule('FilePathRule', path_condition(path), action, sid, rule_id, name, exceptions)
+
+def publisher_rule(publisher, product='*', binary='*', low='*', high='*', action='Allow', sid=EVERYONE, rule_id=None, name=None):
+    return _rule('FilePublisherRule', publisher_condition(publisher, product, binary, low, high), action, sid, rule_id, name, '')
+
+def hash_rule(*hashes, action='Allow', sid=EVERYONE, rule_id=None, name=None):
+    """A FileHashRule over (digest, file name, length) triples"""
+    entries = ''.join(
+        f'<FileHash Type="SHA256" Data="0x{digest.upper()}" SourceFileName="{file_name}" SourceFileLength="{length}"/>'
+        for digest, file_name, length in hashes
+    )
+    return _rule('FileHashRule', f'<FileHashCondition>{entries}</FileHashCondition>', action, sid, rule_id, name, '')
+
+def collection(collection_type, *rules, mode='Enabled', extra=''):
+    return f'<RuleCollection Type="{collection_type}" EnforcementMode="{mode}">{"".join(rules)}{extra}</RuleCollection>'
+
+def policy(*collections):
+    return f'<AppLockerPolicy Version="1">{"".join(collections)}</AppLockerPolicy>'
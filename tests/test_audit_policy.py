@@ -0,0 +1,77 @@
+import io
+import xml.etree.ElementTree as ET
+
+from applocker.audit_policy import AuditAllowList, allow_list_from_counts, write_allow_policy_xml
+from applocker.events import NULL_RULE_ID, EventKey
+
+VENDOR = 'O=VENDOR1 INC, L=SEATTLE, C=US'
+
+def would_block(path, fqbn='-', file_hash='', collection='Exe', event_id=8003, user='S-1-5-21-1'):
+    return EventKey(event_id, collection, NULL_RULE_ID, '-', path, file_hash, fqbn, user)
+
+def signed(path, version, binary='APP.EXE', **kwargs):
+    return would_block(path, fqbn=f'{VENDOR}\\PRODUCT1\\{binary}\\{version}', **kwargs)
+
+def test_signed_files_get_one_publisher_rule_spanning_the_versions_seen():
+    allow_list = allow_list_from_counts({
+        signed('%OSDRIVE%\\A\\APP.EXE', '1.10.0.0'): 3,
+        signed('%OSDRIVE%\\B\\APP.EXE', '1.9.0.0'): 1,
+        signed('%OSDRIVE%\\C\\APP-OLD.EXE', '2.0.0.0'): 2,
+    })
+    assert allow_list.publishers == {('Exe', VENDOR, 'PRODUCT1', 'APP.EXE'): ['1.9.0.0', '2.0.0.0', 6, {'APP.EXE', 'APP-OLD.EXE'}]}
+    assert allow_list.rule_counts() == {'Publisher': 1, 'Hash': 0, 'Path': 0}
+
+def test_unsigned_files_get_hash_rules_and_the_rest_path_rules():
+    allow_list = allow_list_from_counts({
+        would_block('%OSDRIVE%\\A\\TOOL.EXE', file_hash='AB' * 32): 2,
+        would_block('%OSDRIVE%\\B\\TOOL-COPY.EXE', file_hash='AB' * 32): 1,
+        would_block('%OSDRIVE%\\C\\RUN.PS1', collection='Script', event_id=8006): 4,
+    })
+    assert allow_list.hashes == {('Exe', 'AB' * 32): ['TOOL.EXE', 3]}
+    assert allow_list.paths == {('Script', '%OSDRIVE%\\C\\RUN.PS1'): 4}
+    assert allow_list.events == 7
+
+def test_only_would_block_events_are_kept():
+    allow_list = allow_list_from_counts({
+        would_block('%OSDRIVE%\\A\\TOOL.EXE', file_hash='AB' * 32, event_id=8002): 5,
+        would_block('%OSDRIVE%\\A\\TOOL.EXE', file_hash='AB' * 32, event_id=8004): 5,
+    })
+    assert allow_list.rule_counts() == {'Publisher': 0, 'Hash': 0, 'Path': 0}
+    assert allow_list.events == 0
+
+def test_update_merges_chunk_lists():
+    first, second = AuditAllowList(), AuditAllowList()
+    first.add(signed('%OSDRIVE%\\APP.EXE', '1.5.0.0'))
+    first.add(would_block('%OSDRIVE%\\TOOL.EXE', file_hash='AB' * 32))
+    second.add(signed('%OSDRIVE%\\APP.EXE', '1.2.0.0'))
+    second.add(signed('%OSDRIVE%\\APP.EXE', '3.0.0.0'))
+    second.add(would_block('%OSDRIVE%\\TOOL.EXE', file_hash='AB' * 32))
+    second.add(would_block('%OSDRIVE%\\T.PS1', collection='Script'))
+    first.update(second)
+    assert first.publishers == {('Exe', VENDOR, 'PRODUCT1', 'APP.EXE'): ['1.2.0.0', '3.0.0.0', 3, {'APP.EXE'}]}
+    assert first.hashes == {('Exe', 'AB' * 32): ['TOOL.EXE', 2]}
+    assert first.paths == {('Script', '%OSDRIVE%\\T.PS1'): 1}
+    assert first.events == 6
+
+def test_write_allow_policy_xml():
+    allow_list = allow_list_from_counts({
+        would_block('%OSDRIVE%\\S\\RUN.PS1', collection='Script', event_id=8006): 1,
+        signed('%OSDRIVE%\\A\\APP.EXE', '1.0.0.0'): 1,
+        signed('%OSDRIVE%\\A\\APP.EXE', '1.2.0.0'): 1,
+        would_block('%OSDRIVE%\\A\\TOOL.EXE', file_hash='AB' * 32): 1,
+        would_block('%OSDRIVE%\\A\\HELPER.DLL', file_hash='CD' * 32, collection='Dll'): 1,
+    })
+    out = io.StringIO()
+    write_allow_policy_xml(allow_list, out, "Enabled")
+    root = ET.fromstring(out.getvalue())
+    assert [(c.get('Type'), c.get('EnforcementMode')) for c in root] == [('Dll', 'Enabled'), ('Exe', 'Enabled'), ('Script', 'Enabled')]
+    exe = root.find("RuleCollection[@Type='Exe']")
+    assert [rule.tag for rule in exe] == ['FilePublisherRule', 'FileHashRule']
+    assert all(rule.get('Action') == 'Allow' and rule.get('UserOrGroupSid') == 'S-1-1-0' for rule in root.iter() if rule.tag.endswith('Rule'))
+    condition = exe.find('FilePublisherRule/Conditions/FilePublisherCondition')
+    assert (condition.get('PublisherName'), condition.get('ProductName'), condition.get('BinaryName')) == (VENDOR, 'PRODUCT1', 'APP.EXE')
+    assert condition.find('BinaryVersionRange').attrib == {'LowSection': '1.0.0.0', 'HighSection': '1.2.0.0'}
+    file_hash = exe.find('FileHashRule/Conditions/FileHashCondition/FileHash')
+    assert file_hash.attrib == {'Type': 'SHA256', 'Data': '0x' + 'AB' * 32, 'SourceFileName': 'TOOL.EXE'}
+    script = root.find("RuleCollection[@Type='Script']/FilePathRule")
+    assert (script.get('Name'), script.find('Conditions/FilePathCondition').get('Path')) == ('Path Rule for RUN.PS1', '%OSDRIVE%\\S\\RUN.PS1')
@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+from applocker.authenticode import DERError, SignerChainCache, authenticode_publisher, format_publisher_name, signer_certificate
+from applocker.pe import extract_file_metadata
+from pkcs7 import BMP_STRING, certificate, name, pe_file, signed_data
+
+ROOT = name(('C', 'US'), ('O', 'Contoso Root Authority'), ('CN', 'Contoso Root CA'))
+INTERMEDIATE = name(('C', 'US'), ('O', 'Contoso Root Authority'), ('CN', 'Contoso Code Signing CA'))
+LEAF = name(('C', 'US'), ('S', 'Washington'), ('L', 'Redmond'), ('O', 'Contoso, Inc.'), ('CN', 'Contoso, Inc.'))
+TIMESTAMP = name(('C', 'US'), ('O', 'Timestamps Ltd'), ('CN', 'Timestamping Service'))
+LEAF_PUBLISHER = 'O="CONTOSO, INC.", L=REDMOND, S=WASHINGTON, C=US'
+
+def chain(order=None):
+    certificates = [
+        certificate(1, ROOT, ROOT, ca=True),
+        certificate(2, ROOT, INTERMEDIATE, ca=True),
+        certificate(300, INTERMEDIATE, LEAF),
+        certificate(4, ROOT, TIMESTAMP),
+    ]
+    return [certificates[number] for number in order] if order else certificates
+
+@pytest.mark.parametrize('seed', range(6))
+def test_leaf_signer_is_picked_whatever_the_certificate_order(seed):
+    order = list(range(4))
+    random.Random(seed).shuffle(order)
+    signature = signed_data(chain(order), INTERMEDIATE, 300)
+    assert authenticode_publisher(signature, cache=None) == LEAF_PUBLISHER
+
+def test_signer_info_decides_over_the_end_entity_guess():
+    # The timestamping certificate is also an end entity; only the SignerInfo tells them apart
+    signature = signed_data(chain([3, 0, 1, 2]), ROOT, 4)
+    assert authenticode_publisher(signature, cache=None) == 'O=TIMESTAMPS LTD, C=US'
+
+def test_missing_signer_falls_back_to_the_leaf_of_the_chain():
+    signature = signed_data(chain([0, 2, 1]), INTERMEDIATE, 999)
+    assert signer_certificate(signature, cache=None).subject == LEAF
+
+def test_publisher_name_format():
+    assert format_publisher_name(LEAF) == LEAF_PUBLISHER
+    assert format_publisher_name(name(('C', 'US'), ('CN', 'Jane Developer'))) == 'CN=JANE DEVELOPER, C=US'
+    assert format_publisher_name(name(('O', ' Padded ; Name "x"'))) == 'O="PADDED ; NAME ""X"""'
+    assert format_publisher_name(name(('C', 'DE'), ('O', 'Müller GmbH'), string_tag=BMP_STRING)) == 'O=MÜLLER GMBH, C=DE'
+
+def test_chain_cache_parses_a_shared_certificate_set_once():
+    cache = SignerChainCache(max_entries=1)
+    first = signed_data(chain(), INTERMEDIATE, 300)
+    for _ in range(3):
+        assert authenticode_publisher(first, cache) == LEAF_PUBLISHER
+    assert cache.stats == {'hits': 2, 'misses': 1}
+    other = signed_data(chain([0, 1, 3]), ROOT, 4)
+    authenticode_publisher(other, cache)
+    authenticode_publisher(first, cache)
+    assert cache.stats == {'hits': 2, 'misses': 3}
+
+def test_not_signed_data_is_rejected():
+    with pytest.raises(DERError):
+        authenticode_publisher(certificate(1, ROOT, ROOT), cache=None)
+
+def test_file_metadata_of_an_embedded_signature():
+    metadata = extract_file_metadata(pe_file(signed_data(chain([1, 3, 2, 0]), INTERMEDIATE, 300)))
+    assert metadata['publisher'] == LEAF_PUBLISHER
+    assert extract_file_metadata(pe_file())['publisher'] is None
@@ -0,0 +1,57 @@
+import pandas as pd
+
+from applocker.batch import find_policy_files, main, run_batch, summarize_timings
+from applocker.inspector import FINDING_COLUMNS
+from policies import collection, path_rule, policy
+
+AUDITED = policy(collection('Exe', path_rule('C:\\Users\\*\\AppData\\*'), mode='AuditOnly'))
+NOT_CONFIGURED = policy(collection('Script', mode='NotConfigured'))
+
+def write_exports(root):
+    (root / 'site-b').mkdir()
+    (root / 'a.xml').write_text(AUDITED, encoding='utf-8')
+    (root / 'site-b' / 'b.XML').write_text(NOT_CONFIGURED, encoding='utf-16')
+    (root / 'site-b' / 'broken.xml').write_bytes(b'\xff\xfe<not xml')
+    (root / 'notes.txt').write_text('not a policy')
+
+def test_find_policy_files_walks_the_tree_in_order(tmp_path):
+    write_exports(tmp_path)
+    assert [path[len(str(tmp_path)) + 1:] for path in find_policy_files(str(tmp_path))] == ['a.xml', 'site-b/b.XML', 'site-b/broken.xml']
+
+def test_run_batch_keeps_input_order_and_reports_errors(tmp_path):
+    write_exports(tmp_path)
+    paths = list(find_policy_files(str(tmp_path)))
+    progress = []
+    results = list(run_batch(paths, workers=1, progress=lambda done, _: progress.append(done)))
+    assert [result['File'] for result in results] == paths
+    assert progress == [1, 2, 3]
+    assert [finding['Severity'] for finding in results[0]['Findings']][:1] == ['Medium']
+    assert results[1]['Findings'][0]['Reason'].startswith("Collection 'Script' is NotConfigured")
+    assert results[2]['Error'] and not results[2]['Findings']
+
+def test_cache_dir_serves_unchanged_files(tmp_path):
+    write_exports(tmp_path)
+    paths = list(find_policy_files(str(tmp_path)))
+    cache_dir = str(tmp_path / 'cache')
+    first = list(run_batch(paths, workers=1, cache_dir=cache_dir))
+    second = list(run_batch(paths, workers=1, cache_dir=cache_dir))
+    assert [result['Encoding'] for result in second][:2] == ['cached', 'cached']
+    assert [result['Findings'] for result in second] == [result['Findings'] for result in first]
+
+def test_main_writes_one_combined_findings_file(tmp_path, capsys):
+    write_exports(tmp_path)
+    for extension in ('csv', 'json', 'parquet'):
+        output = tmp_path / f"findings.{extension}"
+        assert main([str(tmp_path), '-o', str(output), '-w', '1', '--timings', str(tmp_path / 'timings.csv')]) == 0
+        findings = getattr(pd, f"read_{extension}")(output)
+        assert list(findings.columns) == ['SourceFile'] + FINDING_COLUMNS
+        assert sorted(set(findings['SourceFile'].str.rsplit('/', n=1).str[-1])) == ['a.xml', 'b.XML']
+    timings = pd.read_csv(tmp_path / 'timings.csv')
+    assert timings['Error'].notna().sum() == 1
+    assert 'Files: 3 (1 failed)' in capsys.readouterr().out
+
+def test_summarize_timings():
+    timings = [{'File': f"{number}.xml", 'Seconds': number / 1000, 'Error': None if number else 'bad'} for number in range(10)]
+    lines = summarize_timings(timings, 2.0)
+    assert lines[:3] == ['Files: 10 (1 failed)', 'Elapsed: 2.00s', 'Throughput: 5.0 files/sec']
+    assert lines[5] == '  9.0ms  9.xml'
@@ -0,0 +1,70 @@
+import os
+
+from applocker.cache import FindingsCache, policy_cache_key, policy_file_cache_key
+
+FINDINGS = [{'Severity': 'High', 'Reason': 'x'}]
+
+def test_keys_follow_content_and_ruleset_version(tmp_path):
+    path = tmp_path / 'policy.xml'
+    path.write_bytes(b'<AppLockerPolicy/>' * 100_000)
+    assert policy_file_cache_key(str(path)) == policy_cache_key(path.read_bytes())
+    assert policy_cache_key(b'a') != policy_cache_key(b'b')
+    assert policy_cache_key(b'a', '1') != policy_cache_key(b'a', '2')
+
+def test_memory_tier_is_a_bounded_lru():
+    cache = FindingsCache(max_entries=2)
+    for key in 'abc':
+        cache.put(key, [key])
+        cache.get('a')
+    assert cache.get('b') is None
+    assert cache.get('a') == ['a'] and cache.get('c') == ['c']
+    assert cache.stats['misses'] == 1
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    FindingsCache(disk_dir=str(tmp_path)).put('k', FINDINGS)
+    cache = FindingsCache(disk_dir=str(tmp_path))
+    assert cache.get('k') == FINDINGS
+    assert cache.get('k') == FINDINGS
+    assert (cache.stats['disk_hits'], cache.stats['memory_hits']) == (1, 1)
+    assert cache.hit_ratio() == 1.0
+
+def test_disk_only_cache_keeps_nothing_in_memory(tmp_path):
+    cache = FindingsCache(max_entries=0, disk_dir=str(tmp_path))
+    cache.put('k', FINDINGS)
+    cache.get('k')
+    cache.get('k')
+    assert cache.stats['disk_hits'] == 2
+
+def test_get_or_compute_computes_once():
+    cache = FindingsCache()
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_compute('k', lambda: calls.append(1) or FINDINGS) == FINDINGS
+    assert len(calls) == 1
+
+def test_overwriting_a_key_replaces_its_size(tmp_path):
+    cache = FindingsCache(max_entries=0, disk_dir=str(tmp_path))
+    for _ in range(5):
+        cache.put('k', FINDINGS)
+    assert cache._disk_bytes == os.path.getsize(tmp_path / 'k.json')
+
+def test_disk_tier_evicts_least_recently_used_entries(tmp_path):
+    entry = [{'Reason': 'x' * 1000}]
+    cache = FindingsCache(max_entries=0, disk_dir=str(tmp_path), max_disk_bytes=2500)
+    for number, key in enumerate('abc'):
+        cache.put(key, entry)
+        os.utime(tmp_path / f"{key}.json", (number, number))
+    assert cache.stats['evictions'] == 1
+    assert sorted(os.listdir(tmp_path)) == ['b.json', 'c.json']
+
+def test_encode_and_decode_wrap_the_disk_format(tmp_path):
+    cache = FindingsCache(max_entries=0, disk_dir=str(tmp_path), encode=lambda findings: {'rows': findings}, decode=lambda stored: stored['rows'])
+    cache.put('k', FINDINGS)
+    assert cache.get('k') == FINDINGS
+
+def test_clear_empties_both_tiers(tmp_path):
+    cache = FindingsCache(disk_dir=str(tmp_path))
+    cache.put('k', FINDINGS)
+    cache.clear()
+    assert cache.get('k') is None
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,69 @@
+import xml.etree.ElementTree as ET
+
+from applocker.compact import RecordMetadata, compact_policy
+from applocker.evaluate import compile_policy, make_query
+from policies import collection, hash_rule, path_rule, policy
+
+PUBLISHER = 'O=CONTOSO, L=REDMOND, S=WASHINGTON, C=US'
+EXTENSIONS = '<RuleCollectionExtensions><ThresholdExtensions><Services EnforcementMode="Enabled"/></ThresholdExtensions></RuleCollectionExtensions>'
+
+def digest(number):
+    return f"{number:064x}"
+
+def record(number, version='1.0.0.0', product_name='Tool', publisher=PUBLISHER):
+    return {'hash': digest(number), 'authenticode_hash': digest(number + 1000), 'length': 1000 + number,
+            'publisher': publisher, 'version': version, 'internal_name': 'tool.exe', 'product_name': product_name}
+
+def hash_rules(records, action='Allow'):
+    return [hash_rule((entry['authenticode_hash'], f"tool{number}.exe", entry['length']), action=action) for number, entry in enumerate(records)]
+
+def rule_tags(xml):
+    return [child.tag for child in ET.fromstring(xml).find('RuleCollection')]
+
+def test_hash_rules_are_merged_without_changing_decisions():
+    xml = policy(collection('Exe', *hash_rules([record(number) for number in range(5)]), path_rule('C:\\Tools\\*')))
+    compacted, report = compact_policy(xml, max_hashes_per_rule=2)
+    assert (report['rules_before'], report['rules_after'], report['merged_hash_rules']) == (6, 4, 3)
+    before, after = compile_policy(xml), compile_policy(compacted)
+    for number in range(7):
+        query = make_query(path='C:\\x\\tool.exe', file_hash=digest(number + 1000))
+        assert before.evaluate(query)[0] == after.evaluate(query)[0]
+
+def test_extensions_stay_after_the_rules():
+    xml = policy(collection('Exe', path_rule('C:\\Tools\\*'), *hash_rules([record(1), record(2)]), extra=EXTENSIONS))
+    compacted, _ = compact_policy(xml)
+    assert rule_tags(compacted) == ['FilePathRule', 'FileHashRule', 'RuleCollectionExtensions']
+    assert ET.fromstring(compacted).find('.//Services').get('EnforcementMode') == 'Enabled'
+
+def test_publisher_collapse_is_opt_in():
+    records = [record(1, '1.0.0.0'), record(2, '1.2.0.0'), record(3, '1.1.0.0')]
+    xml = policy(collection('Exe', *hash_rules(records)))
+    compacted, report = compact_policy(xml, RecordMetadata(records))
+    assert report['publisher_rules'] == 0
+    assert rule_tags(compacted) == ['FileHashRule']
+
+    compacted, report = compact_policy(xml, RecordMetadata(records), collapse_publishers=True)
+    assert (report['publisher_rules'], report['hashes_collapsed']) == (1, 3)
+    condition = ET.fromstring(compacted).find('.//FilePublisherCondition')
+    assert (condition.get('PublisherName'), condition.get('ProductName'), condition.get('BinaryName')) == (PUBLISHER, 'Tool', 'tool.exe')
+    versions = condition.find('BinaryVersionRange')
+    assert (versions.get('LowSection'), versions.get('HighSection')) == ('1.0.0.0', '1.2.0.0')
+
+def test_files_without_a_product_name_stay_hash_rules():
+    records = [record(1, product_name=''), record(2, product_name='')]
+    xml = policy(collection('Exe', *hash_rules(records)))
+    _, report = compact_policy(xml, RecordMetadata(records), collapse_publishers=True)
+    assert report['publisher_rules'] == 0
+
+def test_deny_hash_rules_are_never_collapsed():
+    records = [record(1), record(2)]
+    xml = policy(collection('Exe', *hash_rules(records, action='Deny')))
+    compacted, report = compact_policy(xml, RecordMetadata(records), collapse_publishers=True)
+    assert report['publisher_rules'] == 0
+    assert rule_tags(compacted) == ['FileHashRule']
+
+def test_min_files_is_honoured():
+    records = [record(1), record(2)]
+    xml = policy(collection('Exe', *hash_rules(records)))
+    _, report = compact_policy(xml, RecordMetadata(records), min_files=3, collapse_publishers=True)
+    assert report['publisher_rules'] == 0
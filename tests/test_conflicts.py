@@ -0,0 +1,44 @@
+from applocker.conflicts import find_rule_conflicts
+from policies import ADMINISTRATORS, collection, hash_rule, path_rule, policy, publisher_rule
+
+PUBLISHER = 'O=CONTOSO, L=REDMOND, S=WASHINGTON, C=US'
+
+def conflicts(*rules):
+    return find_rule_conflicts([(policy(collection('Exe', *rules)), 'policy')])
+
+def test_disjoint_version_ranges_do_not_conflict():
+    assert conflicts(
+        publisher_rule(PUBLISHER, 'TOOL', 'TOOL.EXE', '1.0.0.0', '2.0.0.0', action='Allow'),
+        publisher_rule(PUBLISHER, 'TOOL', 'TOOL.EXE', '3.0.0.0', '4.0.0.0', action='Deny'),
+    ) == []
+
+def test_overlapping_version_ranges_conflict():
+    findings = conflicts(
+        publisher_rule(PUBLISHER, 'TOOL', 'TOOL.EXE', '1.0.0.0', '2.0.0.0', action='Allow'),
+        publisher_rule(PUBLISHER, 'TOOL', 'TOOL.EXE', '2.0.0.0', '*', action='Deny'),
+        publisher_rule(PUBLISHER, 'TOOL', 'TOOL.EXE', '0.1.0.0', '0.2.0.0', action='Deny'),
+    )
+    assert len(findings) == 1
+    finding = findings[0]
+    assert finding['Kind'] == 'Contradiction'
+    # Only the Deny whose range overlaps the Allow is counted
+    assert finding['DenyRules'] == 1
+    assert '2.0.0.0-*' in finding['Condition']
+    assert 'same files' not in finding['Detail']
+
+def test_everyone_deny_shadows_allow_for_another_principal():
+    findings = conflicts(
+        hash_rule(('ab' * 32, 'a.exe', 10), action='Allow', sid=ADMINISTRATORS),
+        hash_rule(('AB' * 32, 'a.exe', 10), action='Deny'),
+    )
+    assert [(f['Kind'], f['Principal']) for f in findings] == [('Shadowed', ADMINISTRATORS)]
+
+def test_deny_with_exceptions_is_not_a_conflict():
+    assert conflicts(
+        path_rule('C:\\Tools', action='Allow'),
+        path_rule('C:\\Tools\\', action='Deny', exceptions='<FilePathCondition Path="C:\\Tools\\ok.exe"/>'),
+    ) == []
+
+def test_paths_are_compared_normalized():
+    findings = conflicts(path_rule('C:\\Tools\\\\', action='Allow'), path_rule('c:\\tools', action='Deny'))
+    assert [f['Kind'] for f in findings] == ['Contradiction']
@@ -0,0 +1,62 @@
+from applocker.diff import diff_policies, summarize_changes
+from policies import ADMINISTRATORS, collection, path_rule, policy
+
+KEPT = '00000000-0000-0000-0000-00000000000a'
+CHANGED = '00000000-0000-0000-0000-00000000000b'
+DROPPED = '00000000-0000-0000-0000-00000000000c'
+REGUIDED_OLD = '00000000-0000-0000-0000-00000000000d'
+REGUIDED_NEW = '00000000-0000-0000-0000-00000000000e'
+ADDED = '00000000-0000-0000-0000-00000000000f'
+
+OLD = policy(collection(
+    'Exe',
+    path_rule('%WINDIR%\\*', rule_id=KEPT, name='windows'),
+    path_rule('C:\\Tools\\*', rule_id=CHANGED, name='tools'),
+    path_rule('C:\\Old\\*', rule_id=DROPPED, name='old'),
+    path_rule('%PROGRAMFILES%\\*', rule_id=REGUIDED_OLD, name='program files'),
+    mode='AuditOnly',
+))
+NEW = policy(collection(
+    'Exe',
+    path_rule('%WINDIR%\\*', rule_id='{' + KEPT.upper() + '}', name='windows'),
+    path_rule('C:\\Tools\\*', sid=ADMINISTRATORS, rule_id=CHANGED, name='tools'),
+    path_rule('%PROGRAMFILES%\\*', rule_id=REGUIDED_NEW, name='programs'),
+    path_rule('C:\\New\\*', rule_id=ADDED, name='new'),
+    mode='Enabled',
+), collection('Script', mode='AuditOnly'))
+
+def changes_by_kind():
+    changes = {}
+    for change in diff_policies(OLD, NEW):
+        changes.setdefault(change['Change'], []).append(change)
+    return changes
+
+def test_identical_policies_have_no_changes():
+    assert diff_policies(OLD, OLD.encode()) == []
+
+def test_collection_changes():
+    changes = changes_by_kind()
+    assert [(c['Collection'], c['Detail']) for c in changes['EnforcementMode']] == [('Exe', 'AuditOnly -> Enabled')]
+    assert [(c['Collection'], c['Detail']) for c in changes['CollectionAdded']] == [('Script', 'EnforcementMode AuditOnly')]
+    removed = [c['Collection'] for c in diff_policies(NEW, OLD) if c['Change'] == 'CollectionRemoved']
+    assert removed == ['Script']
+
+def test_rule_changes_are_matched_by_id_then_content():
+    changes = changes_by_kind()
+    assert [c['RuleId'] for c in changes['Added']] == [ADDED]
+    assert [c['RuleId'] for c in changes['Removed']] == [DROPPED]
+    modified, = changes['Modified']
+    assert modified['RuleId'] == CHANGED
+    assert modified['Detail'] == f"UserOrGroupSid: 'S-1-1-0' -> '{ADMINISTRATORS}'"
+    reguided, = changes['ReGUIDed']
+    assert (reguided['RuleId'], reguided['OldRuleId']) == (REGUIDED_NEW, REGUIDED_OLD)
+    assert reguided['Detail'].endswith("Name: 'program files' -> 'programs'")
+
+def test_condition_changes_are_reported_without_their_content():
+    new = OLD.replace('C:\\Tools\\*', 'D:\\Tools\\*')
+    modified, = diff_policies(OLD, new)
+    assert (modified['Change'], modified['Detail']) == ('Modified', 'Conditions/Exceptions changed')
+
+def test_summary_counts_every_kind():
+    counts = summarize_changes(diff_policies(OLD, NEW))
+    assert counts == {'CollectionAdded': 1, 'CollectionRemoved': 0, 'EnforcementMode': 1, 'Added': 1, 'Removed': 1, 'Modified': 1, 'ReGUIDed': 1}
@@ -0,0 +1,60 @@
+from applocker.evaluate import compile_policy, make_query
+from applocker.rules import parse_fqbn, parse_version
+from policies import ADMINISTRATORS, collection, hash_rule, path_rule, policy, publisher_rule
+
+PUBLISHER = 'O=CONTOSO, L=REDMOND, S=WASHINGTON, C=US'
+DIGEST = 'ab' * 32
+
+def decide(policy_xml, **query):
+    decision, rule = compile_policy(policy_xml).evaluate(make_query(**query))
+    return decision, rule.name if rule is not None else None
+
+def test_collection_without_rules_allows_by_default():
+    assert decide(policy(collection('Dll')), path='C:\\Tools\\a.dll') == ('AllowedByDefault', None)
+
+def test_unmatched_file_is_denied_by_default():
+    xml = policy(collection('Exe', path_rule('%WINDIR%\\*', name='windows')))
+    assert decide(xml, path='C:\\Tools\\a.exe') == ('DeniedByDefault', None)
+
+def test_path_variables_are_expanded_on_both_sides():
+    xml = policy(collection('Exe', path_rule('%PROGRAMFILES%\\*', name='program files')))
+    assert decide(xml, path='C:\\Program Files (x86)\\App\\app.exe') == ('Allowed', 'program files')
+    assert decide(xml, path='%OSDRIVE%\\Program Files\\App\\app.exe') == ('Allowed', 'program files')
+
+def test_deny_wins_over_allow():
+    xml = policy(collection('Exe', path_rule('C:\\Tools\\*', name='tools'), path_rule('C:\\Tools\\bad.exe', action='Deny', name='bad')))
+    assert decide(xml, path='C:\\Tools\\bad.exe') == ('Denied', 'bad')
+    assert decide(xml, path='C:\\Tools\\good.exe') == ('Allowed', 'tools')
+
+def test_exceptions_exempt_files_from_a_rule():
+    xml = policy(collection('Exe', path_rule('C:\\Tools\\*', name='tools', exceptions='<FilePathCondition Path="C:\\Tools\\bad.exe"/>')))
+    assert decide(xml, path='C:\\Tools\\bad.exe') == ('DeniedByDefault', None)
+
+def test_rules_only_apply_to_their_principal():
+    xml = policy(collection('Exe', path_rule('C:\\Admin\\*', sid=ADMINISTRATORS, name='admins')))
+    assert decide(xml, path='C:\\Admin\\a.exe') == ('DeniedByDefault', None)
+    assert decide(xml, path='C:\\Admin\\a.exe', sids=[ADMINISTRATORS]) == ('Allowed', 'admins')
+
+def test_hash_rules_match_with_or_without_prefix():
+    xml = policy(collection('Exe', hash_rule((DIGEST, 'a.exe', 10), name='hash')))
+    assert decide(xml, path='C:\\x\\a.exe', file_hash=DIGEST) == ('Allowed', 'hash')
+    assert decide(xml, path='C:\\x\\a.exe', file_hash='0x' + DIGEST.upper()) == ('Allowed', 'hash')
+
+def test_publisher_rules_honour_version_ranges_and_wildcards():
+    xml = policy(collection('Exe', publisher_rule(PUBLISHER, 'TOOL', 'TOOL.EXE', '1.0.0.0', '2.0.0.0', name='tool')))
+    query = dict(path='C:\\x\\tool.exe', publisher=PUBLISHER, product='Tool')
+    assert decide(xml, version='1.5.0.0', **query) == ('Allowed', 'tool')
+    assert decide(xml, version='2.0.0.1', **query) == ('DeniedByDefault', None)
+    any_binary = policy(collection('Exe', publisher_rule(PUBLISHER, name='any')))
+    assert decide(any_binary, version='9.0', **query) == ('Allowed', 'any')
+
+def test_event_fqbn_fills_the_publisher_fields():
+    xml = policy(collection('Exe', publisher_rule(PUBLISHER, 'TOOL', 'TOOL.EXE', '1.0.0.0', '*', name='tool')))
+    fqbn = f"{PUBLISHER}\\TOOL\\TOOL.EXE\\1.2.0.0"
+    assert decide(xml, path='C:\\x\\renamed.exe', publisher=fqbn) == ('Allowed', 'tool')
+
+def test_parse_fqbn_and_parse_version():
+    assert parse_fqbn('-') is None
+    assert parse_fqbn('O=X\\PRODUCT\\WITH\\SLASH\\A.EXE\\1.0') == ('O=X', 'PRODUCT\\WITH\\SLASH', 'A.EXE', '1.0')
+    assert parse_version('10.0.1') == (10, 0, 1, 0)
+    assert parse_version('*', default=None) is None
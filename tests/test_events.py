@@ -0,0 +1,86 @@
+import csv
+import io
+
+import pytest
+
+from applocker.events import (NULL_RULE_ID, EventKey, aggregate_event_logs, main, normalize_file_hash, normalize_rule_id,
+                              parse_rendered_event, policy_rule_coverage, would_block_rows)
+from evtxlog import write_evtx
+from policies import collection, path_rule, policy
+
+ALLOW_RULE = '921cc481-6e17-4653-8f75-050b80acca20'
+EDITOR_HASH = 'AB' * 32
+
+def event(event_id, path, rule_id=ALLOW_RULE, rule_name='(Default Rule) All files', user='S-1-5-21-1001', file_hash=EDITOR_HASH, fqbn='-'):
+    return {
+        'EventID': str(event_id), 'Channel': 'Microsoft-Windows-AppLocker/EXE and DLL', 'Computer': 'host1', 'UserID': user,
+        'PolicyName': 'EXE', 'RuleId': '{' + rule_id + '}', 'RuleName': rule_name, 'RuleSddl': '-', 'TargetUser': user,
+        'FilePath': path, 'FileHash': file_hash, 'Fqbn': fqbn, 'FullFilePath': path.replace('%OSDRIVE%', 'C:'),
+    }
+
+ALLOWED = event(8002, '%PROGRAMFILES%\\EDITOR\\EDITOR.EXE', fqbn='O=VENDOR1 INC, C=US\\PRODUCT1\\EDITOR.EXE\\1.1.0.0')
+WOULD_BLOCK = event(8003, '%OSDRIVE%\\USERS\\A\\TOOL.EXE', rule_id=NULL_RULE_ID, rule_name='-', file_hash='CD' * 32)
+NOT_APPLOCKER = dict(event(8000, '%SYSTEM32%\\SVCHOST.EXE'), PolicyName='')
+
+def test_normalize_rule_id_and_file_hash():
+    assert normalize_rule_id(' {921CC481-6E17-4653-8F75-050B80ACCA20} ') == ALLOW_RULE
+    assert normalize_file_hash('0xabcd') == 'ABCD'
+    assert normalize_file_hash('q80=') == 'ABCD'
+    assert normalize_file_hash('not base64!') == 'not base64!'
+
+def test_parse_rendered_event():
+    xml_text = ('<Event><System><EventID Qualifiers="">8003</EventID><Security UserID="S-1-5-18"/></System>'
+                '<UserData><RuleAndFileData><PolicyName>EXE</PolicyName><RuleId>{00000000-0000-0000-0000-000000000000}</RuleId>'
+                '<RuleName>-</RuleName><TargetUser>S-1-5-21-7</TargetUser><FilePath>%OSDRIVE%\\A &amp; B\\T.EXE</FilePath>'
+                '<FileHash>0xcdcd</FileHash><Fqbn>-</Fqbn></RuleAndFileData></UserData></Event>')
+    assert parse_rendered_event(xml_text) == EventKey(8003, 'Exe', NULL_RULE_ID, '-', '%OSDRIVE%\\A & B\\T.EXE', 'CDCD', '-', 'S-1-5-21-7')
+    assert parse_rendered_event('<Event><System><EventID>8000</EventID></System></Event>') is None
+
+def test_aggregate_event_logs_across_chunks(tmp_path):
+    # 600 records do not fit in one 64 KiB chunk, so the log spans several
+    write_evtx(tmp_path / 'a.evtx', [ALLOWED] * 400 + [NOT_APPLOCKER] + [WOULD_BLOCK] * 199)
+    write_evtx(tmp_path / 'b.evtx', [dict(WOULD_BLOCK, TargetUser='S-1-5-21-1002')])
+    counts, stats = aggregate_event_logs([str(tmp_path / 'a.evtx'), str(tmp_path / 'b.evtx')], workers=1)
+    assert stats['files'] == 2 and stats['chunks'] > 2
+    assert stats['records'] == 601 and stats['events'] == 600 and stats['errors'] == []
+    allowed = EventKey(8002, 'Exe', ALLOW_RULE, '(Default Rule) All files', ALLOWED['FilePath'], EDITOR_HASH, ALLOWED['Fqbn'], 'S-1-5-21-1001')
+    would_block = EventKey(8003, 'Exe', NULL_RULE_ID, '-', WOULD_BLOCK['FilePath'], 'CD' * 32, '-', 'S-1-5-21-1001')
+    assert counts == {allowed: 400, would_block: 199, would_block._replace(user='S-1-5-21-1002'): 1}
+
+def test_would_block_rows():
+    tool = EventKey(8003, 'Exe', NULL_RULE_ID, '-', '%OSDRIVE%\\T.EXE', 'CD', '-', 'S-1-5-21-1')
+    script = EventKey(8006, 'Script', 'aaaa', 'Scripts in Temp', '%TEMP%\\S.PS1', 'EF', '-', 'S-1-5-21-1')
+    counts = {tool: 5, tool._replace(user='S-1-5-21-2'): 2, script: 1, tool._replace(event_id=8002): 50}
+    assert would_block_rows(counts) == [
+        {'Collection': 'Exe', 'FilePath': '%OSDRIVE%\\T.EXE', 'FileHash': 'CD', 'Publisher': '-', 'Rule': '(no allow rule matched)', 'Events': 7, 'Users': 2},
+        {'Collection': 'Script', 'FilePath': '%TEMP%\\S.PS1', 'FileHash': 'EF', 'Publisher': '-', 'Rule': 'Scripts in Temp', 'Events': 1, 'Users': 1},
+    ]
+
+POLICY = policy(collection('Exe', path_rule('%PROGRAMFILES%\\*', rule_id=ALLOW_RULE.upper()), path_rule('%WINDIR%\\*', rule_id='11111111-1111-1111-1111-111111111111')))
+
+def test_policy_rule_coverage():
+    key = EventKey(8002, 'Exe', ALLOW_RULE, 'r', 'p', 'h', '-', 'u')
+    counts = {key: 3, key._replace(event_id=8003): 2, key._replace(rule_id=NULL_RULE_ID, event_id=8004): 4}
+    rows = policy_rule_coverage(io.BytesIO(POLICY.encode()), counts)
+    assert [(row['RuleId'], row['Events'], row['Allowed'], row['WouldBlock'], row['Blocked'], row['Status']) for row in rows] == [
+        (ALLOW_RULE.upper(), 5, 3, 2, 0, 'Fires'),
+        ('11111111-1111-1111-1111-111111111111', 0, 0, 0, 0, 'Never fires'),
+    ]
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+def test_main_writes_reports(tmp_path):
+    write_evtx(tmp_path / 'exe.evtx', [ALLOWED, ALLOWED, WOULD_BLOCK])
+    (tmp_path / 'policy.xml').write_text(POLICY)
+    assert main([str(tmp_path / '*.evtx'), '-o', str(tmp_path / 'counts.csv'), '-w', '1', '--policy', str(tmp_path / 'policy.xml'),
+                 '--coverage', str(tmp_path / 'coverage.csv'), '--would-block', str(tmp_path / 'would_block.csv')]) == 0
+    assert [(row['EventID'], row['Outcome'], row['Count']) for row in read_csv(tmp_path / 'counts.csv')] == [('8002', 'Allowed', '2'), ('8003', 'WouldBlock', '1')]
+    assert [row['Status'] for row in read_csv(tmp_path / 'coverage.csv')] == ['Fires', 'Never fires']
+    assert [(row['FilePath'], row['Rule']) for row in read_csv(tmp_path / 'would_block.csv')] == [(WOULD_BLOCK['FilePath'], '(no allow rule matched)')]
+
+def test_coverage_requires_policy(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / 'missing.evtx'), '-o', str(tmp_path / 'counts.csv'), '--coverage', str(tmp_path / 'coverage.csv')])
+    assert '--coverage requires --policy' in capsys.readouterr().err
@@ -0,0 +1,69 @@
+import io
+import xml.etree.ElementTree as ET
+
+from applocker.evaluate import compile_policy, make_query
+from applocker.exe_policy import MAX_DESCRIPTION_FILES, generate_policy_xml, write_policy_xml
+
+def record(number, publisher=None, authenticode_hash=None):
+    return {'filename': f'tool{number}.exe', 'hash': f'{number:064x}', 'authenticode_hash': authenticode_hash, 'length': 100 + number,
+            'publisher': publisher, 'version': '1.0.0.0' if publisher else None, 'internal_name': None}
+
+def hash_rules(text):
+    return ET.fromstring(text).findall('RuleCollection/FileHashRule')
+
+def digests(rule):
+    return [file_hash.get('Data') for file_hash in rule.iter('FileHash')]
+
+def test_hashes_are_batched_up_to_the_limit():
+    rules = hash_rules(generate_policy_xml([record(number) for number in range(1, 8)], 'Audit', True, False, max_hashes_per_rule=3))
+    assert [len(digests(rule)) for rule in rules] == [3, 3, 1]
+    assert digests(rules[0]) == [f'0x{number:064X}' for number in (1, 2, 3)]
+    assert [rule.get('Name') for rule in rules] == ['Hash Rule for 3 files', 'Hash Rule for 3 files', 'Hash Rule for tool7.exe']
+    assert rules[0].get('Description') == 'Files covered by this rule: tool1.exe, tool2.exe, tool3.exe'
+    assert rules[2].get('Description') == ''
+    assert len({rule.get('Id') for rule in rules}) == 3
+    assert all(len(rule.findall('Conditions/FileHashCondition')) == 1 for rule in rules)
+    file_hash = rules[0].find('Conditions/FileHashCondition/FileHash')
+    assert file_hash.attrib == {'Type': 'SHA256', 'Data': f'0x{1:064X}', 'SourceFileName': 'tool1.exe', 'SourceFileLength': '101'}
+
+def test_repeated_hashes_are_written_once():
+    records = [record(1), record(2), dict(record(1), filename='copy.exe'), record(2)]
+    rules = hash_rules(generate_policy_xml(records, 'Audit', True, False, max_hashes_per_rule=10))
+    assert [digests(rule) for rule in rules] == [[f'0x{1:064X}', f'0x{2:064X}']]
+
+def test_one_rule_per_file_by_default():
+    rules = hash_rules(generate_policy_xml([record(1), record(2), record(1)], 'Audit', True, False))
+    assert [(rule.get('Name'), len(digests(rule))) for rule in rules] == [('Hash Rule for tool1.exe', 1), ('Hash Rule for tool2.exe', 1), ('Hash Rule for tool1.exe', 1)]
+
+def test_long_descriptions_are_truncated():
+    count = MAX_DESCRIPTION_FILES + 5
+    rules = hash_rules(generate_policy_xml([record(number) for number in range(1, count + 1)], 'Audit', True, False, max_hashes_per_rule=100))
+    assert rules[0].get('Name') == f'Hash Rule for {count} files'
+    assert rules[0].get('Description').endswith(' and 5 more')
+
+def test_authenticode_hash_is_preferred():
+    rules = hash_rules(generate_policy_xml([record(1, authenticode_hash='ab' * 32), record(2)], 'Block', True, False, max_hashes_per_rule=5))
+    assert digests(rules[0]) == ['0x' + 'AB' * 32, f'0x{2:064X}']
+    assert rules[0].get('Action') == 'Deny'
+
+def test_batched_policy_matches_the_same_files():
+    records = [record(number) for number in range(1, 6)]
+    for max_hashes_per_rule in (1, 2, 5):
+        compiled = compile_policy(generate_policy_xml(records, 'Audit', True, False, max_hashes_per_rule))
+        assert [compiled.evaluate(make_query(f'C:\\{r["filename"]}', file_hash=r['hash']))[0] for r in records] == ['Allowed'] * 5
+        assert compiled.evaluate(make_query('C:\\other.exe', file_hash=f'{99:064x}'))[0] == 'DeniedByDefault'
+
+def test_records_are_consumed_as_they_stream():
+    seen = []
+
+    def records():
+        for number in range(1, 5):
+            seen.append(number)
+            yield record(number, publisher='O=CONTOSO, C=US')
+
+    out = io.StringIO()
+    write_policy_xml(records(), out, 'Audit', True, True, max_hashes_per_rule=2)
+    root = ET.fromstring(out.getvalue())
+    assert seen == [1, 2, 3, 4]
+    assert [rule.tag for rule in root.find('RuleCollection')] == ['FileHashRule', 'FileHashRule'] + ['FilePublisherRule'] * 4
+    assert root.find('RuleCollection').get('EnforcementMode') == 'AuditOnly'
@@ -0,0 +1,80 @@
+import os
+import sqlite3
+
+from applocker.filecache import METADATA_VERSION, FileMetadataCache
+from applocker.pe import analyze_file, analyze_files
+from pkcs7 import pe_file
+
+METADATA = {'publisher': 'O=CONTOSO, C=US', 'version': '1.0.0.0', 'internal_name': 'tool.exe', 'authenticode_hash': 'ab' * 32, 'product_name': 'Tool'}
+
+def test_entries_survive_reopening(tmp_path):
+    db_path = str(tmp_path / 'cache' / 'file_metadata.sqlite')
+    cache = FileMetadataCache(db_path)
+    cache.store('cd' * 32, 10, METADATA, path='C:\\tool.exe', mtime_ns=5)
+    cache.close()
+    cache = FileMetadataCache(db_path)
+    assert cache.lookup('cd' * 32, 10) == METADATA
+    assert cache.lookup('cd' * 32, 11) is None
+    assert cache.lookup_path('C:\\tool.exe', 10, 5) == ('cd' * 32, METADATA)
+    assert cache.lookup_path('C:\\tool.exe', 10, 6) is None
+    assert cache.stats == {'path_hits': 1, 'hash_hits': 1, 'misses': 1}
+    cache.close()
+
+def test_file_hash_lookup_matches_either_hash(tmp_path):
+    cache = FileMetadataCache(str(tmp_path / 'cache.sqlite'))
+    cache.store('cd' * 32, 10, METADATA)
+    assert cache.lookup_file_hash('ab' * 32, 10) == METADATA
+    assert cache.lookup_file_hash('cd' * 32, 10) == METADATA
+    assert cache.lookup_file_hash('ab' * 32, 11) is None
+    cache.close()
+
+def test_older_metadata_versions_are_dropped(tmp_path):
+    db_path = str(tmp_path / 'cache.sqlite')
+    conn = sqlite3.connect(db_path)
+    # A version 1 cache: no authenticode_hash or product_name columns
+    conn.executescript(
+        "CREATE TABLE file_metadata (sha256 TEXT, size INTEGER, publisher TEXT, version TEXT, internal_name TEXT, last_used REAL, PRIMARY KEY (sha256, size));"
+        "INSERT INTO file_metadata VALUES ('" + 'cd' * 32 + "', 10, 'CN=Old', '1.0', 'tool.exe', 0);"
+        "PRAGMA user_version = 1;"
+    )
+    conn.close()
+    cache = FileMetadataCache(db_path)
+    assert cache.lookup('cd' * 32, 10) is None
+    cache.store('cd' * 32, 10, METADATA)
+    assert cache.lookup('cd' * 32, 10) == METADATA
+    cache.close()
+    assert sqlite3.connect(db_path).execute("PRAGMA user_version").fetchone()[0] == METADATA_VERSION
+
+def test_flush_evicts_least_recently_used_and_orphaned_paths(tmp_path):
+    cache = FileMetadataCache(str(tmp_path / 'cache.sqlite'), max_entries=2)
+    for number in range(3):
+        cache.store(f"{number:064x}", 10, METADATA, path=f"C:\\{number}.exe", mtime_ns=1)
+    cache.lookup(f"{0:064x}", 10)
+    cache.flush()
+    assert [cache.lookup(f"{number:064x}", 10) is not None for number in range(3)] == [True, False, True]
+    assert cache.lookup_path('C:\\1.exe', 10, 1) is None
+    cache.close()
+
+def test_unchanged_files_are_not_read_again(tmp_path):
+    path = tmp_path / 'tool.exe'
+    path.write_bytes(pe_file())
+    cache = FileMetadataCache(str(tmp_path / 'cache.sqlite'))
+    first, _, _ = analyze_files([('tool.exe', str(path))], cache=cache)
+    second, _, stats = analyze_files([('tool.exe', str(path))], cache=cache)
+    assert first == second
+    assert stats['path_hits'] == 1
+    assert first[0]['authenticode_hash']
+
+    os.utime(path, ns=(1, 1))
+    assert analyze_file('tool.exe', str(path), cache) == first[0]
+    assert cache.stats['hash_hits'] == 1
+    cache.close()
+
+def test_entries_without_the_authenticode_hash_are_completed(tmp_path):
+    data = pe_file()
+    cache = FileMetadataCache(str(tmp_path / 'cache.sqlite'))
+    record = analyze_file('tool.exe', data, cache)
+    cache.store(record['hash'], record['length'], dict(METADATA, authenticode_hash=None))
+    assert analyze_file('tool.exe', data, cache)['authenticode_hash'] == record['authenticode_hash']
+    assert cache.lookup(record['hash'], record['length'])['authenticode_hash'] == record['authenticode_hash']
+    cache.close()
@@ -0,0 +1,41 @@
+import glob
+import os
+
+import pytest
+
+from applocker.findings import findings_from_columns, findings_to_columns, inspect_policy_frame, inspect_policy_text_frame
+from applocker.inspector import FINDING_COLUMNS, RuleVerdictMemo, inspect_policy_source
+from policies import collection, hash_rule, path_rule, policy, publisher_rule
+
+DEFAULT_POLICIES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'default', '*.xml')))
+
+def frame_records(frame):
+    return [{column: str(value) for column, value in row.items()} for row in frame[FINDING_COLUMNS].to_dict('records')]
+
+def source_records(findings):
+    return [{column: str(finding[column]) for column in FINDING_COLUMNS} for finding in findings]
+
+@pytest.mark.parametrize('path', DEFAULT_POLICIES, ids=os.path.basename)
+def test_frame_path_matches_rule_by_rule_findings(path):
+    expected = source_records(inspect_policy_source(path, memo=None))
+    assert frame_records(inspect_policy_frame(path)) == expected
+    assert frame_records(inspect_policy_frame(path, batch_size=7)) == expected
+    # The memoized path used by the batch CLI must agree as well
+    memo = RuleVerdictMemo()
+    assert source_records(inspect_policy_source(path, memo=memo)) == expected
+    assert source_records(inspect_policy_source(path, memo=memo)) == expected
+
+def test_default_policies_are_present():
+    assert len(DEFAULT_POLICIES) >= 5
+
+def test_frame_path_matches_on_edge_cases():
+    xml = policy(
+        collection('Exe', path_rule('C:\\'), path_rule('%OSDRIVE%\\Users\\*\\Downloads\\*'), path_rule('C:\\Program Files\\*\\*.exe'),
+                   path_rule('\\\\server\\share\\tool.exe', action='Deny'), publisher_rule('O=CONTOSO'),
+                   publisher_rule('O=CONTOSO', 'TOOL', 'TOOL.EXE', '1.0.0.0', '2.0.0.0'), mode='AuditOnly'),
+        collection('Dll', hash_rule(('ab' * 32, 'a.dll', 10))),
+        collection('Script', mode='NotConfigured'),
+    )
+    frame = inspect_policy_text_frame(xml)
+    assert frame_records(frame) == source_records(inspect_policy_source(xml, memo=None))
+    assert frame_records(findings_from_columns(findings_to_columns(frame))) == frame_records(frame)
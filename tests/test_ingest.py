@@ -0,0 +1,75 @@
+import bz2
+import gzip
+import io
+import lzma
+import tarfile
+import xml.etree.ElementTree as ET
+import zipfile
+
+from applocker.ingest import analyze_stream, archive_kind, iter_pe_sources, main
+from pkcs7 import pe_file
+
+TOOL = pe_file()
+OTHER = pe_file(fill=b'\xcc')
+
+def zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+def tar_bytes(members, mode='w:gz'):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+def test_archive_kind():
+    assert [archive_kind(name) for name in ('a.ZIP', 'a.msix', 'a.tar.gz', 'a.tgz', 'a.exe.gz', 'a.exe.bz2', 'a.xz', 'a.exe')] == \
+        ['zip', 'zip', 'tar', 'tar', 'compressed', 'compressed', 'compressed', None]
+
+def test_only_pe_members_are_yielded(tmp_path):
+    (tmp_path / 'drop.zip').write_bytes(zip_bytes({'bin/tool.exe': TOOL, 'readme.txt': b'hello', 'notes.md': b'# notes', 'bin/': b''}))
+    sources = list(iter_pe_sources([str(tmp_path / 'drop.zip')]))
+    assert [(name.rsplit('!', 1)[-1], data) for name, data in sources] == [('bin/tool.exe', TOOL)]
+
+def test_nested_archives_and_compressed_files(tmp_path):
+    inner = tar_bytes({'inner/other.exe': OTHER, 'inner/script.ps1': b'Write-Output 1'}, mode='w:xz')
+    (tmp_path / 'drop.zip').write_bytes(zip_bytes({'tool.exe': TOOL, 'nested.tar.xz': inner, 'tool.exe.bz2': bz2.compress(TOOL)}))
+    (tmp_path / 'single.exe.gz').write_bytes(gzip.compress(OTHER))
+    (tmp_path / 'text.log.xz').write_bytes(lzma.compress(b'not a PE'))
+    names = [name[len(str(tmp_path)) + 1:] for name, _ in iter_pe_sources([str(tmp_path)])]
+    assert names == [
+        'drop.zip!tool.exe',
+        'drop.zip!nested.tar.xz!inner/other.exe',
+        'drop.zip!tool.exe.bz2!tool.exe',
+        'single.exe.gz!single.exe',
+    ]
+
+def test_directories_yield_pe_paths_in_order_and_skip_bad_archives(tmp_path, capsys):
+    (tmp_path / 'b').mkdir()
+    (tmp_path / 'b' / 'two.dll').write_bytes(OTHER)
+    (tmp_path / 'a.exe').write_bytes(TOOL)
+    (tmp_path / 'c.txt').write_text('hello')
+    (tmp_path / 'broken.zip').write_bytes(b'PK not really')
+    (tmp_path / 'broken.exe.bz2').write_bytes(b'BZh9 not really')
+    sources = list(iter_pe_sources([str(tmp_path)]))
+    assert sources == [(str(tmp_path / 'a.exe'), str(tmp_path / 'a.exe')), (str(tmp_path / 'b' / 'two.dll'), str(tmp_path / 'b' / 'two.dll'))]
+    assert capsys.readouterr().err.count('Skipping archive') == 2
+
+def test_analyze_stream_works_in_batches():
+    stats = {}
+    records = analyze_stream(((f"{number}.exe", TOOL) for number in range(7)), workers=2, batch_size=3, stats=stats)
+    assert [record['filename'] for record in records] == [f"{number}.exe" for number in range(7)]
+    assert (stats['files'], stats['bytes'], stats['errors']) == (7, 7 * len(TOOL), [])
+
+def test_main_writes_rules_named_after_the_member(tmp_path):
+    (tmp_path / 'drop.zip').write_bytes(zip_bytes({'bin\\tool.exe': TOOL, 'other.exe': OTHER}))
+    output = tmp_path / 'policy.xml'
+    assert main([str(tmp_path / 'drop.zip'), '-o', str(output), '--rules', 'Hash', '-w', '1']) == 0
+    names = [entry.get('SourceFileName') for entry in ET.parse(output).iter('FileHash')]
+    assert names == ['tool.exe', 'other.exe']
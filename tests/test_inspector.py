@@ -0,0 +1,28 @@
+import re
+
+import pytest
+
+from applocker.inspector import classify_path
+
+# The per-pattern checks the classifier replaced
+LEGACY_USER_WRITABLE = [r'\\users\\.*\\appdata\\', r'\\users\\.*\\temp\\', r'\\users\\.*\\downloads\\', r'\\users\\.*\\documents\\',
+                        r'\\temp\\', r'\\windows\\temp\\', r'^[a-z]:\\$', r'^[a-z]:\\\\$', r'\\\\.*\\.*\\.*']
+LEGACY_PROTECTED = [r'\\program files\\', r'\\program files \(x86\)\\', r'\\windows\\(?!temp)', r'\\windows\\system32\\', r'\\windows\\syswow64\\']
+LEGACY_DANGEROUS_WILDCARDS = [r'\*\.exe$', r'\*\.dll$', r'\*\.ps1$', r'\*\.bat$', r'\*\.cmd$', r'\\\*\\']
+
+def legacy_traits(path):
+    return (
+        any(re.search(pattern, path.lower()) for pattern in LEGACY_USER_WRITABLE),
+        any(re.search(pattern, path.lower()) for pattern in LEGACY_PROTECTED),
+        any(re.search(pattern, path.lower()) for pattern in LEGACY_DANGEROUS_WILDCARDS),
+        re.match(r'^[a-z]:\\?$', path.lower()) is not None,
+    )
+
+@pytest.mark.parametrize('path', [
+    'C:\\', 'c:\\\\', 'D:', '%OSDRIVE%\\*',
+    'C:\\Users\\*\\AppData\\Local\\Temp\\*', '%WINDIR%\\Temp\\*', 'C:\\Windows\\System32\\*',
+    '%PROGRAMFILES%\\*', 'C:\\Program Files (x86)\\App\\*.exe', 'C:\\Tools\\*\\run.ps1',
+    '\\\\server\\share\\*', 'C:\\Users\\x\nAppData\\Documents\\a', '\\\\server\n\\share\\x', 'C:\\Tools\\*.exe\n',
+])
+def test_classifier_matches_the_per_pattern_checks(path):
+    assert tuple(classify_path(path)) == legacy_traits(path)
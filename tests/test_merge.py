@@ -0,0 +1,43 @@
+import xml.etree.ElementTree as ET
+
+from applocker.merge import merge_policies
+from policies import collection, hash_rule, path_rule, policy
+
+def rule_ids(root):
+    return [rule.get('Id') for rule in root.iter() if rule.tag.endswith('Rule')]
+
+def test_identical_rule_under_new_id_is_merged_once():
+    first = policy(collection('Exe', path_rule('%PROGRAMFILES%\\*', rule_id='a')))
+    second = policy(collection('Exe', path_rule('%programfiles%\\*', rule_id='b')))
+    root, report = merge_policies([first, second])
+    assert rule_ids(root) == ['a']
+    assert report['duplicate_content'] == 1
+    assert report['merged'] == 1
+
+def test_same_id_with_other_content_keeps_first_and_reports_conflict():
+    first = policy(collection('Exe', path_rule('C:\\Tools\\*', rule_id='a')))
+    second = policy(collection('Exe', path_rule('C:\\Other\\*', rule_id='a')))
+    root, report = merge_policies([(first, 'one'), (second, 'two')])
+    assert [condition.get('Path') for condition in root.iter('FilePathCondition')] == ['C:\\Tools\\*']
+    assert report['id_conflicts'] == 1
+    assert report['conflicts'][0]['Input'] == 'two'
+
+def test_collections_are_merged_by_type_and_mode_disagreement_is_reported():
+    first = policy(collection('Exe', path_rule('C:\\A\\*'), mode='AuditOnly'))
+    second = policy(
+        collection('Exe', path_rule('C:\\B\\*'), mode='Enabled'),
+        collection('Dll', hash_rule(('ab' * 32, 'a.dll', 10))),
+    )
+    root, report = merge_policies([first, second])
+    collections = {c.get('Type'): c for c in root.iter('RuleCollection')}
+    assert set(collections) == {'Exe', 'Dll'}
+    assert collections['Exe'].get('EnforcementMode') == 'AuditOnly'
+    assert len(collections['Exe']) == 2
+    assert [c['Kind'] for c in report['conflicts']] == ['EnforcementMode']
+    ET.fromstring(ET.tostring(root))
+
+def test_allow_deny_contradiction_between_inputs_is_reported():
+    allow = policy(collection('Exe', path_rule('C:\\Tools\\x.exe', action='Allow')))
+    deny = policy(collection('Exe', path_rule('C:\\Tools\\x.exe', action='Deny')))
+    _, report = merge_policies([allow, deny])
+    assert [c['Kind'] for c in report['rule_conflicts']] == ['Contradiction']
@@ -0,0 +1,75 @@
+import hashlib
+import io
+
+import pytest
+
+from applocker.pe import (PEFormatError, analyze_files, calculate_hash_and_length, extract_file_metadata, extract_publisher_and_version_info,
+                          numeric_file_version, read_fixed_file_version, read_pe_layout, read_version_resource, read_version_strings)
+from pkcs7 import certificate, name, pe_file, signed_data, version_info
+
+ROOT = name(('C', 'US'), ('O', 'Contoso Root Authority'), ('CN', 'Contoso Root CA'))
+LEAF = name(('C', 'US'), ('S', 'Washington'), ('L', 'Redmond'), ('O', 'Contoso'), ('CN', 'Contoso'))
+SIGNATURE = signed_data([certificate(1, ROOT, ROOT, ca=True), certificate(2, ROOT, LEAF)], ROOT, 2)
+STRINGS = {'FileVersion': '2.1.0.7', 'InternalName': 'tool.exe', 'ProductName': 'Contoso Tool', 'CompanyName': 'Contoso'}
+SIGNED_TOOL = pe_file(SIGNATURE, version_resource=version_info((2, 1, 0, 7), STRINGS))
+
+def test_layout_of_a_pe32_plus_file():
+    layout = read_pe_layout(SIGNED_TOOL)
+    assert [section[0] for section in layout['sections']] == [0x1000, 0x2000]
+    assert len(layout['directories']) == 16
+    with pytest.raises(PEFormatError):
+        read_pe_layout(b'MZ' + bytes(100))
+    with pytest.raises(PEFormatError):
+        read_pe_layout(b'#!/bin/sh\n' * 10)
+
+def test_version_strings_are_read_from_the_resource_directory():
+    assert read_version_strings(read_version_resource(SIGNED_TOOL, read_pe_layout(SIGNED_TOOL))) == STRINGS
+    unversioned = pe_file()
+    assert read_version_resource(unversioned, read_pe_layout(unversioned)) is None
+
+def test_file_metadata_of_signed_and_unsigned_files():
+    assert extract_file_metadata(SIGNED_TOOL) == {'publisher': 'O=CONTOSO, L=REDMOND, S=WASHINGTON, C=US', 'version': '2.1.0.7',
+                                                  'internal_name': 'tool.exe', 'product_name': 'Contoso Tool'}
+    assert extract_publisher_and_version_info(SIGNED_TOOL) == ('O=CONTOSO, L=REDMOND, S=WASHINGTON, C=US', '2.1.0.7', 'tool.exe')
+    unsigned = pe_file(version_resource=version_info((1, 0, 0, 0), STRINGS))
+    assert extract_file_metadata(unsigned) == {'publisher': None, 'version': None, 'internal_name': None, 'product_name': None}
+
+def test_version_is_numeric():
+    # The FileVersion string is free text; AppLocker compares the VS_FIXEDFILEINFO version
+    display = dict(STRINGS, FileVersion='10.0.19041.1 (WinBuild.160101.0800)')
+    fixed = pe_file(SIGNATURE, version_resource=version_info((10, 0, 19041, 1264), display))
+    assert read_fixed_file_version(read_version_resource(fixed, read_pe_layout(fixed))) == '10.0.19041.1264'
+    assert extract_file_metadata(fixed)['version'] == '10.0.19041.1264'
+    string_only = pe_file(SIGNATURE, version_resource=version_info(None, display))
+    assert read_fixed_file_version(read_version_resource(string_only, read_pe_layout(string_only))) is None
+    assert extract_file_metadata(string_only)['version'] == '10.0.19041.1'
+
+def test_numeric_file_version():
+    assert numeric_file_version('10.0.19041.1 (WinBuild.160101.0800)') == '10.0.19041.1'
+    assert numeric_file_version(' 1, 2, 0, 5') == '1.2.0.5'
+    assert numeric_file_version('3.1.4.1.5') == '3.1.4.1'
+    assert numeric_file_version('v2') == ''
+    assert numeric_file_version(None) == ''
+
+def test_flat_hash_of_paths_buffers_and_file_objects(tmp_path):
+    path = tmp_path / 'tool.exe'
+    path.write_bytes(SIGNED_TOOL)
+    expected = (hashlib.sha256(SIGNED_TOOL).hexdigest(), len(SIGNED_TOOL))
+    assert calculate_hash_and_length(str(path)) == calculate_hash_and_length(SIGNED_TOOL) == calculate_hash_and_length(io.BytesIO(SIGNED_TOOL)) == expected
+    (tmp_path / 'empty.exe').write_bytes(b'')
+    assert calculate_hash_and_length(str(tmp_path / 'empty.exe')) == (hashlib.sha256(b'').hexdigest(), 0)
+
+def test_analyze_files_keeps_input_order_and_collects_errors(tmp_path):
+    path = tmp_path / 'tool.exe'
+    path.write_bytes(SIGNED_TOOL)
+    items = [(f"copy{number}.exe", memoryview(SIGNED_TOOL)) for number in range(20)]
+    items.insert(5, ('tool.exe', str(path)))
+    items.insert(10, ('missing.exe', str(tmp_path / 'missing.exe')))
+    items.append(('plain.exe', pe_file()))
+    records, errors, stats = analyze_files(items, workers=4)
+    assert [record['filename'] for record in records] == [name_ for name_, _ in items if name_ != 'missing.exe']
+    assert [name_ for name_, _ in errors] == ['missing.exe']
+    assert records[5]['hash'] == records[0]['hash'] == hashlib.sha256(SIGNED_TOOL).hexdigest()
+    assert records[0]['product_name'] == 'Contoso Tool'
+    assert records[-1]['publisher'] is None
+    assert (stats['files'], stats['bytes']) == (22, 21 * len(SIGNED_TOOL) + len(pe_file()))
@@ -0,0 +1,33 @@
+import hashlib
+import io
+
+import lief
+
+from applocker.pe import calculate_hashes
+from pkcs7 import certificate, name, pe_file, signed_data
+
+ROOT = name(('C', 'US'), ('O', 'Contoso'), ('CN', 'Contoso Root CA'))
+SIGNATURE = signed_data([certificate(1, ROOT, ROOT, ca=True)], ROOT, 1)
+
+def test_authenticode_hash_matches_lief():
+    for data in (pe_file(), pe_file(SIGNATURE), pe_file(fill=b'\xcc')):
+        expected = lief.PE.parse(list(data)).authentihash(lief.PE.ALGORITHMS.SHA_256).hex()
+        assert calculate_hashes(data)[1] == expected
+
+def test_signing_changes_only_the_flat_hash():
+    unsigned, signed = calculate_hashes(pe_file()), calculate_hashes(pe_file(SIGNATURE))
+    assert unsigned[1] == signed[1]
+    assert unsigned[0] != signed[0]
+    assert unsigned[0] == hashlib.sha256(pe_file()).hexdigest()
+
+def test_buffers_paths_and_file_objects_agree(tmp_path):
+    data = pe_file(SIGNATURE)
+    path = tmp_path / 'signed.exe'
+    path.write_bytes(data)
+    assert calculate_hashes(data) == calculate_hashes(str(path)) == calculate_hashes(io.BytesIO(data))
+    assert calculate_hashes(data)[2] == len(data)
+
+def test_non_pe_files_have_no_authenticode_hash():
+    data = b'Write-Output "hello"\n'
+    assert calculate_hashes(data) == (hashlib.sha256(data).hexdigest(), None, len(data))
+    assert calculate_hashes(io.BytesIO(data))[1] is None
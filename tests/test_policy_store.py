@@ -0,0 +1,80 @@
+import logging
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+import streamlit as st
+
+from applocker import policy_store
+from policies import collection, path_rule, policy
+
+POLICY = policy(collection('Exe', path_rule('%PROGRAMFILES%\\*', rule_id='a')))
+OTHER = policy(collection('Exe', path_rule('%WINDIR%\\*', rule_id='b')))
+
+@pytest.fixture(autouse=True)
+def bare_streamlit():
+    # Outside `streamlit run` the caches and session state work in bare mode; start each test empty
+    logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').setLevel(logging.ERROR)
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    st.session_state.clear()
+    yield
+    st.session_state.clear()
+
+def test_decode_policy_is_cached_by_content(monkeypatch):
+    calls = []
+    real = policy_store.decode_policy_bytes
+    monkeypatch.setattr(policy_store, 'decode_policy_bytes', lambda raw: calls.append(raw) or real(raw))
+    raw = POLICY.encode('utf-16')
+    assert policy_store.decode_policy(raw) == (POLICY, 'utf-16')
+    assert policy_store.decode_policy(bytes(raw)) == (POLICY, 'utf-16')
+    assert len(calls) == 1
+    assert policy_store.decode_policy(OTHER.encode()) == (OTHER, 'utf-8-sig')
+    assert len(calls) == 2
+
+def test_is_valid_policy_xml():
+    assert policy_store.is_valid_policy_xml(POLICY)
+    assert not policy_store.is_valid_policy_xml(POLICY[:-5])
+
+def test_compiled_policy_is_shared():
+    compiled = policy_store.compiled_policy(POLICY)
+    assert compiled is policy_store.compiled_policy(POLICY)
+    assert compiled is not policy_store.compiled_policy(OTHER)
+    assert compiled.enforcement_modes == {'Exe': 'Enabled'}
+
+def test_merged_policy():
+    merged, report = policy_store.merged_policy([(POLICY.encode(), 'one'), (OTHER.encode(), 'two')])
+    assert merged.endswith('\n')
+    assert [rule.get('Id') for rule in ET.fromstring(merged).iter('FilePathRule')] == ['a', 'b']
+    assert report['rule_conflicts'] == []
+
+def test_read_policy_file_follows_mtime(tmp_path):
+    path = tmp_path / 'policy.xml'
+    path.write_text(POLICY)
+    assert policy_store.read_policy_file(str(path)) == POLICY
+    path.write_text(OTHER)
+    os.utime(path, (1, 1))
+    assert policy_store.read_policy_file(str(path)) == OTHER
+
+def test_session_uploads_most_recent_first_and_bounded():
+    keys = [policy_store.remember_upload(f"{number}.xml", f"<p n='{number}'/>".encode()) for number in range(policy_store.MAX_SESSION_POLICIES + 2)]
+    # Uploading a remembered policy again moves it to the front instead of adding it twice
+    policy_store.remember_upload('again.xml', b"<p n='3'/>")
+    listed = policy_store.session_policies()
+    assert len(listed) == policy_store.MAX_SESSION_POLICIES
+    assert listed[0] == (keys[3], 'again.xml')
+    assert [key for key, _ in listed[1:]] == keys[:3:-1] + [keys[2]]
+    assert policy_store.session_policy(keys[3]) == ('again.xml', b"<p n='3'/>")
+    assert policy_store.session_policy(keys[0]) == (None, None)
+    assert policy_store.policy_key(b"<p n='3'/>") == keys[3]
+
+def test_rule_index_is_per_session_and_bounded():
+    index = policy_store.rule_index(POLICY)
+    index.replace([0], '')
+    # Edits stay on the session's index across reruns
+    assert policy_store.rule_index(POLICY) is index and index.select() == []
+    for number in range(policy_store.MAX_SESSION_RULE_INDEXES):
+        policy_store.rule_index(policy(collection('Exe', path_rule(f'C:\\{number}\\*'))))
+    assert policy_store.rule_index(POLICY) is not index
+    st.session_state.clear()
+    assert policy_store.rule_index(OTHER) is not policy_store.rule_index(POLICY)
@@ -0,0 +1,65 @@
+from applocker.compact import RecordMetadata
+from applocker.evaluate import compile_policy, make_query
+from applocker.redundancy import find_redundant_rules, prune_policy
+from policies import ADMINISTRATORS, collection, hash_rule, path_rule, policy, publisher_rule
+
+PUBLISHER = 'O=CONTOSO, L=REDMOND, S=WASHINGTON, C=US'
+DIGEST = 'cd' * 32
+
+def findings(xml, metadata_cache=None):
+    return [(finding['Kind'], finding['RuleName'], finding['CoveredBy']) for finding in find_redundant_rules(xml, metadata_cache)]
+
+def test_path_under_a_folder_rule_is_redundant():
+    xml = policy(collection('Exe', path_rule('%PROGRAMFILES%\\*', name='programs'), path_rule('C:\\Program Files\\App\\app.exe', name='app')))
+    assert findings(xml) == [('Redundant', 'app', 'programs')]
+
+def test_rules_for_other_principals_do_not_cover():
+    xml = policy(collection('Exe', path_rule('C:\\Tools\\*', sid=ADMINISTRATORS, name='admins'), path_rule('C:\\Tools\\a.exe', name='a')))
+    assert findings(xml) == []
+
+def test_everyone_rules_cover_other_principals():
+    xml = policy(collection('Exe', path_rule('C:\\Tools\\*', name='everyone'), path_rule('C:\\Tools\\a.exe', sid=ADMINISTRATORS, name='admins')))
+    assert findings(xml) == [('Redundant', 'admins', 'everyone')]
+
+def test_allow_under_a_deny_is_shadowed():
+    xml = policy(collection('Exe', path_rule('C:\\Temp\\*', action='Deny', name='temp'), path_rule('C:\\Temp\\tool.exe', name='tool')))
+    assert findings(xml) == [('Shadowed', 'tool', 'temp')]
+
+def test_rules_with_exceptions_never_cover():
+    xml = policy(collection('Exe', path_rule('C:\\Tools\\*', name='tools', exceptions='<FilePathCondition Path="C:\\Tools\\a.exe"/>'), path_rule('C:\\Tools\\a.exe', name='a')))
+    assert findings(xml) == []
+
+def test_publisher_rule_is_covered_by_a_wider_one():
+    xml = policy(collection(
+        'Exe',
+        publisher_rule(PUBLISHER, 'TOOL', '*', '1.0.0.0', '*', name='any binary'),
+        publisher_rule(PUBLISHER, 'TOOL', 'TOOL.EXE', '2.0.0.0', '3.0.0.0', name='tool'),
+        publisher_rule(PUBLISHER, 'TOOL', 'OLD.EXE', '0.5.0.0', '3.0.0.0', name='old'),
+    ))
+    assert findings(xml) == [('Redundant', 'tool', 'any binary')]
+
+def test_identical_rules_keep_the_first():
+    xml = policy(collection('Exe', path_rule('C:\\Tools\\*', name='first'), path_rule('C:\\Tools\\*', name='second')))
+    assert findings(xml) == [('Redundant', 'second', 'first')]
+
+def test_hash_rule_is_covered_by_the_publisher_of_its_file():
+    xml = policy(collection('Exe', publisher_rule(PUBLISHER, name='contoso'), hash_rule((DIGEST, 'tool.exe', 1000), name='tool hash')))
+    assert findings(xml) == []
+    metadata = RecordMetadata([{'hash': 'ef' * 32, 'authenticode_hash': DIGEST, 'length': 1000, 'publisher': PUBLISHER, 'version': '1.0.0.0', 'internal_name': 'tool.exe'}])
+    assert findings(xml, metadata) == [('Redundant', 'tool hash', 'contoso')]
+
+def test_pruning_the_findings_keeps_every_decision():
+    xml = policy(collection(
+        'Exe',
+        path_rule('C:\\Tools\\*', name='tools'),
+        path_rule('C:\\Tools\\a.exe', name='a'),
+        path_rule('C:\\Temp\\*', action='Deny', name='temp'),
+        path_rule('C:\\Temp\\x.exe', name='x'),
+        path_rule('C:\\Temp\\x.exe', action='Deny', name='deny x'),
+    ))
+    pruned = prune_policy(xml, [finding['RuleNumber'] for finding in find_redundant_rules(xml)])
+    assert pruned.count('FilePathRule ') == 2
+    before, after = compile_policy(xml), compile_policy(pruned)
+    for path in ('C:\\Tools\\a.exe', 'C:\\Tools\\b.exe', 'C:\\Temp\\x.exe', 'C:\\Other\\y.exe'):
+        query = make_query(path=path)
+        assert before.evaluate(query)[0] == after.evaluate(query)[0]
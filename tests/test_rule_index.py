@@ -0,0 +1,83 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from applocker.rule_index import RuleIndex
+from policies import collection, hash_rule, path_rule, policy
+
+EXE_A = '00000000-0000-0000-0000-0000000000a1'
+EXE_B = '00000000-0000-0000-0000-0000000000a2'
+EXE_C = '00000000-0000-0000-0000-0000000000a3'
+SCRIPT_A = '00000000-0000-0000-0000-0000000000b1'
+NEW = '00000000-0000-0000-0000-0000000000c1'
+
+def build_index():
+    return RuleIndex(policy(
+        collection('Exe', path_rule('%PROGRAMFILES%\\*', rule_id=EXE_A), path_rule('%WINDIR%\\*', rule_id=EXE_B), hash_rule(('AB' * 32, 'a.exe', 10), rule_id=EXE_C)),
+        collection('Script', path_rule('%WINDIR%\\*', rule_id=SCRIPT_A)),
+    ))
+
+def layout(index):
+    return [(collection.get('Type'), [rule.get('Id') for rule in collection]) for collection in index.root.iter('RuleCollection')]
+
+def test_select_and_rules_xml_group_rules_by_collection():
+    index = build_index()
+    assert index.select('Path') == [0, 1, 3]
+    assert index.select(collection_type='Script') == [3]
+    assert index.select(text='abab') == [2]
+    page = ET.fromstring(f"<Rules>{index.rules_xml([1, 2, 3])}</Rules>")
+    assert [(c.get('Type'), [rule.get('Id') for rule in c]) for c in page] == [('Exe', [EXE_B, EXE_C]), ('Script', [SCRIPT_A])]
+
+def test_replace_edits_deletes_and_inserts():
+    index = build_index()
+    page_xml = index.rules_xml([0, 1]).replace('%WINDIR%', '%SYSTEM32%')
+    page_xml = page_xml.replace(f'Id="{EXE_A}"', f'Id="{NEW}"')
+    index.replace([0, 1], page_xml)
+    assert layout(index) == [('Exe', [EXE_B, NEW, EXE_C]), ('Script', [SCRIPT_A])]
+    assert index.root.find(f".//FilePathRule[@Id='{EXE_B}']/Conditions/FilePathCondition").get('Path') == '%SYSTEM32%\\*'
+    assert index.edits == 1
+
+def test_bare_rules_keep_their_collection():
+    index = build_index()
+    index.replace([1, 3], index.rules_xml([1]).replace('<RuleCollection Type="Exe">', '').replace('</RuleCollection>', '') + ET.tostring(index.entries[3][2], encoding='unicode'))
+    assert layout(index) == [('Exe', [EXE_A, EXE_B, EXE_C]), ('Script', [SCRIPT_A])]
+
+def test_replace_rejects_an_id_used_elsewhere_in_the_policy():
+    index = build_index()
+    before = index.to_xml()
+    copied = index.rules_xml([3]).replace('<RuleCollection Type="Script">', '<RuleCollection Type="Exe">')
+    # EXE_A is not on the page, so a pasted copy would duplicate it
+    duplicate = index.rules_xml([1]).replace('</RuleCollection>', path_rule('%TEMP%\\*', rule_id=EXE_A) + '</RuleCollection>')
+    with pytest.raises(ValueError, match=EXE_A):
+        index.replace([1], duplicate)
+    with pytest.raises(ValueError, match=SCRIPT_A):
+        index.replace([1], index.rules_xml([1]) + copied)
+    assert index.to_xml() == before and index.edits == 0
+
+def test_replace_rejects_the_same_new_id_twice():
+    index = build_index()
+    twice = path_rule('%TEMP%\\*', rule_id=NEW) + path_rule('%TMP%\\*', rule_id=NEW)
+    with pytest.raises(ValueError, match=NEW):
+        index.replace([0], index.rules_xml([0]) + twice)
+
+def test_rule_moved_to_another_collection():
+    index = build_index()
+    page_xml = index.rules_xml([1, 2, 3])
+    moved = ET.tostring(index.entries[1][2], encoding='unicode').strip()
+    page_xml = page_xml.replace(moved + '\n', '').replace('</RuleCollection>\n<RuleCollection Type="Script">', f'</RuleCollection>\n<RuleCollection Type="Script">{moved}')
+    index.replace([1, 2, 3], page_xml)
+    assert layout(index) == [('Exe', [EXE_A, EXE_C]), ('Script', [SCRIPT_A, EXE_B])]
+
+def test_rule_moved_to_a_collection_the_policy_lacks():
+    index = build_index()
+    index.replace([2], index.rules_xml([2]).replace('Type="Exe"', 'Type="Msi"'))
+    assert layout(index) == [('Exe', [EXE_A, EXE_B]), ('Script', [SCRIPT_A]), ('Msi', [EXE_C])]
+    assert index.root.find("RuleCollection[@Type='Msi']").get('EnforcementMode') == 'NotConfigured'
+
+def test_load_replaces_the_tree():
+    index = build_index()
+    index.load(policy(collection('Dll', path_rule('%WINDIR%\\*', rule_id=NEW))))
+    assert layout(index) == [('Dll', [NEW])]
+    assert index.select() == [0] and index.edits == 1
+    with pytest.raises(ET.ParseError):
+        index.load('<AppLockerPolicy>')
@@ -0,0 +1,61 @@
+import csv
+
+from applocker.evaluate import compile_policies, inventory_columns
+from applocker.simulate import simulate_inventory, simulate_rows
+from policies import collection, path_rule, policy
+
+ALLOW_TOOLS = policy(collection('Exe', path_rule('C:\\Tools\\*', name='tools'), path_rule('C:\\Tools\\bad.exe', action='Deny', name='bad'), mode='AuditOnly'))
+ENFORCE = policy(collection('Exe', mode='Enabled'), collection('Script', mode='NotConfigured'))
+INVENTORY = [
+    {'Host': 'pc1', 'Path': 'C:\\Tools\\good.exe'},
+    {'Host': 'pc1', 'Path': 'C:\\Tools\\bad.exe'},
+    {'Host': 'pc2', 'Path': 'C:\\Tools\\good.exe'},
+    {'Host': 'pc2', 'Path': 'C:\\Other\\x.exe'},
+    {'Host': 'pc2', 'Path': 'C:\\Other\\run.ps1'},
+]
+
+def test_last_configured_enforcement_mode_wins():
+    compiled = compile_policies([ALLOW_TOOLS, ENFORCE])
+    assert compiled.enforcement_modes['Exe'] == 'Enabled'
+    assert compiled.enforcement_disagreements() == {'Exe': [(0, 'AuditOnly'), (1, 'Enabled')]}
+
+def test_not_configured_never_overrides():
+    compiled = compile_policies([policy(collection('Exe', mode='AuditOnly')), policy(collection('Exe', mode='NotConfigured'))])
+    assert compiled.enforcement_modes['Exe'] == 'AuditOnly'
+    assert compiled.enforcement_disagreements() == {}
+
+def test_rules_from_every_source_are_combined():
+    compiled = compile_policies([ALLOW_TOOLS, policy(collection('Exe', path_rule('C:\\Other\\*', name='other')))])
+    result = simulate_rows(compiled, INVENTORY, inventory_columns(['Host', 'Path']), 'Host')
+    assert result.blocked() == 1
+
+def test_simulate_rows_tallies_hosts_and_rules():
+    compiled = compile_policies([ALLOW_TOOLS])
+    result = simulate_rows(compiled, INVENTORY, inventory_columns(['Host', 'Path']), 'Host')
+    assert result.host_rows() == [
+        {'Host': 'pc1', 'Files': 2, 'Allowed': 1, 'Denied': 1, 'DeniedByDefault': 0, 'Blocked': 0, 'Audited': 1},
+        {'Host': 'pc2', 'Files': 3, 'Allowed': 2, 'Denied': 0, 'DeniedByDefault': 1, 'Blocked': 0, 'Audited': 1},
+    ]
+    rows = {row['RuleName']: row for row in result.rule_rows(compiled)}
+    assert (rows['tools']['Allowed'], rows['tools']['BlockedHosts']) == (2, 0)
+    assert (rows['bad']['Blocked'], rows['bad']['BlockedHosts']) == (1, 1)
+    assert rows['(default deny: no allow rule matched)']['Blocked'] == 1
+
+def test_only_enforced_collections_block():
+    compiled = compile_policies([ALLOW_TOOLS, ENFORCE])
+    result = simulate_rows(compiled, INVENTORY, inventory_columns(['Host', 'Path']), 'Host')
+    assert [(row['Host'], row['Blocked'], row['Audited']) for row in result.host_rows()] == [('pc1', 1, 0), ('pc2', 1, 0)]
+    assert result.blocked() == 2
+
+def test_simulate_inventory_matches_in_process_rows(tmp_path):
+    inventory = tmp_path / 'inventory.csv'
+    with open(inventory, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['Host', 'Path'])
+        writer.writeheader()
+        writer.writerows(INVENTORY * 50)
+    result, stats = simulate_inventory([ALLOW_TOOLS.encode()], str(inventory), workers=1, chunk_bytes=256)
+    assert stats['ranges'] > 1
+    assert stats['files'] == len(INVENTORY) * 50
+    assert (stats['blocked'], stats['audited']) == (0, 2 * 50)
+    result, stats = simulate_inventory([ALLOW_TOOLS.encode(), ENFORCE.encode()], str(inventory), workers=1, chunk_bytes=256)
+    assert (stats['blocked'], stats['audited']) == (2 * 50, 0)
@@ -0,0 +1,53 @@
+import io
+import xml.etree.ElementTree as ET
+
+from applocker.stream import RULE_TYPES, iter_collections, iter_policy_events, iter_rule_records
+from policies import collection, hash_rule, path_rule, policy, publisher_rule
+
+EXTENSIONS = '<RuleCollectionExtensions><ThresholdExtensions><Services EnforcementMode="Enabled"/></ThresholdExtensions></RuleCollectionExtensions>'
+POLICY = policy(
+    collection('Exe', path_rule('C:\\Tools\\*', rule_id='a', exceptions='<FilePathCondition Path="C:\\Tools\\x.exe"/>'),
+               publisher_rule('O=CONTOSO', 'TOOL', 'TOOL.EXE', '1.0.0.0', '*', rule_id='b'), mode='AuditOnly', extra=EXTENSIONS),
+    collection('Dll', hash_rule(('ab' * 32, 'a.dll', 10), ('cd' * 32, 'b.dll', 20), rule_id='c')),
+)
+
+def test_events_arrive_in_document_order():
+    events = [(event, collection_type, elem.tag) for event, collection_type, elem in iter_policy_events(POLICY)]
+    assert events == [
+        ('policy', None, 'AppLockerPolicy'),
+        ('collection', 'Exe', 'RuleCollection'),
+        ('rule', 'Exe', 'FilePathRule'),
+        ('rule', 'Exe', 'FilePublisherRule'),
+        ('rule', 'Exe', 'RuleCollectionExtensions'),
+        ('collection', 'Dll', 'RuleCollection'),
+        ('rule', 'Dll', 'FileHashRule'),
+    ]
+
+def test_rules_are_complete_and_detached_once_the_consumer_resumes():
+    collections = []
+    for event, _, elem in iter_policy_events(POLICY):
+        if event == 'collection':
+            collections.append(elem)
+        elif event == 'rule':
+            assert elem.find('Conditions') is not None or elem.tag == 'RuleCollectionExtensions'
+    assert [len(elem) for elem in collections] == [0, 0]
+
+def test_every_source_kind_reads_the_same():
+    expected = list(iter_collections(POLICY))
+    assert expected == [('Exe', 'AuditOnly'), ('Dll', 'Enabled')]
+    assert list(iter_collections(POLICY.encode('utf-8'))) == expected
+    assert list(iter_collections('\ufeff\n' + POLICY)) == expected
+    assert list(iter_collections(io.BytesIO(POLICY.encode('utf-16')))) == expected
+
+def test_paths_are_streamed_from_disk(tmp_path):
+    path = tmp_path / 'policy.xml'
+    ET.ElementTree(ET.fromstring(POLICY)).write(path, encoding='utf-8', xml_declaration=True)
+    assert [record['Id'] for record in iter_rule_records(str(path)) if record['RuleType'] in RULE_TYPES] == ['a', 'b', 'c']
+
+def test_rule_records_flatten_conditions_and_exceptions():
+    path, publisher, hashes = [record for record in iter_rule_records(POLICY) if record['RuleType'] in RULE_TYPES]
+    assert path['Conditions'] == [{'Type': 'FilePathCondition', 'Path': 'C:\\Tools\\*'}]
+    assert path['Exceptions'] == [{'Type': 'FilePathCondition', 'Path': 'C:\\Tools\\x.exe'}]
+    assert publisher['Conditions'][0]['BinaryVersionRange'] == {'LowSection': '1.0.0.0', 'HighSection': '*'}
+    assert [entry['SourceFileName'] for entry in hashes['Conditions'][0]['FileHashes']] == ['a.dll', 'b.dll']
+    assert (hashes['Collection'], hashes['UserOrGroupSid'], hashes['Action']) == ('Dll', 'S-1-1-0', 'Allow')
@@ -0,0 +1,53 @@
+import io
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
+
+from applocker.exe_policy import generate_policy_xml
+from applocker.xmlwriter import PolicyWriter
+
+def minidom_text(root):
+    # What the generators produced before the incremental writer
+    return minidom.parseString(ET.tostring(root, 'utf-8')).toprettyxml(indent="  ")
+
+def written_text(root):
+    out = io.StringIO()
+    writer = PolicyWriter(out)
+    writer.start(root.tag, dict(root.attrib))
+    for collection in root:
+        if len(collection) and collection.get('Nested') == 'yes':
+            writer.start(collection.tag, dict(collection.attrib))
+            for rule in collection:
+                writer.element(rule)
+            writer.end()
+        else:
+            writer.element(collection)
+    writer.close()
+    return out.getvalue()
+
+def sample_policy():
+    root = ET.Element('AppLockerPolicy', Version='1')
+    exe = ET.SubElement(root, 'RuleCollection', Type='Exe', EnforcementMode='AuditOnly', Nested='yes')
+    rule = ET.SubElement(exe, 'FilePublisherRule', Id='1', Name='Rule for "Tom & Jerry" <beta>', Description="it's > 1\n\tand\r\nmore", UserOrGroupSid='S-1-1-0', Action='Allow')
+    condition = ET.SubElement(ET.SubElement(rule, 'Conditions'), 'FilePublisherCondition', PublisherName='O="CONTOSO, INC.", C=US', ProductName='Tööl ✓', BinaryName='*')
+    ET.SubElement(condition, 'BinaryVersionRange', LowSection='1.0.0.0', HighSection='*')
+    ET.SubElement(exe, 'FileHashRule', Id='2', Name='', Description='', UserOrGroupSid='S-1-1-0', Action='Deny')
+    ET.SubElement(root, 'RuleCollection', Type='Dll', EnforcementMode='NotConfigured')
+    ET.SubElement(root, 'RuleCollection', Type='Script', EnforcementMode='Enabled', Nested='yes')
+    return root
+
+def test_writer_output_equals_minidom_pretty_print():
+    root = sample_policy()
+    assert written_text(root) == minidom_text(root)
+    assert written_text(root).encode('utf-8') == minidom_text(root).encode('utf-8')
+
+def test_generated_exe_policy_equals_minidom_pretty_print():
+    records = [
+        {'filename': 'a&b.exe', 'hash': 'ab' * 32, 'length': 10, 'publisher': 'O="A & B", C=US', 'version': '1.0.0.0', 'internal_name': 'a&b.exe'},
+        {'filename': 'c.exe', 'hash': 'cd' * 32, 'authenticode_hash': 'ef' * 32, 'length': 20, 'publisher': None, 'version': None, 'internal_name': None},
+    ]
+    for max_hashes_per_rule in (1, 5):
+        text = generate_policy_xml(records, 'Audit', True, True, max_hashes_per_rule)
+        root = ET.fromstring(text.split('\n', 1)[1])
+        for elem in root.iter():
+            elem.text = elem.tail = None
+        assert text == minidom_text(root)